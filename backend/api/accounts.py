@@ -0,0 +1,98 @@
+"""Bulk creation of registration requests for imports and seeding.
+
+Password hashing (PBKDF2) dominates the cost of importing accounts, so it
+runs in a pool of worker processes and the results are written in bulk.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import check_password, make_password
+
+from .models import RegistrationRequest
+
+BATCH_SIZE = 2000
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _init_worker():
+    # Forked workers inherit a configured Django; spawned ones start bare
+    if not apps.ready:
+        django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password for each password, in order, over `workers` processes"""
+    passwords = list(passwords)
+    workers = min(workers or default_workers(), len(passwords))
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def upsert_registrations(entries, workers=None):
+    """Create or update one RegistrationRequest per email.
+
+    entries are dicts with role, full_name, email, password and metadata;
+    a later entry for the same email wins. Imported accounts come from the
+    operator's data files, so they are saved approved. Email is not unique, so existing
+    requests are matched in one query (the first per email is updated)
+    rather than upserted on a constraint. Returns (created, updated).
+    """
+    entries = list({entry['email']: entry for entry in entries}.values())
+    existing = {}
+    for request_id, email in RegistrationRequest.objects.filter(
+        email__in=[entry['email'] for entry in entries]
+    ).values_list('id', 'email').order_by('id'):
+        existing.setdefault(email, request_id)
+
+    hashes = hash_passwords([entry['password'] for entry in entries], workers)
+    to_create, to_update = [], []
+    for entry, password_hash in zip(entries, hashes):
+        registration = RegistrationRequest(
+            id=existing.get(entry['email']),
+            email=entry['email'],
+            role=entry['role'],
+            full_name=entry['full_name'],
+            password_hash=password_hash,
+            metadata=entry['metadata'],
+            is_approved=True,
+        )
+        (to_update if registration.id else to_create).append(registration)
+
+    RegistrationRequest.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    RegistrationRequest.objects.bulk_update(
+        to_update,
+        ['role', 'full_name', 'password_hash', 'metadata', 'is_approved'],
+        batch_size=BATCH_SIZE,
+    )
+    return len(to_create), len(to_update)
+
+
+def authenticate(role, email, password):
+    """The approved RegistrationRequest for role and email whose password matches, or None"""
+    registrations = RegistrationRequest.objects.filter(
+        role=role, email=email.strip().lower(), is_approved=True
+    ).only(
+        'id', 'role', 'email', 'password_hash', 'metadata'
+    )
+    for registration in registrations:
+        if check_password(password, registration.password_hash):
+            return registration
+    if not registrations:
+        # Hash anyway so an unknown email answers as slowly as a wrong password
+        make_password(password)
+    return None
+
+
+def sos_identity(registration):
+    """The identifier SOS tokens carry: a parent's is their child's email"""
+    if registration.role == 'parent':
+        return registration.metadata.get('childEmail') or registration.email
+    return registration.email
+
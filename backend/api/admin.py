@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Article, LoginAttempt, RegistrationRequest, Quiz, Question, QuizAttempt, QuestionResponse
+from .models import Article, ChatMessage, ChatResponseCache, ChatSession, ChatUsage, LoginAttempt, RegistrationRequest, SafetyEvent, Quiz, Question, QuizAttempt, QuestionResponse
+from .search import matching_article_ids
 
 
 @admin.register(Article)
@@ -10,13 +11,25 @@ class ArticleAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     list_filter = ('category',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the FTS5 index instead of LIKE scans when it is available
+        article_ids = matching_article_ids(search_term) if search_term else None
+        if article_ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=article_ids), False
+
 
 @admin.register(RegistrationRequest)
 class RegistrationRequestAdmin(admin.ModelAdmin):
-    list_display = ('full_name', 'email', 'role', 'created_at')
+    list_display = ('full_name', 'email', 'role', 'is_approved', 'created_at')
     search_fields = ('full_name', 'email', 'role')
-    list_filter = ('role',)
+    list_filter = ('role', 'is_approved')
     readonly_fields = ('created_at',)
+    actions = ['approve']
+
+    @admin.action(description='Approve selected registration requests')
+    def approve(self, request, queryset):
+        queryset.update(is_approved=True)
 
 
 @admin.register(LoginAttempt)
@@ -26,6 +39,42 @@ class LoginAttemptAdmin(admin.ModelAdmin):
     list_filter = ('role', 'is_successful')
     readonly_fields = ('created_at',)
 
+
+@admin.register(ChatResponseCache)
+class ChatResponseCacheAdmin(admin.ModelAdmin):
+    list_display = ('normalized_message', 'hits', 'created_at', 'last_used_at')
+    search_fields = ('normalized_message',)
+    readonly_fields = ('key', 'hits', 'created_at', 'last_used_at')
+
+
+@admin.register(SafetyEvent)
+class SafetyEventAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'emotion', 'level', 'follow_up_status')
+    list_filter = ('follow_up_status', 'level')
+    search_fields = ('message',)
+    readonly_fields = ('created_at', 'follow_up_at')
+
+
+class ChatMessageInline(admin.TabularInline):
+    model = ChatMessage
+    extra = 0
+    readonly_fields = ('role', 'content', 'created_at')
+
+
+@admin.register(ChatSession)
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_at', 'updated_at')
+    readonly_fields = ('summary', 'summarized_through', 'created_at', 'updated_at')
+    inlines = [ChatMessageInline]
+
+
+@admin.register(ChatUsage)
+class ChatUsageAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'endpoint', 'outcome', 'model', 'prompt_tokens', 'output_tokens',
+                    'first_token_ms', 'latency_ms', 'error_class')
+    list_filter = ('outcome', 'endpoint', 'model', 'cache_hit')
+    date_hierarchy = 'created_at'
+
 # Register your models here.
 admin.site.register(Quiz)
 admin.site.register(Question)
@@ -0,0 +1,115 @@
+"""Chat model backends, chosen with the CHAT_BACKEND setting.
+
+A backend provides ``ensure_ready()``, ``generate(prompt, timeout=None,
+usage=None)`` returning the reply text, ``stream(prompt, timeout=None,
+usage=None)`` yielding text chunks (both write ``prompt_tokens`` and
+``output_tokens`` into the ``usage`` dict when given), ``model_label``,
+``status()`` and ``configured_key()``, the settings it is built from.
+``gemini`` calls the Gemini API. ``stub`` answers locally and deterministically with
+configurable latency, so the chat pipeline can be load-tested and run in
+CI without network access or an API key.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .gemini import GeminiClient
+
+
+class StubClient:
+    """Deterministic in-process backend.
+
+    Replies echo the last user message followed by filler words, up to
+    ``tokens`` chunks. The first chunk arrives after ``latency`` seconds and
+    each further chunk after ``token_delay``; generate() waits for them all.
+    """
+    FILLER = 'Remember that you can always talk to a trusted adult about anything.'.split()
+    ready = True
+    model_label = 'stub'
+
+    @staticmethod
+    def configured_key():
+        return (settings.CHAT_STUB_LATENCY, settings.CHAT_STUB_TOKEN_DELAY, settings.CHAT_STUB_TOKENS)
+
+    def __init__(self, latency, token_delay, tokens):
+        self.settings_key = (latency, token_delay, tokens)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.tokens = tokens
+
+    def ensure_ready(self):
+        pass
+
+    def _chunks(self, prompt):
+        message = prompt.rpartition('User: ')[2].rpartition('\n\nSparkle:')[0]
+        words = [f'You said "{message[:80]}".'] + self.FILLER * self.tokens
+        return [words[0]] + [f' {word}' for word in words[1:self.tokens]]
+
+    def _wait(self, seconds, timeout):
+        # Behave like a provider that misses its deadline
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f'Stub reply took longer than {timeout}s')
+        time.sleep(seconds)
+
+    @staticmethod
+    def _record_usage(prompt, chunks, usage):
+        # One token per word of prompt and per chunk of reply
+        if usage is not None:
+            usage['prompt_tokens'] = len(prompt.split())
+            usage['output_tokens'] = len(chunks)
+
+    def generate(self, prompt, timeout=None, usage=None):
+        chunks = self._chunks(prompt)
+        self._wait(self.latency + self.token_delay * max(len(chunks) - 1, 0), timeout)
+        self._record_usage(prompt, chunks, usage)
+        return ''.join(chunks).strip()
+
+    def stream(self, prompt, timeout=None, usage=None):
+        chunks = self._chunks(prompt)
+        for i, chunk in enumerate(chunks):
+            self._wait(self.latency if i == 0 else self.token_delay, timeout)
+            yield chunk
+        self._record_usage(prompt, chunks, usage)
+
+    def status(self):
+        return {
+            'ready': True,
+            'model': self.model_label,
+            'setup': None,
+        }
+
+
+BACKENDS = {
+    'gemini': GeminiClient,
+    'stub': StubClient,
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _configured():
+    name = settings.CHAT_BACKEND
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown CHAT_BACKEND {name!r}; choose one of: {', '.join(BACKENDS)}"
+        ) from None
+    return backend, backend.configured_key()
+
+
+def get_client():
+    """The shared backend client, rebuilt only if its settings change"""
+    global _client
+    backend, settings_key = _configured()
+    client = _client
+    if type(client) is backend and client.settings_key == settings_key:
+        return client
+    with _client_lock:
+        if type(_client) is not backend or _client.settings_key != settings_key:
+            _client = backend(*settings_key)
+        return _client
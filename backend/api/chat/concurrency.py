@@ -0,0 +1,155 @@
+"""Bounded concurrency for LLM calls made from async chat views.
+
+At most ``CHAT_MAX_IN_FLIGHT`` generations run at once in this process.
+Further requests wait (without holding a thread) for up to
+``CHAT_QUEUE_TIMEOUT`` seconds, and once ``CHAT_MAX_QUEUE`` requests are
+already waiting new ones are turned away immediately so the view can answer
+429.
+
+The count is kept under a thread lock rather than in an asyncio.Semaphore:
+under ASGI every request shares one event loop, but under runserver or WSGI
+each async view runs on its own loop in its own thread, and a per-loop
+semaphore would limit nothing there.
+"""
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+
+
+class ChatOverloaded(Exception):
+    """No generation slot is available; the client should retry later"""
+
+
+class Lease:
+    """A held generation slot; release() hands it back and may be called again"""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+
+    def release(self):
+        limiter, self._limiter = self._limiter, None
+        if limiter is not None:
+            limiter._free()
+
+
+class LeasedStream:
+    """Async iterator that releases lease once it is exhausted or closed.
+
+    StreamingHttpResponse calls close() when the response is finished with,
+    also when the client left before the stream was first read.
+    """
+
+    def __init__(self, iterator, lease):
+        self._iterator = iterator
+        self._lease = lease
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._iterator.__anext__()
+        except BaseException:
+            self._lease.release()
+            raise
+
+    def close(self):
+        self._lease.release()
+
+
+class _Waiter:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        # Set under the limiter's lock when a freed slot is handed over
+        self.granted = False
+
+    def wake(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class LLMLimiter:
+    def __init__(self, max_in_flight=None, max_waiting=None, wait_timeout=None):
+        self._max_in_flight = max_in_flight
+        self._max_waiting = max_waiting
+        self._wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+
+    @property
+    def max_in_flight(self):
+        return self._max_in_flight or settings.CHAT_MAX_IN_FLIGHT
+
+    @property
+    def max_waiting(self):
+        return self._max_waiting if self._max_waiting is not None else settings.CHAT_MAX_QUEUE
+
+    @property
+    def wait_timeout(self):
+        return self._wait_timeout if self._wait_timeout is not None else settings.CHAT_QUEUE_TIMEOUT
+
+    async def acquire(self):
+        """Wait for a slot as slot() does and return its Lease.
+
+        For callers whose work outlives the awaiting code, such as a
+        streamed response that must be refused before its headers go out.
+        """
+        with self._lock:
+            if self._in_flight < self.max_in_flight:
+                self._in_flight += 1
+                return Lease(self)
+            if len(self._waiters) >= self.max_waiting:
+                raise ChatOverloaded('Too many chat requests are waiting.')
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.wait_timeout)
+        except BaseException as exc:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                # The slot arrived as the wait ended; pass it on
+                self._free()
+            if isinstance(exc, asyncio.TimeoutError):
+                raise ChatOverloaded('Timed out waiting for a chat slot.') from None
+            raise
+        return Lease(self)
+
+    def _free(self):
+        # Called from any thread: event loop threads, or the worker thread
+        # Django closes a streamed response from
+        with self._lock:
+            if not self._waiters:
+                self._in_flight -= 1
+                return
+            # The slot passes straight to the longest waiter
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        try:
+            waiter.loop.call_soon_threadsafe(waiter.wake)
+        except RuntimeError:
+            # The waiter's loop is closed, and the waiter with it
+            self._free()
+
+    @asynccontextmanager
+    async def slot(self):
+        lease = await self.acquire()
+        try:
+            yield
+        finally:
+            lease.release()
+
+    def stats(self):
+        with self._lock:
+            return {'inFlight': self._in_flight, 'waiting': len(self._waiters)}
+
+
+llm_limiter = LLMLimiter()
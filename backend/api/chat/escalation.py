@@ -0,0 +1,80 @@
+"""Immediate handling of chat messages that raise a safety concern.
+
+Flagged messages never wait on the model: they get ``SOS_REPLY`` straight
+away and are recorded as a ``SafetyEvent``. When ``CHAT_SAFETY_FOLLOW_UP``
+is on, a personalised model reply is generated in a background thread once
+the event is committed and stored on the event for the client to fetch.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from ..models import ChatUsage, SafetyEvent
+from . import resilience
+from .backends import get_client
+from .gemini import build_prompt
+from .usage import UsageRecorder
+
+logger = logging.getLogger(__name__)
+
+SOS_REPLY = (
+    "It sounds like something might not feel safe, and you did the right thing by telling me. "
+    "You are not in trouble. Please tell a trusted adult right now, like a parent, teacher or "
+    "family member you feel safe with. You can press the SOS button to alert your trusted adults, "
+    "or call CHILDLINE on 1098. It is free and open day and night."
+)
+
+_follow_ups = ThreadPoolExecutor(max_workers=2, thread_name_prefix='safety-follow-up')
+
+
+def escalate(message, verdict):
+    """Record a flagged message and queue the optional model follow-up"""
+    follow_up = settings.CHAT_SAFETY_FOLLOW_UP
+    event = SafetyEvent.objects.create(
+        message=message,
+        emotion=verdict['emotion'],
+        level=verdict['level'],
+        reply=SOS_REPLY,
+        follow_up_status=SafetyEvent.FOLLOW_UP_PENDING if follow_up else SafetyEvent.FOLLOW_UP_SKIPPED,
+    )
+    if follow_up:
+        transaction.on_commit(partial(_follow_ups.submit, generate_follow_up, event.id))
+    return event
+
+
+def generate_follow_up(event_id):
+    """Ask the model for a reply to a flagged message and store it on the event"""
+    usage = UsageRecorder('follow_up')
+    try:
+        event = SafetyEvent.objects.only('message').get(id=event_id)
+        client = get_client()
+        client.ensure_ready()
+        usage.model = client.model_label
+        follow_up = resilience.call(client.generate, build_prompt(event.message), usage=usage.tokens)
+        status = SafetyEvent.FOLLOW_UP_COMPLETED
+        usage.save(ChatUsage.OUTCOME_MODEL)
+    except Exception as exc:
+        logger.exception('Safety follow-up failed for event %s', event_id)
+        follow_up = ''
+        status = SafetyEvent.FOLLOW_UP_FAILED
+        usage.save(ChatUsage.OUTCOME_ERROR, exc)
+    try:
+        SafetyEvent.objects.filter(id=event_id).update(
+            follow_up=follow_up,
+            follow_up_status=status,
+            follow_up_at=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+def serialize_event(event):
+    return {
+        'safetyEventId': event.id,
+        'followUpStatus': event.follow_up_status,
+        'followUp': event.follow_up or None,
+    }
@@ -0,0 +1,191 @@
+"""Gemini backend for the chat endpoints.
+
+Importing the SDK, configuring the API key and resolving the model (with
+its fallback) happen once, on first use, instead of on every message. The
+warm client is shared by all request threads, so per-message work is only
+the generation call itself.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# POSCO awareness system prompt
+SYSTEM_PROMPT = """You are Sparkle, a friendly AI assistant for POSCO awareness. Keep responses short and clear. Help children understand child safety, safe/unsafe touch, and POSCO Act basics. If someone feels unsafe, encourage them to use SOS or talk to a trusted adult."""
+
+# Sent instead of a model reply while the model is unreachable
+FALLBACK_REPLY = (
+    "Sparkle is taking a short rest and can't answer properly right now. Please try again in a "
+    "little while. If you feel unsafe or worried, press the SOS button, talk to a trusted adult, "
+    "or call CHILDLINE on 1098."
+)
+
+GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'top_p': 0.8,
+    'top_k': 40,
+    'max_output_tokens': 1024,
+}
+
+FALLBACK_MODEL = 'models/gemini-pro'
+PLACEHOLDER_API_KEY = 'your-gemini-api-key-here'
+
+
+class ChatClientError(Exception):
+    """The chat client cannot be set up; the message is safe to show to users"""
+
+
+def describe_error(exc):
+    """A user-facing explanation for a failed Gemini call"""
+    error_msg = str(exc)
+    if 'API key' in error_msg or 'authentication' in error_msg.lower():
+        return 'Gemini API key is invalid or missing. Please check your .env file.'
+    if '404' in error_msg or 'not found' in error_msg.lower():
+        return 'Gemini model not found. Please check GEMINI_MODEL in settings.'
+    if 'quota' in error_msg.lower() or 'limit' in error_msg.lower():
+        return 'Gemini API quota exceeded. Please check your API usage.'
+    return error_msg
+
+
+SUMMARY_PROMPT = """Summarise this conversation between a child and Sparkle in at most five short sentences. Keep any safety concerns, trusted adults mentioned and questions still open. Reply with the summary only."""
+
+SPEAKERS = {'user': 'User', 'model': 'Sparkle'}
+
+
+def format_transcript(history):
+    return '\n'.join(f"{SPEAKERS[role]}: {content}" for role, content in history)
+
+
+def build_prompt(message, history=(), summary=''):
+    """The system prompt, conversation so far and the new message.
+
+    history is a sequence of (role, content) pairs, oldest first.
+    """
+    sections = [SYSTEM_PROMPT]
+    if summary:
+        sections.append(f"Earlier in this conversation: {summary}")
+    if history:
+        sections.append(format_transcript(history))
+    sections.append(f"User: {message}")
+    return '\n\n'.join(sections) + "\n\nSparkle:"
+
+
+def build_summary_prompt(summary, history):
+    previous = f"Summary so far: {summary}\n\n" if summary else ''
+    return f"{SUMMARY_PROMPT}\n\n{previous}{format_transcript(history)}\n\nSummary:"
+
+
+class GeminiClient:
+    @staticmethod
+    def configured_key():
+        return (settings.GEMINI_API_KEY, settings.GEMINI_MODEL)
+
+    def __init__(self, api_key, model_name):
+        self.settings_key = (api_key, model_name)
+        self.api_key = api_key
+        self.model_name = model_name if model_name.startswith('models/') else f'models/{model_name}'
+        self.resolved_model = None
+        self.setup_timings = None
+        self._model = None
+        self._generation_config = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_label(self):
+        return self.resolved_model or self.model_name
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def ensure_ready(self):
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is None:
+                self._setup()
+
+    def _setup(self):
+        started = time.perf_counter()
+        try:
+            import google.generativeai as genai
+        except ImportError as exc:
+            raise ChatClientError(
+                'Gemini SDK not installed. Please install google-generativeai.'
+            ) from exc
+        imported = time.perf_counter()
+
+        if not self.api_key or self.api_key == PLACEHOLDER_API_KEY:
+            raise ChatClientError(
+                'Gemini API key not configured. Please set GEMINI_API_KEY in .env file.'
+            )
+        genai.configure(api_key=self.api_key)
+        configured = time.perf_counter()
+
+        try:
+            model = genai.GenerativeModel(self.model_name)
+            resolved = self.model_name
+        except Exception:
+            logger.warning('Gemini model %s unavailable, falling back to %s', self.model_name, FALLBACK_MODEL)
+            model = genai.GenerativeModel(FALLBACK_MODEL)
+            resolved = FALLBACK_MODEL
+        finished = time.perf_counter()
+
+        self._generation_config = genai.types.GenerationConfig(**GENERATION_CONFIG)
+        self.resolved_model = resolved
+        self.setup_timings = {
+            'importMs': round((imported - started) * 1000, 2),
+            'configureMs': round((configured - imported) * 1000, 2),
+            'modelMs': round((finished - configured) * 1000, 2),
+            'totalMs': round((finished - started) * 1000, 2),
+        }
+        self._model = model
+        logger.info('Gemini client ready (%s) in %.1f ms', resolved, self.setup_timings['totalMs'])
+
+    def _request_options(self, timeout):
+        return {'timeout': timeout} if timeout else None
+
+    @staticmethod
+    def _record_usage(response, usage):
+        metadata = getattr(response, 'usage_metadata', None)
+        if usage is not None and metadata:
+            usage['prompt_tokens'] = metadata.prompt_token_count
+            usage['output_tokens'] = metadata.candidates_token_count
+
+    def generate(self, prompt, timeout=None, usage=None):
+        """The reply text; token counts are written into usage if given"""
+        self.ensure_ready()
+        response = self._model.generate_content(
+            prompt,
+            generation_config=self._generation_config,
+            request_options=self._request_options(timeout),
+        )
+        self._record_usage(response, usage)
+        return response.text.strip()
+
+    def stream(self, prompt, timeout=None, usage=None):
+        """Yield text chunks as the model produces them"""
+        self.ensure_ready()
+        response = self._model.generate_content(
+            prompt,
+            generation_config=self._generation_config,
+            stream=True,
+            request_options=self._request_options(timeout),
+        )
+        for chunk in response:
+            # The final chunk carries the totals for the whole reply
+            self._record_usage(chunk, usage)
+            text = getattr(chunk, 'text', '')
+            if text:
+                yield text
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'model': self.model_label,
+            'setup': self.setup_timings,
+        }
+
@@ -0,0 +1,188 @@
+"""Deadlines, retries and a circuit breaker around chat model calls.
+
+Every call gets ``CHAT_TIMEOUT`` seconds. Transient failures (timeouts,
+rate limits, 5xx) are retried up to ``CHAT_RETRIES`` times with jittered
+exponential backoff starting at ``CHAT_RETRY_BACKOFF`` seconds. After
+``CHAT_BREAKER_THRESHOLD`` consecutive calls fail that way the breaker opens and
+calls fail at once with ``CircuitOpen`` for ``CHAT_BREAKER_COOLDOWN``
+seconds; then a single trial call decides whether it closes again.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# google.api_core exception names for failures worth retrying
+TRANSIENT_ERRORS = {
+    'DeadlineExceeded',
+    'GatewayTimeout',
+    'InternalServerError',
+    'ResourceExhausted',
+    'ServiceUnavailable',
+    'TooManyRequests',
+}
+
+
+class CircuitOpen(Exception):
+    """The model has been failing; calls are refused until the cooldown ends"""
+
+
+def is_transient(exc):
+    return isinstance(exc, (TimeoutError, ConnectionError)) or type(exc).__name__ in TRANSIENT_ERRORS
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold=None, cooldown=None):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+
+    @property
+    def threshold(self):
+        return self._threshold or settings.CHAT_BREAKER_THRESHOLD
+
+    @property
+    def cooldown(self):
+        return self._cooldown if self._cooldown is not None else settings.CHAT_BREAKER_COOLDOWN
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        """Whether a call may go ahead; after the cooldown only one trial call does"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.OPEN:
+                return False
+            now = time.monotonic()
+            # A trial that never reported back (e.g. a cancelled request) expires
+            if self._trial_started is None or now - self._trial_started >= self.cooldown:
+                self._trial_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_started is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning('Chat circuit breaker opened after %s failures', self.failures)
+                self.opened_at = time.monotonic()
+            self._trial_started = None
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutiveFailures': self.failures,
+        }
+
+
+breaker = CircuitBreaker()
+
+
+def retry_delay(attempt):
+    """Exponential backoff with full jitter, in seconds"""
+    return random.uniform(0, settings.CHAT_RETRY_BACKOFF * 2 ** attempt)
+
+
+def _before_call():
+    if not breaker.allow():
+        raise CircuitOpen('The chat model is unavailable; try again shortly.')
+
+
+def _after_failure(exc, attempt):
+    """Record a failed attempt; True if it should be retried"""
+    if not is_transient(exc):
+        # A rejected request or blocked reply says nothing about the model's
+        # health, so it surfaces as an error without counting toward the breaker
+        return False
+    if attempt < settings.CHAT_RETRIES:
+        logger.info('Transient chat model error, retrying (attempt %s): %s', attempt + 1, exc)
+        return True
+    breaker.record_failure()
+    return False
+
+
+def call(fn, *args, **kwargs):
+    """Run fn(*args, timeout=CHAT_TIMEOUT, **kwargs) with retries, blocking between them"""
+    _before_call()
+    attempt = 0
+    while True:
+        try:
+            result = fn(*args, timeout=settings.CHAT_TIMEOUT, **kwargs)
+        except Exception as exc:
+            if not _after_failure(exc, attempt):
+                raise
+            time.sleep(retry_delay(attempt))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall(fn, *args, **kwargs):
+    """call() for async views: fn runs in a worker thread, backoff does not block"""
+    _before_call()
+    attempt = 0
+    run = sync_to_async(fn, thread_sensitive=False)
+    while True:
+        try:
+            result = await run(*args, timeout=settings.CHAT_TIMEOUT, **kwargs)
+        except Exception as exc:
+            if not _after_failure(exc, attempt):
+                raise
+            await asyncio.sleep(retry_delay(attempt))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def aopen_stream(stream_fn, *args, end=None, **kwargs):
+    """Start stream_fn(*args, timeout=CHAT_TIMEOUT, **kwargs) and wait for its first chunk.
+
+    Only this part is retried: once chunks have been sent on, a failure cannot
+    be replayed. Returns (chunks, first chunk or end); the caller reports how
+    the rest of the stream went with breaker.record_success, or
+    record_failure if it broke off with a transient error.
+    """
+    _before_call()
+    attempt = 0
+    next_chunk = sync_to_async(next, thread_sensitive=False)
+    while True:
+        try:
+            chunks = iter(stream_fn(*args, timeout=settings.CHAT_TIMEOUT, **kwargs))
+            first = await next_chunk(chunks, end)
+        except Exception as exc:
+            if not _after_failure(exc, attempt):
+                raise
+            await asyncio.sleep(retry_delay(attempt))
+            attempt += 1
+            continue
+        return chunks, first
@@ -0,0 +1,114 @@
+"""Persistent cache of chat replies for frequently asked questions.
+
+Messages are keyed on a normalized form (case-folded, punctuation and
+whitespace collapsed) so "What is POCSO?" and "what is pocso" share one
+entry. Entries expire after ``CHAT_CACHE_TTL`` seconds and the least
+recently used ones are evicted beyond ``CHAT_CACHE_MAX_ENTRIES``. Rows live
+in the database, so the cache survives restarts and is shared by workers.
+"""
+import hashlib
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import ChatResponseCache
+
+_PUNCTUATION = re.compile(r'[^\w\s]+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_message(message):
+    text = _PUNCTUATION.sub(' ', message.casefold())
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def cache_key(normalized):
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return settings.CHAT_CACHE_ENABLED
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_rate(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, message):
+        """The cached reply for message, or None"""
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+        fresh_after = timezone.now() - timedelta(seconds=settings.CHAT_CACHE_TTL)
+        entry = (
+            ChatResponseCache.objects.filter(key=cache_key(normalized), created_at__gte=fresh_after)
+            .only('id', 'response')
+            .first()
+        )
+        self._count(entry is not None)
+        if entry is None:
+            return None
+        ChatResponseCache.objects.filter(id=entry.id).update(
+            hits=F('hits') + 1,
+            last_used_at=timezone.now(),
+        )
+        return entry.response
+
+    def store(self, message, response):
+        normalized = normalize_message(message)
+        if not normalized or not response:
+            return
+        now = timezone.now()
+        try:
+            ChatResponseCache.objects.update_or_create(
+                key=cache_key(normalized),
+                defaults={
+                    'normalized_message': normalized,
+                    'response': response,
+                    'created_at': now,
+                    'last_used_at': now,
+                },
+            )
+        except IntegrityError:
+            # Another worker cached the same question concurrently
+            return
+        self._evict()
+
+    def _evict(self):
+        stale = ChatResponseCache.objects.order_by('-last_used_at', '-id').values_list('id', flat=True)
+        stale_ids = list(stale[settings.CHAT_CACHE_MAX_ENTRIES:])
+        expired_before = timezone.now() - timedelta(seconds=settings.CHAT_CACHE_TTL)
+        ChatResponseCache.objects.filter(id__in=stale_ids).delete()
+        ChatResponseCache.objects.filter(created_at__lt=expired_before).delete()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache()
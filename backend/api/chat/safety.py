@@ -0,0 +1,142 @@
+"""Keyword-based emotion and safety detection for chat messages.
+
+Keywords live in ``safety_keywords.json`` grouped by category and language:
+``concern`` words only tag a message as concerned, ``disclosure`` phrases
+escalate it, and ``negative`` words grade everything else.
+At import time they are folded into one trie-shaped regex, so a message is
+scanned once in C and the cost barely grows as languages are added. Keywords
+match whole words only ("pain" does not fire on "painting"); a trailing
+``*`` matches any word starting with the stem ("abus*" covers "abuse",
+"abused" and "abusive"), and multi-word keywords match consecutive words.
+"""
+import functools
+import json
+import re
+from pathlib import Path
+
+KEYWORDS_FILE = Path(__file__).with_name('safety_keywords.json')
+
+# Devanagari to Kannada (and neighbouring Indic blocks) count as word
+# characters: their vowel signs are not \w, so \b would split words.
+_WORD_CHAR = r'[\w\u0900-\u0dff]'
+_STEM = '*'
+_END = ''
+
+
+def _trie_pattern(keywords):
+    root = {}
+    for keyword in keywords:
+        node = root
+        for char in keyword.rstrip(_STEM):
+            node = node.setdefault(char, {})
+        node[_STEM if keyword.endswith(_STEM) else _END] = True
+
+    def emit(node):
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items())
+            if char not in (_STEM, _END)
+        ]
+        if _STEM in node:
+            branches.append(f'{_WORD_CHAR}*')
+        elif _END in node:
+            branches.append('')
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return emit(root)
+
+
+class KeywordMatcher:
+    """Counts distinct keywords per category in a single regex pass"""
+
+    def __init__(self, keywords_by_category):
+        categories_by_keyword = {}
+        for category, by_language in keywords_by_category.items():
+            for keywords in by_language.values():
+                for keyword in keywords:
+                    keyword = ' '.join(keyword.casefold().split())
+                    categories_by_keyword.setdefault(keyword, set()).add(category)
+
+        self.categories = frozenset(keywords_by_category)
+        self._categories = {k: frozenset(v) for k, v in categories_by_keyword.items()}
+        self._stems = {k[:-1]: k for k in categories_by_keyword if k.endswith(_STEM)}
+        self._stem_lengths = sorted({len(stem) for stem in self._stems}, reverse=True)
+        self._regex = re.compile(
+            f'(?<!{_WORD_CHAR})(?:{_trie_pattern(categories_by_keyword)})(?!{_WORD_CHAR})'
+        )
+        # Matched words repeat across messages, so remember what they resolve to
+        self._resolve = functools.lru_cache(maxsize=4096)(self._keywords_for)
+
+    @classmethod
+    def from_file(cls, path=KEYWORDS_FILE):
+        with open(path, encoding='utf-8') as fh:
+            return cls(json.load(fh))
+
+    def _keywords_for(self, matched):
+        # A phrase match also counts the single-word keywords it contains
+        words = matched.split()
+        candidates = [' '.join(words)] + (words if len(words) > 1 else [])
+        keywords = []
+        for text in candidates:
+            if text in self._categories:
+                keywords.append(text)
+            for length in self._stem_lengths:
+                stem = self._stems.get(text[:length]) if length <= len(text) else None
+                if stem is not None:
+                    keywords.append(stem)
+        return tuple(keywords)
+
+    def count(self, text):
+        """Number of distinct keywords found per category"""
+        found = {
+            keyword
+            for matched in self._regex.findall(text.casefold())
+            for keyword in self._resolve(matched)
+        }
+        counts = dict.fromkeys(self.categories, 0)
+        for keyword in found:
+            for category in self._categories[keyword]:
+                counts[category] += 1
+        return counts
+
+
+matcher = KeywordMatcher.from_file()
+
+
+def detect_emotion(text):
+    """Detect emotion from text.
+
+    Concern words ("touch", "scared", "private") tag a message as concerned
+    so the reply can be gentle, but only a disclosure phrase ("touched me",
+    "hurts me", "want to die") sets hasSafetyConcern and escalates it:
+    children ask what safe touch is far more often than they report harm.
+    """
+    counts = matcher.count(text)
+    concern_count = counts['concern']
+    disclosure_count = counts['disclosure']
+    negative_count = counts['negative']
+
+    if concern_count > 0 or disclosure_count > 0:
+        return {
+            'emotion': 'concerned',
+            'level': min(max(concern_count, disclosure_count) * 2, 10),
+            'hasSafetyConcern': disclosure_count > 0
+        }
+    elif negative_count > 2:
+        return {
+            'emotion': 'negative',
+            'level': min(negative_count, 10),
+            'hasSafetyConcern': False
+        }
+    elif negative_count > 0:
+        return {
+            'emotion': 'slightly_negative',
+            'level': negative_count,
+            'hasSafetyConcern': False
+        }
+
+    return {
+        'emotion': 'neutral',
+        'level': 0,
+        'hasSafetyConcern': False
+    }
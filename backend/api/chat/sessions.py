@@ -0,0 +1,119 @@
+"""Persisted chat sessions with a bounded prompt context.
+
+A prompt carries the session summary plus at most ``CHAT_CONTEXT_TURNS``
+exchanges, however long the conversation. Once twice that many messages
+are waiting outside the summary, the older ones are folded into it by one
+background model call. Each message is summarised once, and the result is
+stored on the session.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from ..models import ChatMessage, ChatSession, ChatUsage
+from . import resilience
+from .backends import get_client
+from .gemini import build_summary_prompt
+from .usage import UsageRecorder
+
+logger = logging.getLogger(__name__)
+
+_summaries = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-summary')
+
+
+def window_size():
+    """Messages kept verbatim in the prompt"""
+    return settings.CHAT_CONTEXT_TURNS * 2
+
+
+def open_session(session_id):
+    """(session, created): the session with session_id, or a new one"""
+    if session_id:
+        try:
+            session = ChatSession.objects.filter(id=session_id).first()
+        except ValidationError:
+            session = None
+        if session is not None:
+            return session, False
+    return ChatSession.objects.create(), True
+
+
+@transaction.atomic
+def start_turn(session_id, message):
+    """Open the session, read its context and record the user's message.
+
+    Returns (session, summary, history) where history holds the most recent
+    (role, content) pairs, oldest first, not counting message.
+    """
+    session, created = open_session(session_id)
+    history = []
+    if not created:
+        recent = (
+            ChatMessage.objects.filter(session=session, id__gt=session.summarized_through)
+            .order_by('-id')
+            .values_list('role', 'content')[:window_size()]
+        )
+        history = list(reversed(recent))
+    ChatMessage.objects.create(session=session, role=ChatMessage.ROLE_USER, content=message)
+    return session, session.summary, history
+
+
+@transaction.atomic
+def finish_turn(session, reply):
+    """Record Sparkle's reply and fold old turns into the summary when due"""
+    last = ChatMessage.objects.create(session=session, role=ChatMessage.ROLE_MODEL, content=reply)
+    ChatSession.objects.filter(id=session.id).update(updated_at=timezone.now())
+    window = window_size()
+    waiting = ChatMessage.objects.filter(session=session, id__gt=session.summarized_through).count()
+    # Queue a summary when the backlog reaches two windows, and again at each
+    # further window while it keeps failing, rather than on every turn
+    if waiting >= window * 2 and (waiting - 2) // window < waiting // window:
+        transaction.on_commit(partial(_summaries.submit, summarize_session, session.id, last.id))
+
+
+def summarize_session(session_id, through_id):
+    """Fold messages older than the context window into the session summary"""
+    try:
+        session = ChatSession.objects.get(id=session_id)
+        keep_from = (
+            ChatMessage.objects.filter(session=session, id__lte=through_id)
+            .order_by('-id')
+            .values_list('id', flat=True)[window_size() - 1:window_size()]
+        )
+        older = list(
+            ChatMessage.objects.filter(
+                session=session,
+                id__gt=session.summarized_through,
+                id__lt=keep_from[0] if keep_from else 0,
+            ).values_list('id', 'role', 'content')
+        )
+        if not older:
+            return
+        usage = UsageRecorder('summary')
+        try:
+            client = get_client()
+            client.ensure_ready()
+            usage.model = client.model_label
+            summary = resilience.call(
+                client.generate,
+                build_summary_prompt(session.summary, [(role, content) for _, role, content in older]),
+                usage=usage.tokens,
+            )
+        except Exception as exc:
+            usage.save(ChatUsage.OUTCOME_ERROR, exc)
+            raise
+        usage.save(ChatUsage.OUTCOME_MODEL)
+        # Only the first of two overlapping summaries for a session wins
+        ChatSession.objects.filter(id=session_id, summarized_through=session.summarized_through).update(
+            summary=summary,
+            summarized_through=older[-1][0],
+        )
+    except Exception:
+        logger.exception('Summarising chat session %s failed', session_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,7 @@
+"""Server-sent event framing for streamed chat replies"""
+import json
+
+
+def sse_event(event, data):
+    payload = json.dumps(data, separators=(',', ':'))
+    return f'event: {event}\ndata: {payload}\n\n'.encode('utf-8')
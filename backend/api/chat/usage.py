@@ -0,0 +1,114 @@
+"""Per-request accounting for the chat endpoints and its roll-ups."""
+import logging
+import time
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import ChatUsage
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class UsageRecorder:
+    """Times one chat request or background model call and saves it as a ChatUsage row.
+
+    ``tokens`` is handed to the backend as its ``usage`` dict, which fills in
+    prompt_tokens and output_tokens.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.model = ''
+        self.tokens = {}
+        self.first_token_ms = None
+        self._started = time.perf_counter()
+
+    def _elapsed_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 2)
+
+    def first_token(self):
+        """Mark the moment the first reply text was ready to send"""
+        if self.first_token_ms is None:
+            self.first_token_ms = self._elapsed_ms()
+
+    def save(self, outcome, error=None):
+        try:
+            ChatUsage.objects.create(
+                endpoint=self.endpoint,
+                model=str(self.model or '')[:64],
+                outcome=outcome,
+                prompt_tokens=self.tokens.get('prompt_tokens'),
+                output_tokens=self.tokens.get('output_tokens'),
+                first_token_ms=self.first_token_ms,
+                latency_ms=self._elapsed_ms(),
+                cache_hit=outcome == ChatUsage.OUTCOME_CACHE,
+                error_class=type(error).__name__ if error is not None else '',
+            )
+        except DatabaseError:
+            # Accounting must never cost the child their reply
+            logger.exception('Could not record chat usage')
+
+
+def percentiles(queryset, field):
+    """p50/p95/p99 of field, read with one OFFSET query each"""
+    values = queryset.filter(**{f'{field}__isnull': False}).order_by(field).values_list(field, flat=True)
+    count = values.count()
+    return {
+        f'p{round(fraction * 100)}': values[min(int(count * fraction), count - 1)] if count else None
+        for fraction in PERCENTILES
+    }
+
+
+def usage_summary(days):
+    since = timezone.now() - timedelta(days=days)
+    usage = ChatUsage.objects.filter(created_at__gte=since)
+    calls = usage.count()
+    cache_hits = usage.filter(cache_hit=True).count()
+
+    daily = (
+        usage.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(calls=Count('id'), prompt=Sum('prompt_tokens'), output=Sum('output_tokens'))
+        .order_by('day')
+    )
+    by_model = (
+        usage.exclude(model='')
+        .values('model')
+        .annotate(calls=Count('id'), prompt=Sum('prompt_tokens'), output=Sum('output_tokens'))
+        .order_by('-calls')
+    )
+    return {
+        'since': since.isoformat(),
+        'calls': calls,
+        'cacheHitRate': round(cache_hits / calls, 4) if calls else 0.0,
+        'byOutcome': dict(usage.values_list('outcome').annotate(count=Count('id')).order_by()),
+        'errors': dict(
+            usage.exclude(error_class='').values_list('error_class').annotate(count=Count('id')).order_by()
+        ),
+        'latencyMs': percentiles(usage, 'latency_ms'),
+        'firstTokenMs': percentiles(usage, 'first_token_ms'),
+        'daily': [
+            {
+                'date': row['day'].isoformat(),
+                'calls': row['calls'],
+                'promptTokens': row['prompt'] or 0,
+                'outputTokens': row['output'] or 0,
+            }
+            for row in daily
+        ],
+        'byModel': [
+            {
+                'model': row['model'],
+                'calls': row['calls'],
+                'promptTokens': row['prompt'] or 0,
+                'outputTokens': row['output'] or 0,
+            }
+            for row in by_model
+        ],
+    }
@@ -0,0 +1,30 @@
+"""Conditional GET helpers (ETag / Last-Modified / 304) for JSON endpoints"""
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def body_etag(body):
+    """Strong ETag derived from the serialized response body"""
+    return quote_etag(hashlib.sha256(body).hexdigest()[:32])
+
+
+def conditional_json(request, body, etag=None, last_modified=None, max_age=60):
+    """Serve JSON bytes, answering 304 when the client's validators still match.
+
+    last_modified is a Unix timestamp; etag defaults to a hash of the body.
+    """
+    etag = etag or body_etag(body)
+    response = HttpResponse(body, content_type='application/json')
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=max_age)
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified) if last_modified is not None else None,
+        response=response,
+    )
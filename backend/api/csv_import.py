@@ -0,0 +1,141 @@
+"""Streaming helpers for the CSV import command.
+
+Rows are read lazily together with the byte offset just past them, so an
+import can commit in batches and record how far it got. The checkpoint is
+written inside each batch's transaction together with the row count the
+table should have once it commits; on resume, comparing that count with
+the table tells whether the last batch made it or must be read again.
+"""
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import CommandError
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def read_csv_rows(path, start=0):
+    """Yield (row dict, byte offset after the row), beginning at byte start.
+
+    start must be 0 or an offset previously yielded for the same file.
+    """
+    with open(path, 'rb') as f:
+        fieldnames = next(csv.reader([f.readline().decode('utf-8-sig')]), [])
+        if start:
+            f.seek(start)
+        position = f.tell()
+
+        def lines():
+            nonlocal position
+            for line in iter(f.readline, b''):
+                position += len(line)
+                yield line.decode('utf-8')
+
+        # csv.reader pulls only the lines each record needs, so position is
+        # the end of the record just returned, even for quoted newlines
+        for values in csv.reader(lines()):
+            if values:
+                yield dict(zip(fieldnames, values)), position
+
+
+class Checkpoint:
+    """How far a streamed import got, kept in a small JSON file"""
+
+    def __init__(self, path, state=None):
+        self.path = path
+        self.state = state or {'prepared': False, 'files': {}}
+
+    @classmethod
+    def load(cls, path):
+        """The saved checkpoint at path, or None if there is none"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(path, json.load(f))
+        except FileNotFoundError:
+            return None
+
+    @property
+    def prepared(self):
+        return self.state['prepared']
+
+    def mark_prepared(self):
+        self.state['prepared'] = True
+        self.save()
+
+    def is_done(self, name):
+        return self.state['files'].get(name, {}).get('done', False)
+
+    def position(self, name, table_count):
+        """(byte offset, row count) to resume name from, given the table's current count"""
+        entry = self.state['files'].get(name)
+        if entry is None:
+            return 0, 0
+        for offset, count in ((entry['offset'], entry['count']), entry['previous']):
+            if count == table_count:
+                return offset, count
+        raise CommandError(
+            f'{name}: the table has {table_count} rows but the checkpoint expects {entry["count"]}; '
+            'it was changed since the interrupted import. Run again without --resume.'
+        )
+
+    def advance(self, name, offset, count):
+        entry = self.state['files'].setdefault(name, {'offset': 0, 'count': 0})
+        entry['previous'] = [entry['offset'], entry['count']]
+        entry['offset'] = offset
+        entry['count'] = count
+        self.save()
+
+    def mark_done(self, name):
+        self.state['files'].setdefault(name, {'offset': 0, 'count': 0, 'previous': [0, 0]})['done'] = True
+        self.save()
+
+    def save(self):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(temporary, self.path)
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class Progress:
+    """Reports rows processed and throughput every `interval` seconds"""
+
+    def __init__(self, stdout, style, label, interval=5.0):
+        self.stdout = stdout
+        self.style = style
+        self.label = label
+        self.interval = interval
+        self.rows = 0
+        self._started = self._reported = time.monotonic()
+
+    def _rate(self, now):
+        elapsed = now - self._started
+        return self.rows / elapsed if elapsed else 0.0
+
+    def add(self, rows):
+        self.rows += rows
+        now = time.monotonic()
+        if now - self._reported >= self.interval:
+            self._reported = now
+            self.stdout.write(f'  .. {self.label}: {self.rows:,} rows ({self._rate(now):,.0f} rows/s)')
+
+    def finish(self):
+        now = time.monotonic()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'  -> {self.label}: {self.rows:,} rows in {now - self._started:.1f}s '
+                f'({self._rate(now):,.0f} rows/s)'
+            )
+        )
@@ -0,0 +1,87 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.chat.safety import KEYWORDS_FILE, KeywordMatcher, detect_emotion
+
+SAMPLE_MESSAGES = [
+    'Hi Sparkle! What is POCSO?',
+    'I made a painting of my family today and it was fun',
+    'Someone touched me and I feel scared and alone',
+    'My friend is sad and angry because his uncle hurts him',
+    'Can you tell me what a safe touch is?',
+    'mujhe डर लगता है aur main udaas hoon',
+    'ನನಗೆ ಭಯವಾಗುತ್ತಿದೆ',
+    'I had a terrible, horrible, awful day at school ' * 4,
+]
+
+
+def legacy_detect_emotion(text):
+    """The substring matcher detect_emotion replaced, kept for comparison"""
+    lower_text = text.lower()
+    safety_keywords = [
+        'abuse', 'hurt', 'unsafe', 'danger', 'dangerous', 'threat',
+        'scared', 'afraid', 'touch', 'private', 'sex', 'sexual',
+        'harm', 'pain', 'kill', 'suicide'
+    ]
+    negative_keywords = [
+        'sad', 'scared', 'afraid', 'hurt', 'pain', 'cry', 'crying',
+        'hate', 'angry', 'mad', 'frustrated', 'worried', 'anxious',
+        'lonely', 'alone', 'bad', 'terrible', 'awful', 'horrible'
+    ]
+    safety_count = sum(1 for keyword in safety_keywords if keyword in lower_text)
+    negative_count = sum(1 for keyword in negative_keywords if keyword in lower_text)
+    if safety_count > 0:
+        return {'emotion': 'concerned', 'level': min(safety_count * 2, 10), 'hasSafetyConcern': True}
+    elif negative_count > 2:
+        return {'emotion': 'negative', 'level': min(negative_count, 10), 'hasSafetyConcern': False}
+    elif negative_count > 0:
+        return {'emotion': 'slightly_negative', 'level': negative_count, 'hasSafetyConcern': False}
+    return {'emotion': 'neutral', 'level': 0, 'hasSafetyConcern': False}
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark detect_emotion against the legacy substring matcher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000,
+                            help='Calls per implementation (default: 20000)')
+        parser.add_argument('--extra-keywords', type=int, default=500,
+                            help='Synthetic keywords added for the scaling run (default: 500)')
+
+    def _time(self, label, detect, iterations):
+        started = time.perf_counter()
+        for i in range(iterations):
+            detect(SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label:>9}: {elapsed * 1e6 / iterations:.2f} µs/call')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        self.stdout.write('Shipped keyword lists:')
+        self._time('legacy', legacy_detect_emotion, iterations)
+        self._time('compiled', detect_emotion, iterations)
+
+        # Same keywords plus synthetic ones, as if more languages were added
+        with open(KEYWORDS_FILE, encoding='utf-8') as fh:
+            keywords = json.load(fh)
+        extra = [f'kw{n}x' for n in range(options['extra_keywords'])]
+        keywords['concern']['synthetic'] = extra
+        flat = [k.rstrip('*') for by_language in keywords.values() for words in by_language.values() for k in words]
+        matcher = KeywordMatcher(keywords)
+
+        self.stdout.write(f'\nWith {len(flat)} keywords:')
+        self._time('legacy', lambda text: [k for k in flat if k in text.lower()], iterations)
+        self._time('compiled', matcher.count, iterations)
+
+        self.stdout.write('\nVerdicts (legacy -> compiled):')
+        for message in SAMPLE_MESSAGES:
+            old, new = legacy_detect_emotion(message), detect_emotion(message)
+            marker = ' ' if old == new else '*'
+            self.stdout.write(
+                f"{marker} {message[:48]!r}: {old['emotion']}/{old['level']} -> "
+                f"{new['emotion']}/{new['level']}"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -1,13 +1,16 @@
 import csv
 import json
+from collections import Counter
+from contextlib import nullcontext
 from datetime import date
 from pathlib import Path
 
-from django.contrib.auth.hashers import make_password
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.utils import timezone
 
+from api.accounts import default_workers, upsert_registrations
+from api.csv_import import Checkpoint, Progress, batched, read_csv_rows
 from api.models import (
     Article,
     LoginAttempt,
@@ -17,6 +20,8 @@ from api.models import (
     QuizAttempt,
     RegistrationRequest,
 )
+from api.quiz_cache import quiz_catalogue
+from api.quiz_sync import describe_changes, sync_quiz
 
 # Get the project root directory
 # This file is at: projectpro/backend/api/management/commands/load_csv_data.py
@@ -24,38 +29,106 @@ from api.models import (
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
 DATA_DIR = PROJECT_ROOT / 'data'
 
+# Rows built in memory and written per bulk query (and, with --stream,
+# committed per transaction)
+BATCH_SIZE = 2000
+CHECKPOINT_NAME = '.load_csv_data.checkpoint.json'
+
+USER_METADATA_FIELDS = (
+    'childEmail',
+    'city',
+    'preferredLanguage',
+    'school',
+    'gradeRange',
+    'organization',
+    'region',
+)
+ARTICLE_FIELDS = ('title', 'summary', 'category', 'published_at', 'source_url')
+
 
 class Command(BaseCommand):
     help = 'Load data from CSV files into the database'
 
+    batch_size = BATCH_SIZE
+    checkpoint = None
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--purge',
             action='store_true',
             help='Delete previously seeded data before creating new records.',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=default_workers(),
+            help='Processes used to hash user passwords (default: one per CPU)',
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Commit login and quiz attempts batch by batch and record a checkpoint, '
+                 'instead of importing everything in one transaction.',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue an interrupted --stream import from its checkpoint (implies --stream).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Rows per batch (default: {BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help=f'Checkpoint file for --stream (default: {CHECKPOINT_NAME} in the data directory)',
+        )
 
     def handle(self, *args, **options):
         purge = options['purge']
+        stream = options['stream'] or options['resume']
+        self.batch_size = options['batch_size']
 
         if not DATA_DIR.exists():
             self.stdout.write(
                 self.style.ERROR(f'Data directory not found: {DATA_DIR}')
             )
             return
-
-        with transaction.atomic():
-            if purge:
-                self._purge_seeded_data()
-
-            self.stdout.write('Loading quiz data from JSON...')
-            self._load_quiz_data()
-
-            self.stdout.write('Loading users from CSV...')
-            self._load_users()
-
-            self.stdout.write('Loading articles from CSV...')
-            self._load_articles()
+        if options['resume'] and purge:
+            raise CommandError('--resume cannot be combined with --purge.')
+
+        self.checkpoint = None
+        if stream:
+            checkpoint_path = options['checkpoint'] or DATA_DIR / CHECKPOINT_NAME
+            if options['resume']:
+                self.checkpoint = Checkpoint.load(checkpoint_path)
+                if self.checkpoint is None:
+                    self.stdout.write(self.style.WARNING('No checkpoint found; starting from the beginning.'))
+            if self.checkpoint is None:
+                self.checkpoint = Checkpoint(checkpoint_path)
+
+        # Without --stream everything is one transaction; with it, each
+        # stage below and each batch of attempts commits on its own
+        with nullcontext() if stream else transaction.atomic():
+            if self.checkpoint and self.checkpoint.prepared:
+                self.stdout.write('Quiz data, users and articles were loaded before the interruption.')
+            else:
+                with transaction.atomic():
+                    if purge:
+                        self._purge_seeded_data()
+
+                    self.stdout.write('Loading quiz data from JSON...')
+                    self._load_quiz_data()
+
+                    self.stdout.write('Loading users from CSV...')
+                    self._load_users(options['workers'])
+
+                    self.stdout.write('Loading articles from CSV...')
+                    self._load_articles()
+                if self.checkpoint:
+                    self.checkpoint.mark_prepared()
 
             self.stdout.write('Loading login attempts from CSV...')
             self._load_login_attempts()
@@ -63,8 +136,52 @@ class Command(BaseCommand):
             self.stdout.write('Loading quiz attempts from CSV...')
             self._load_quiz_attempts()
 
+        if self.checkpoint:
+            self.checkpoint.delete()
+
+        # Tell running servers to drop their cached catalogue
+        quiz_catalogue.invalidate()
+
         self.stdout.write(self.style.SUCCESS('✅ All data loaded successfully!'))
 
+    def _import_rows(self, file_name, model, reset, write_batch):
+        """Feed file_name to write_batch in batches and return the rows read.
+
+        write_batch(rows) writes one batch and returns how many model rows
+        it created. reset() clears the table before a fresh (not resumed)
+        import. Returns None if the file is missing.
+        """
+        path = DATA_DIR / file_name
+        if not path.exists():
+            self.stdout.write(
+                self.style.WARNING(f'File not found: {path}')
+            )
+            return None
+        if self.checkpoint and self.checkpoint.is_done(file_name):
+            self.stdout.write(f'  -> {file_name} was loaded before the interruption.')
+            return 0
+
+        start, count = (0, 0)
+        if self.checkpoint:
+            start, count = self.checkpoint.position(file_name, model.objects.count())
+        if start:
+            self.stdout.write(f'  -> Resuming {file_name} at byte {start:,} ({count:,} rows loaded)')
+        else:
+            reset()
+
+        progress = Progress(self.stdout, self.style, file_name)
+        for batch in batched(read_csv_rows(path, start), self.batch_size):
+            with transaction.atomic():
+                count += write_batch([row for row, _ in batch])
+                if self.checkpoint:
+                    # Saved before the commit, with the count that proves it happened
+                    self.checkpoint.advance(file_name, batch[-1][1], count)
+            progress.add(len(batch))
+        progress.finish()
+        if self.checkpoint:
+            self.checkpoint.mark_done(file_name)
+        return progress.rows
+
     def _purge_seeded_data(self):
         self.stdout.write('Purging existing data...')
         QuestionResponse.objects.all().delete()
@@ -88,38 +205,12 @@ class Command(BaseCommand):
             quiz_data = json.load(f)
 
         for level_data in quiz_data:
-            quiz, created = Quiz.objects.get_or_create(
-                level=level_data['level'],
-                defaults={
-                    'title': level_data['title'],
-                    'badge_name': level_data['badgeName'],
-                }
-            )
-
-            if not created:
-                quiz.title = level_data['title']
-                quiz.badge_name = level_data['badgeName']
-                quiz.save()
-
-            # Delete existing questions and recreate them
-            Question.objects.filter(quiz=quiz).delete()
-
-            for idx, question_data in enumerate(level_data['questions']):
-                Question.objects.create(
-                    quiz=quiz,
-                    question_text=question_data['q'],
-                    options=question_data['options'],
-                    correct_answer=question_data['correct'],
-                    order=idx,
-                )
-
+            quiz, changes = sync_quiz(level_data)
             self.stdout.write(
-                self.style.SUCCESS(
-                    f'  -> Loaded {len(level_data["questions"])} questions for {quiz.title}'
-                )
+                self.style.SUCCESS(f'  -> {quiz.title}: {describe_changes(changes)}')
             )
 
-    def _load_users(self):
+    def _load_users(self, workers):
         users_file = DATA_DIR / 'users.csv'
         if not users_file.exists():
             self.stdout.write(
@@ -128,39 +219,23 @@ class Command(BaseCommand):
             return
 
         with open(users_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            count = 0
-            for row in reader:
-                metadata = {}
-                if row.get('childEmail'):
-                    metadata['childEmail'] = row['childEmail']
-                if row.get('city'):
-                    metadata['city'] = row['city']
-                if row.get('preferredLanguage'):
-                    metadata['preferredLanguage'] = row['preferredLanguage']
-                if row.get('school'):
-                    metadata['school'] = row['school']
-                if row.get('gradeRange'):
-                    metadata['gradeRange'] = row['gradeRange']
-                if row.get('organization'):
-                    metadata['organization'] = row['organization']
-                if row.get('region'):
-                    metadata['region'] = row['region']
-
-                RegistrationRequest.objects.update_or_create(
-                    email=row['email'],
-                    defaults={
-                        'role': row['role'],
-                        'full_name': row['full_name'],
-                        'password_hash': make_password(row['password']),
-                        'metadata': metadata,
-                    },
-                )
-                count += 1
+            users = [
+                {
+                    'role': row['role'],
+                    'full_name': row['full_name'],
+                    'email': row['email'],
+                    'password': row['password'],
+                    'metadata': {field: row[field] for field in USER_METADATA_FIELDS if row.get(field)},
+                }
+                for row in csv.DictReader(f)
+            ]
 
-            self.stdout.write(
-                self.style.SUCCESS(f'  -> Loaded {count} users')
+        created, updated = upsert_registrations(users, workers)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'  -> Loaded {created + updated} users ({created} new, {updated} updated)'
             )
+        )
 
     def _load_articles(self):
         articles_file = DATA_DIR / 'articles.csv'
@@ -171,38 +246,33 @@ class Command(BaseCommand):
             return
 
         with open(articles_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            count = 0
-            for row in reader:
-                Article.objects.update_or_create(
+            articles = {
+                row['slug']: Article(
                     slug=row['slug'],
-                    defaults={
-                        'title': row['title'],
-                        'summary': row['summary'],
-                        'category': row['category'],
-                        'published_at': date.fromisoformat(row['published_at']),
-                        'source_url': row['source_url'],
-                    },
+                    title=row['title'],
+                    summary=row['summary'],
+                    category=row['category'],
+                    published_at=date.fromisoformat(row['published_at']),
+                    source_url=row['source_url'],
                 )
-                count += 1
-
-            self.stdout.write(
-                self.style.SUCCESS(f'  -> Loaded {count} articles')
-            )
+                for row in csv.DictReader(f)
+            }
+
+        Article.objects.bulk_create(
+            articles.values(),
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=ARTICLE_FIELDS,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'  -> Loaded {len(articles)} articles')
+        )
 
     def _load_login_attempts(self):
-        login_file = DATA_DIR / 'login_attempts.csv'
-        if not login_file.exists():
-            self.stdout.write(
-                self.style.WARNING(f'Login attempts file not found: {login_file}')
-            )
-            return
-
-        with open(login_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            LoginAttempt.objects.all().delete()
+        def write_batch(rows):
             attempts = []
-            for row in reader:
+            for row in rows:
                 payload = {'identifier': row['identifier']}
                 metadata = {}
                 if row.get('device'):
@@ -221,83 +291,105 @@ class Command(BaseCommand):
                         payload=payload,
                     )
                 )
-
             LoginAttempt.objects.bulk_create(attempts)
-            self.stdout.write(
-                self.style.SUCCESS(f'  -> Loaded {len(attempts)} login attempts')
-            )
+            return len(attempts)
+
+        self._import_rows(
+            'login_attempts.csv',
+            LoginAttempt,
+            reset=LoginAttempt.objects.all().delete,
+            write_batch=write_batch,
+        )
 
     def _load_quiz_attempts(self):
-        attempts_file = DATA_DIR / 'quiz_attempts.csv'
-        if not attempts_file.exists():
-            self.stdout.write(
-                self.style.WARNING(f'Quiz attempts file not found: {attempts_file}')
+        # level -> (quiz, its questions in order, the wrong answer for each)
+        quizzes = {}
+        for quiz in Quiz.objects.prefetch_related('questions'):
+            questions = sorted(quiz.questions.all(), key=lambda question: question.order)
+            quizzes[quiz.level] = (
+                quiz,
+                questions,
+                [self._pick_incorrect_option(question) for question in questions],
             )
-            return
+        completed_at = timezone.now()
+        loaded = Counter()
+        skipped = Counter()
+        already_open = Counter()
 
-        with open(attempts_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+        def reset():
             QuestionResponse.objects.all().delete()
             QuizAttempt.objects.all().delete()
 
-            for row in reader:
-                quiz = Quiz.objects.filter(level=int(row['quiz_level'])).first()
-                if not quiz:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'  -> Skipping level {row["quiz_level"]}; quiz missing.'
-                        )
-                    )
+        def write_batch(rows):
+            attempts = []
+            answered = []
+            # A child may have only one open attempt per quiz
+            open_attempts = set(
+                QuizAttempt.objects.filter(
+                    child_email__in={row['child_email'] for row in rows},
+                    is_completed=False,
+                ).values_list('child_email', 'quiz_id')
+            )
+            for row in rows:
+                level = int(row['quiz_level'])
+                if level not in quizzes:
+                    skipped[level] += 1
                     continue
-
-                total_questions = quiz.questions.count()
-                answered_count = min(
-                    int(row.get('answered_questions', total_questions)),
-                    total_questions
-                )
-                correct_count = min(
-                    int(row.get('correct_answers', 0)),
-                    answered_count
-                )
+                quiz, questions, wrong_answers = quizzes[level]
+                total_questions = len(questions)
+                answered_count = min(int(row.get('answered_questions', total_questions)), total_questions)
+                correct_count = min(int(row.get('correct_answers', 0)), answered_count)
                 is_completed = row.get('mark_completed', 'false').lower() == 'true'
-
-                attempt = QuizAttempt.objects.create(
+                if not is_completed:
+                    if (row['child_email'], quiz.id) in open_attempts:
+                        already_open[level] += 1
+                        continue
+                    open_attempts.add((row['child_email'], quiz.id))
+                attempt = QuizAttempt(
                     child_email=row['child_email'],
                     quiz=quiz,
                     total_questions=total_questions,
-                    score=0,
+                    score=correct_count,
                     is_completed=is_completed,
-                    completed_at=timezone.now() if is_completed else None,
+                    completed_at=completed_at if is_completed else None,
                 )
-
-                questions = list(quiz.questions.order_by('order'))
+                attempts.append(attempt)
+                answered.append((attempt, questions, wrong_answers, answered_count))
+                loaded[level] += 1
+
+            # SQLite returns the new ids, so responses can point at them
+            QuizAttempt.objects.bulk_create(attempts, batch_size=self.batch_size)
+            responses = []
+            for attempt, questions, wrong_answers, answered_count in answered:
                 for idx in range(answered_count):
-                    question = questions[idx]
-                    is_correct = idx < correct_count
-                    selected_answer = (
-                        question.correct_answer
-                        if is_correct
-                        else self._pick_incorrect_option(question)
-                    )
-
-                    QuestionResponse.objects.create(
-                        attempt=attempt,
-                        question=question,
-                        selected_answer=selected_answer,
-                        is_correct=is_correct,
+                    is_correct = idx < attempt.score
+                    responses.append(
+                        QuestionResponse(
+                            attempt_id=attempt.id,
+                            question_id=questions[idx].id,
+                            selected_answer=questions[idx].correct_answer if is_correct else wrong_answers[idx],
+                            is_correct=is_correct,
+                        )
                     )
+            QuestionResponse.objects.bulk_create(responses, batch_size=self.batch_size)
+            return len(attempts)
 
-                attempt.score = correct_count
-                if attempt.is_completed and attempt.completed_at is None:
-                    attempt.completed_at = timezone.now()
-                attempt.save(update_fields=['score', 'completed_at'])
+        self._import_rows('quiz_attempts.csv', QuizAttempt, reset=reset, write_batch=write_batch)
 
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'  -> {attempt.child_email} | Level {quiz.level} | '
-                        f'{correct_count}/{answered_count} answered'
-                    )
+        for level, count in sorted(skipped.items()):
+            self.stdout.write(
+                self.style.WARNING(f'  -> Skipped {count} attempts for level {level}; quiz missing.')
+            )
+        for level, count in sorted(already_open.items()):
+            self.stdout.write(
+                self.style.WARNING(
+                    f'  -> Skipped {count} unfinished attempts for level {level}; the child already has one open.'
                 )
+            )
+        for level, count in sorted(loaded.items()):
+            self.stdout.write(
+                self.style.SUCCESS(f'  -> Loaded {count} attempts for level {level}')
+            )
 
     def _pick_incorrect_option(self, question: Question) -> str:
         for option in question.options:
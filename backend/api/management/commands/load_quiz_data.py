@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from api.models import Quiz, Question
+from api.quiz_cache import quiz_catalogue
+from api.quiz_sync import describe_changes, sync_quiz
 
 # Quiz data from quiz.md
 QUIZ_DATA = [
@@ -169,45 +170,14 @@ class Command(BaseCommand):
         self.stdout.write('Loading quiz data...')
 
         for level_data in QUIZ_DATA:
-            quiz, created = Quiz.objects.get_or_create(
-                level=level_data['level'],
-                defaults={
-                    'title': level_data['title'],
-                    'badge_name': level_data['badgeName'],
-                }
-            )
-
-            if created:
-                self.stdout.write(
-                    self.style.SUCCESS(f'Created quiz: {quiz.title}')
-                )
-            else:
-                self.stdout.write(
-                    self.style.WARNING(f'Quiz already exists: {quiz.title}')
-                )
-                # Update existing quiz
-                quiz.title = level_data['title']
-                quiz.badge_name = level_data['badgeName']
-                quiz.save()
-
-            # Delete existing questions and recreate them
-            Question.objects.filter(quiz=quiz).delete()
-
-            for idx, question_data in enumerate(level_data['questions']):
-                Question.objects.create(
-                    quiz=quiz,
-                    question_text=question_data['q'],
-                    options=question_data['options'],
-                    correct_answer=question_data['correct'],
-                    order=idx,
-                )
-
+            quiz, changes = sync_quiz(level_data)
             self.stdout.write(
-                self.style.SUCCESS(
-                    f'  Added {len(level_data["questions"])} questions to {quiz.title}'
-                )
+                self.style.SUCCESS(f'{quiz.title}: {describe_changes(changes)}')
             )
 
+        # Tell running servers to drop their cached catalogue
+        quiz_catalogue.invalidate()
+
         self.stdout.write(
             self.style.SUCCESS('\nSuccessfully loaded all quiz data!')
         )
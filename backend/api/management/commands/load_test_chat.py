@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from api.chat.backends import StubClient
+from api.models import ChatResponseCache, ChatSession, ChatUsage
+
+MESSAGE_PREFIX = 'load test message'
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Drive the chat pipeline in-process against the stub backend and report throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Total chat requests (default: 2000)')
+        parser.add_argument('--concurrency', type=int, default=100, help='Requests in flight (default: 100)')
+        parser.add_argument('--endpoint', choices=['send', 'stream'], default='send')
+        parser.add_argument('--distinct', type=int, default=50,
+                            help='Distinct messages sent; fewer means more cache hits (default: 50)')
+        parser.add_argument('--latency', type=float, default=0.05, help='Stub first-token latency in seconds')
+        parser.add_argument('--token-delay', type=float, default=0.0, help='Stub delay between chunks in seconds')
+        parser.add_argument('--tokens', type=int, default=20, help='Stub chunks per reply')
+        parser.add_argument('--max-in-flight', type=int, help='Override CHAT_MAX_IN_FLIGHT')
+        parser.add_argument('--no-cache', action='store_true', help='Disable the reply cache')
+        parser.add_argument('--keep', action='store_true', help='Keep the sessions, cache and usage rows created')
+
+    def handle(self, *args, **options):
+        overrides = {
+            'CHAT_BACKEND': 'stub',
+            'CHAT_STUB_LATENCY': options['latency'],
+            'CHAT_STUB_TOKEN_DELAY': options['token_delay'],
+            'CHAT_STUB_TOKENS': options['tokens'],
+            'CHAT_CACHE_ENABLED': not options['no_cache'],
+            # Requests go through the test client, which uses this host name
+            'ALLOWED_HOSTS': ['testserver'],
+        }
+        if options['max_in_flight']:
+            overrides['CHAT_MAX_IN_FLIGHT'] = options['max_in_flight']
+
+        # Later usage rows are this run's, except real traffic meanwhile,
+        # which carries a real model's label
+        last_usage_id = ChatUsage.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        with override_settings(**overrides):
+            started = time.perf_counter()
+            results = asyncio.run(self._run(options))
+            elapsed = time.perf_counter() - started
+
+        latencies = sorted(result['latency'] for result in results)
+        first_tokens = sorted(result['firstToken'] for result in results if result['firstToken'] is not None)
+        statuses = Counter(result['status'] for result in results)
+        cache = Counter(result['cache'] for result in results)
+
+        self.stdout.write(f"{len(results)} {options['endpoint']} requests in {elapsed:.2f}s "
+                          f"({len(results) / elapsed:.0f} req/s, concurrency {options['concurrency']})")
+        self.stdout.write('Status: ' + ', '.join(f'{code}={count}' for code, count in sorted(statuses.items())))
+        self.stdout.write('Cache: ' + ', '.join(f'{state}={count}' for state, count in sorted(cache.items())))
+        self.stdout.write('Latency ms: ' + ', '.join(
+            f'p{int(q * 100)}={percentile(latencies, q) * 1000:.1f}' for q in (0.5, 0.95, 0.99)
+        ))
+        if first_tokens:
+            self.stdout.write('First token ms: ' + ', '.join(
+                f'p{int(q * 100)}={percentile(first_tokens, q) * 1000:.1f}' for q in (0.5, 0.95, 0.99)
+            ))
+
+        if not options['keep']:
+            session_ids = {result['sessionId'] for result in results if result['sessionId']}
+            ChatSession.objects.filter(id__in=session_ids).delete()
+            ChatResponseCache.objects.filter(normalized_message__startswith=MESSAGE_PREFIX).delete()
+            # Stub rows would otherwise show up in /api/chat/usage
+            ChatUsage.objects.filter(
+                id__gt=last_usage_id,
+                model__in=['', StubClient.model_label],
+            ).delete()
+        self.stdout.write(self.style.SUCCESS('Load test complete'))
+
+    async def _run(self, options):
+        client = AsyncClient()
+        url = reverse('api:chat-stream' if options['endpoint'] == 'stream' else 'api:chat-send')
+        pending = iter(range(options['requests']))
+        results = []
+
+        async def one(n):
+            body = json.dumps({'message': f"{MESSAGE_PREFIX} {n % options['distinct']}"})
+            sent = time.perf_counter()
+            response = await client.post(url, data=body, content_type='application/json')
+            first_token = None
+            session_id = None
+            if response.status_code == 200 and options['endpoint'] == 'stream':
+                async for chunk in response.streaming_content:
+                    if first_token is None and b'event: token' in chunk:
+                        first_token = time.perf_counter() - sent
+                    if session_id is None and b'event: emotion' in chunk:
+                        session_id = json.loads(chunk.split(b'data: ', 1)[1])['sessionId']
+            elif response.status_code == 200:
+                session_id = response.json()['sessionId']
+            results.append({
+                'status': response.status_code,
+                'cache': response.headers.get('X-Chat-Cache', '-'),
+                'latency': time.perf_counter() - sent,
+                'firstToken': first_token,
+                'sessionId': session_id,
+            })
+
+        async def worker():
+            for n in pending:
+                await one(n)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        finally:
+            # Outside async_to_sync the views' queries run on asgiref's shared
+            # sync thread, which outlives this loop; close its connections
+            await sync_to_async(connections.close_all)()
+        return results
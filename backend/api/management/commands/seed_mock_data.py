@@ -1,10 +1,10 @@
 from datetime import date
 
-from django.contrib.auth.hashers import make_password
 from django.core.management import BaseCommand, call_command
 from django.db import transaction
 from django.utils import timezone
 
+from api.accounts import default_workers, upsert_registrations
 from api.models import (
     Article,
     LoginAttempt,
@@ -155,6 +155,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Delete previously seeded data before creating new records.',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=default_workers(),
+            help='Processes used to hash user passwords (default: one per CPU)',
+        )
 
     def handle(self, *args, **options):
         purge = options['purge']
@@ -167,7 +173,7 @@ class Command(BaseCommand):
             call_command('load_quiz_data')
 
             self._seed_articles()
-            self._seed_registration_requests()
+            self._seed_registration_requests(options['workers'])
             self._seed_login_attempts()
             self._seed_quiz_attempts()
 
@@ -198,18 +204,9 @@ class Command(BaseCommand):
             )
         self.stdout.write(self.style.SUCCESS(f'  -> {len(ARTICLE_DATA)} articles ready'))
 
-    def _seed_registration_requests(self):
+    def _seed_registration_requests(self, workers):
         self.stdout.write('Seeding registration requests...')
-        for entry in REGISTRATION_DATA:
-            RegistrationRequest.objects.update_or_create(
-                email=entry['email'],
-                defaults={
-                    'role': entry['role'],
-                    'full_name': entry['full_name'],
-                    'password_hash': make_password(entry['password']),
-                    'metadata': entry['metadata'],
-                },
-            )
+        upsert_registrations(REGISTRATION_DATA, workers)
         self.stdout.write(self.style.SUCCESS(f'  -> {len(REGISTRATION_DATA)} registrations ready'))
 
     def _seed_login_attempts(self):
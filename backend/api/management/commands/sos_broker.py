@@ -0,0 +1,31 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.sos.broker import Broker
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+
+
+class Command(BaseCommand):
+    help = 'Relay SOS alerts between ASGI worker processes (point SOS_BROKER_ADDRESS at it)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--address',
+            default=settings.SOS_BROKER_ADDRESS or DEFAULT_ADDRESS,
+            help=f'host:port to listen on (default: SOS_BROKER_ADDRESS or {DEFAULT_ADDRESS})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            asyncio.run(self._serve(options['address']))
+        except KeyboardInterrupt:
+            pass
+
+    async def _serve(self, address):
+        server = await Broker().start(address)
+        self.stdout.write(self.style.SUCCESS(f'SOS broker listening on {address}'))
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:55
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def drop_duplicate_responses(apps, schema_editor):
+    """Keep the latest response per (attempt, question) and resync scores"""
+    QuestionResponse = apps.get_model('api', 'QuestionResponse')
+    QuizAttempt = apps.get_model('api', 'QuizAttempt')
+
+    duplicates = (
+        QuestionResponse.objects.values('attempt_id', 'question_id')
+        .annotate(rows=Count('id'), keep_id=Max('id'))
+        .filter(rows__gt=1)
+    )
+    affected_attempts = set()
+    for row in duplicates:
+        QuestionResponse.objects.filter(
+            attempt_id=row['attempt_id'],
+            question_id=row['question_id'],
+        ).exclude(id=row['keep_id']).delete()
+        affected_attempts.add(row['attempt_id'])
+
+    for attempt in QuizAttempt.objects.filter(id__in=affected_attempts):
+        attempt.score = QuestionResponse.objects.filter(attempt=attempt, is_correct=True).count()
+        attempt.save(update_fields=['score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_quiz_question_quizattempt_questionresponse'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='questionresponse',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question'), name='unique_response_per_attempt_question'),
+        ),
+    ]
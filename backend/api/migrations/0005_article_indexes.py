@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_questionresponse_unique_attempt_question'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['category', 'published_at'], name='article_category_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['published_at', 'title'], name='article_published_title_idx'),
+        ),
+    ]
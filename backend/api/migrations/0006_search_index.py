@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# The index as it stood when this migration was written. Migrations must not
+# import app code, which changes after they are applied; later migrations
+# that rebuild these tables reinstall the triggers themselves.
+INDEXES = {
+    'api_article_fts': ('api_article', ('title', 'summary', 'category')),
+    'api_question_fts': ('api_question', ('question_text',)),
+}
+
+
+def index_sql(fts_table, content_table, columns):
+    cols = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    insert = f'INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values});'
+    delete = (
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{cols}, content='{content_table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f'DROP TRIGGER IF EXISTS {fts_table}_ai',
+        f'DROP TRIGGER IF EXISTS {fts_table}_ad',
+        f'DROP TRIGGER IF EXISTS {fts_table}_au',
+        f'CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {content_table} BEGIN {insert} END',
+        f'CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {content_table} BEGIN {delete} END',
+        f'CREATE TRIGGER {fts_table}_au AFTER UPDATE ON {content_table} BEGIN {delete} {insert} END',
+        f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')",
+    ]
+
+
+def install(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for fts_table, (content_table, columns) in INDEXES.items():
+        for statement in index_sql(fts_table, content_table, columns):
+            schema_editor.execute(statement)
+
+
+def uninstall(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for fts_table in INDEXES:
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_article_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
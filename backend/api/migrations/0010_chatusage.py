@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_chatsession_chatmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=16)),
+                ('model', models.CharField(blank=True, max_length=64)),
+                ('outcome', models.CharField(choices=[('model', 'Model reply'), ('cache', 'Cached reply'), ('escalated', 'SOS template'), ('degraded', 'Fallback while model unavailable'), ('error', 'Error')], max_length=16)),
+                ('prompt_tokens', models.IntegerField(blank=True, null=True)),
+                ('output_tokens', models.IntegerField(blank=True, null=True)),
+                ('first_token_ms', models.FloatField(blank=True, null=True)),
+                ('latency_ms', models.FloatField()),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('error_class', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
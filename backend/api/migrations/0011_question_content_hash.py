@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:44
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+# Frozen copies of api.quiz_sync.question_hash and of the api_question FTS
+# triggers from 0006, so later changes to app code cannot change what this
+# migration writes.
+
+
+def question_hash(question_text, options, correct_answer):
+    raw = json.dumps([question_text, options, correct_answer], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+QUESTION_INDEX_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_question_fts USING fts5("
+    "question_text, content='api_question', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    'DROP TRIGGER IF EXISTS api_question_fts_ai',
+    'DROP TRIGGER IF EXISTS api_question_fts_ad',
+    'DROP TRIGGER IF EXISTS api_question_fts_au',
+    'CREATE TRIGGER api_question_fts_ai AFTER INSERT ON api_question BEGIN '
+    'INSERT INTO api_question_fts(rowid, question_text) VALUES (new.id, new.question_text); END',
+    'CREATE TRIGGER api_question_fts_ad AFTER DELETE ON api_question BEGIN '
+    "INSERT INTO api_question_fts(api_question_fts, rowid, question_text) "
+    "VALUES ('delete', old.id, old.question_text); END",
+    'CREATE TRIGGER api_question_fts_au AFTER UPDATE ON api_question BEGIN '
+    "INSERT INTO api_question_fts(api_question_fts, rowid, question_text) "
+    "VALUES ('delete', old.id, old.question_text); "
+    'INSERT INTO api_question_fts(rowid, question_text) VALUES (new.id, new.question_text); END',
+    "INSERT INTO api_question_fts(api_question_fts) VALUES ('rebuild')",
+]
+
+
+def reinstall_search_index(apps, schema_editor):
+    # SQLite rebuilds api_question to change its columns, dropping the FTS triggers
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in QUESTION_INDEX_SQL:
+        schema_editor.execute(statement)
+
+
+def backfill_hashes(apps, schema_editor):
+    Question = apps.get_model('api', 'Question')
+    questions = list(Question.objects.all())
+    for question in questions:
+        question.content_hash = question_hash(question.question_text, question.options, question.correct_answer)
+    Question.objects.bulk_update(questions, ['content_hash'], batch_size=500)
+    reinstall_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_chatusage'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_index),
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.RunPython(backfill_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+def merge_duplicate_open_attempts(apps, schema_editor):
+    # Concurrent quiz_start calls could open several attempts for the same
+    # child and quiz. Keep the newest open one, move onto it the answers it
+    # lacks from the others (the most recent answer per question wins),
+    # rescore it and delete the rest, so the constraint below can be created
+    # without inventing completed attempts.
+    QuizAttempt = apps.get_model('api', 'QuizAttempt')
+    QuestionResponse = apps.get_model('api', 'QuestionResponse')
+    kept = {}
+    duplicates = {}
+    for attempt_id, child_email, quiz_id in (
+        QuizAttempt.objects.filter(is_completed=False)
+        .order_by('-started_at', '-id')
+        .values_list('id', 'child_email', 'quiz_id')
+    ):
+        keeper = kept.setdefault((child_email, quiz_id), attempt_id)
+        if keeper != attempt_id:
+            duplicates.setdefault(keeper, []).append(attempt_id)
+
+    for keeper, others in duplicates.items():
+        answered = set(QuestionResponse.objects.filter(attempt_id=keeper).values_list('question_id', flat=True))
+        for other in others:
+            moved = QuestionResponse.objects.filter(attempt_id=other).exclude(question_id__in=answered)
+            answered.update(moved.values_list('question_id', flat=True))
+            moved.update(attempt_id=keeper)
+        QuizAttempt.objects.filter(id__in=others).delete()
+        QuizAttempt.objects.filter(id=keeper).update(
+            score=QuestionResponse.objects.filter(attempt_id=keeper, is_correct=True).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_open_attempts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['child_email', '-started_at', '-id'], name='quizattempt_child_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['-started_at', '-id'], name='quizattempt_started_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_completed', False)), fields=('child_email', 'quiz'), name='unique_open_attempt_per_child_quiz'),
+        ),
+    ]
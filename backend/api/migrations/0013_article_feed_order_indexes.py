@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_quizattempt_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_category_published_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_published_title_idx',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['category', '-published_at', 'title', 'id'], name='article_category_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-published_at', 'title', 'id'], name='article_published_title_idx'),
+        ),
+    ]
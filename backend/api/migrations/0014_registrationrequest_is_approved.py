@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_article_feed_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrationrequest',
+            name='is_approved',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 
 
@@ -12,6 +14,11 @@ class Article(models.Model):
 
     class Meta:
         ordering = ['-published_at', 'title']
+        indexes = [
+            # In the news feed's order (-published_at, title, id), so pages need no sort
+            models.Index(fields=['category', '-published_at', 'title', 'id'], name='article_category_published_idx'),
+            models.Index(fields=['-published_at', 'title', 'id'], name='article_published_title_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -23,6 +30,9 @@ class RegistrationRequest(models.Model):
     email = models.EmailField()
     password_hash = models.CharField(max_length=128)
     metadata = models.JSONField(default=dict, blank=True)
+    # Self-registrations choose their own role and childEmail, so only
+    # approved requests (imports, or reviewed in the admin) get SOS tokens
+    is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -66,6 +76,8 @@ class Question(models.Model):
     options = models.JSONField(default=list)  # List of option strings
     correct_answer = models.TextField()  # The correct option text
     order = models.IntegerField(default=0)  # Order within the quiz
+    # sha256 of text, options and answer; lets reloads match questions (see api.quiz_sync)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
 
     class Meta:
         ordering = ['quiz', 'order']
@@ -86,6 +98,20 @@ class QuizAttempt(models.Model):
 
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            # A child's progress, newest first
+            models.Index(fields=['child_email', '-started_at', '-id'], name='quizattempt_child_started_idx'),
+            # The teacher's keyset-paginated list of all attempts
+            models.Index(fields=['-started_at', '-id'], name='quizattempt_started_idx'),
+        ]
+        constraints = [
+            # One open attempt per child and quiz; also the index quiz_start looks it up by
+            models.UniqueConstraint(
+                fields=['child_email', 'quiz'],
+                condition=models.Q(is_completed=False),
+                name='unique_open_attempt_per_child_quiz',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'{self.child_email} - {self.quiz.title} ({self.score}/{self.total_questions})'
@@ -101,8 +127,130 @@ class QuestionResponse(models.Model):
 
     class Meta:
         ordering = ['attempt', 'question__order']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['attempt', 'question'],
+                name='unique_response_per_attempt_question',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'{self.attempt.child_email} - Q{self.question.order + 1} ({self.is_correct})'
 
+
+class ChatResponseCache(models.Model):
+    """Cached Sparkle replies keyed on a normalized user message"""
+    key = models.CharField(max_length=64, unique=True)  # sha256 of normalized_message
+    normalized_message = models.TextField()
+    response = models.TextField()
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-last_used_at']
+
+    def __str__(self) -> str:
+        return f'{self.normalized_message[:50]} ({self.hits} hits)'
+
+
+class SafetyEvent(models.Model):
+    """A chat message flagged by the local safety classifier"""
+    FOLLOW_UP_PENDING = 'pending'
+    FOLLOW_UP_COMPLETED = 'completed'
+    FOLLOW_UP_FAILED = 'failed'
+    FOLLOW_UP_SKIPPED = 'skipped'
+    FOLLOW_UP_CHOICES = [
+        (FOLLOW_UP_PENDING, 'Pending'),
+        (FOLLOW_UP_COMPLETED, 'Completed'),
+        (FOLLOW_UP_FAILED, 'Failed'),
+        (FOLLOW_UP_SKIPPED, 'Skipped'),
+    ]
+
+    message = models.TextField()
+    emotion = models.CharField(max_length=32)
+    level = models.IntegerField(default=0)
+    reply = models.TextField()  # the templated guidance sent straight away
+    follow_up_status = models.CharField(max_length=16, choices=FOLLOW_UP_CHOICES, default=FOLLOW_UP_SKIPPED)
+    follow_up = models.TextField(blank=True)  # the model's reply, generated in the background
+    created_at = models.DateTimeField(auto_now_add=True)
+    follow_up_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:
+        return f'Level {self.level} at {self.created_at:%Y-%m-%d %H:%M:%S}'
+
+
+class ChatSession(models.Model):
+    """A conversation with Sparkle; older turns are folded into summary"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    summary = models.TextField(blank=True)
+    summarized_through = models.BigIntegerField(default=0)  # id of the last ChatMessage in summary
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+
+    def __str__(self) -> str:
+        return f'Chat {self.id} ({self.updated_at:%Y-%m-%d %H:%M})'
+
+
+class ChatMessage(models.Model):
+    ROLE_USER = 'user'
+    ROLE_MODEL = 'model'
+    ROLE_CHOICES = [
+        (ROLE_USER, 'User'),
+        (ROLE_MODEL, 'Sparkle'),
+    ]
+
+    session = models.ForeignKey(ChatSession, related_name='messages', on_delete=models.CASCADE)
+    role = models.CharField(max_length=8, choices=ROLE_CHOICES)
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['session', 'id'], name='chatmessage_session_id_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.role}: {self.content[:50]}'
+
+
+class ChatUsage(models.Model):
+    """One chat request: which model answered, what it cost and how long it took"""
+    OUTCOME_MODEL = 'model'
+    OUTCOME_CACHE = 'cache'
+    OUTCOME_ESCALATED = 'escalated'
+    OUTCOME_DEGRADED = 'degraded'
+    OUTCOME_ERROR = 'error'
+    OUTCOME_CHOICES = [
+        (OUTCOME_MODEL, 'Model reply'),
+        (OUTCOME_CACHE, 'Cached reply'),
+        (OUTCOME_ESCALATED, 'SOS template'),
+        (OUTCOME_DEGRADED, 'Fallback while model unavailable'),
+        (OUTCOME_ERROR, 'Error'),
+    ]
+
+    endpoint = models.CharField(max_length=16)  # send, stream, follow_up or summary
+    model = models.CharField(max_length=64, blank=True)
+    outcome = models.CharField(max_length=16, choices=OUTCOME_CHOICES)
+    prompt_tokens = models.IntegerField(null=True, blank=True)
+    output_tokens = models.IntegerField(null=True, blank=True)
+    first_token_ms = models.FloatField(null=True, blank=True)
+    latency_ms = models.FloatField()
+    cache_hit = models.BooleanField(default=False)
+    error_class = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:
+        return f'{self.endpoint} {self.outcome} {self.latency_ms:.0f} ms'
+
 # Create your models here.
@@ -0,0 +1,91 @@
+"""Shared queryset builder and row serializer for quiz progress endpoints"""
+from django.db.models import Avg, Case, Count, F, FloatField, IntegerField, Q, Sum, When
+
+from .models import QuizAttempt
+
+# Columns read by serialize_attempt; anything else stays deferred.
+PROGRESS_FIELDS = (
+    'id',
+    'child_email',
+    'score',
+    'total_questions',
+    'is_completed',
+    'started_at',
+    'completed_at',
+    'quiz__id',
+    'quiz__title',
+    'quiz__level',
+    'quiz__badge_name',
+)
+
+# Per-attempt percentage, NULL-safe for attempts on quizzes without questions.
+ATTEMPT_PERCENTAGE = Case(
+    When(total_questions__gt=0, then=F('score') * 100.0 / F('total_questions')),
+    default=0.0,
+    output_field=FloatField(),
+)
+ATTEMPT_COMPLETED = Case(
+    When(is_completed=True, then=1),
+    default=0,
+    output_field=IntegerField(),
+)
+
+
+def progress_queryset(**filters):
+    """Attempts joined to their quiz in one query, newest first"""
+    return (
+        QuizAttempt.objects.select_related('quiz')
+        .only(*PROGRESS_FIELDS)
+        .filter(**filters)
+        .order_by('-started_at', '-id')
+    )
+
+
+def older_than(started_at, attempt_id):
+    """Attempts after (started_at, attempt_id) in progress_queryset order.
+
+    The redundant started_at <= bound lets SQLite seek the index to the
+    cursor; the OR on its own makes it scan past every newer attempt.
+    """
+    return Q(started_at__lte=started_at) & (Q(started_at__lt=started_at) | Q(id__lt=attempt_id))
+
+
+def attempt_percentage(score, total_questions):
+    return round((score / total_questions) * 100) if total_questions > 0 else 0
+
+
+def serialize_attempt(attempt):
+    quiz = attempt.quiz
+    return {
+        'attemptId': attempt.id,
+        'childEmail': attempt.child_email,
+        'quizId': quiz.id,
+        'quizTitle': quiz.title,
+        'level': quiz.level,
+        'badgeName': quiz.badge_name,
+        'score': attempt.score,
+        'totalQuestions': attempt.total_questions,
+        'percentage': attempt_percentage(attempt.score, attempt.total_questions),
+        'isCompleted': attempt.is_completed,
+        'startedAt': attempt.started_at.isoformat(),
+        'completedAt': attempt.completed_at.isoformat() if attempt.completed_at else None,
+    }
+
+
+def progress_aggregates():
+    return {
+        'attempts': Count('id'),
+        'completed': Sum(ATTEMPT_COMPLETED),
+        'averagePercentage': Avg(ATTEMPT_PERCENTAGE),
+    }
+
+
+def format_aggregate(row):
+    attempts = row['attempts'] or 0
+    completed = row['completed'] or 0
+    return {
+        'attempts': attempts,
+        'completed': completed,
+        'completionRate': round((completed / attempts) * 100) if attempts > 0 else 0,
+        'averagePercentage': round(row['averagePercentage'] or 0),
+    }
@@ -0,0 +1,197 @@
+"""In-process cache of the serialized quiz catalogue.
+
+The catalogue only changes when quizzes are (re)loaded, so the list and every
+quiz detail are serialized once and served as JSON bytes until the next
+write. Writes in this process invalidate through model signals; writes made
+by other processes (management commands, other workers) are picked up via a
+stamp file whose mtime is checked on each read, so reads never touch the
+database while the catalogue is warm.
+"""
+import json
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+
+from .conditional import body_etag
+from .models import Quiz
+
+QUIZ_LIST_FIELDS = ('id', 'level', 'title', 'badgeName', 'questionCount', 'questions')
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: float
+
+
+def _dump(data):
+    return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+def serialize_question(question):
+    return {
+        'id': question.id,
+        'q': question.question_text,
+        'options': question.options,
+        'correct': question.correct_answer,
+        'order': question.order,
+    }
+
+
+class _Catalogue:
+    """One immutable snapshot of the catalogue plus its serialized variants"""
+
+    def __init__(self, quizzes, details, last_modified):
+        self.quizzes = quizzes
+        self.last_modified = last_modified
+        self.details = {
+            quiz_id: self._cached(body) for quiz_id, body in details.items()
+        }
+        self.lists = {}
+
+    def _cached(self, body):
+        return CachedBody(body, body_etag(body), self.last_modified)
+
+    def get_list(self, include_questions, fields):
+        key = (include_questions, fields)
+        cached = self.lists.get(key)
+        if cached is None:
+            rows = []
+            for quiz in self.quizzes:
+                row = dict(quiz) if include_questions else {
+                    name: value for name, value in quiz.items() if name != 'questions'
+                }
+                if fields is not None:
+                    row = {name: value for name, value in row.items() if name in fields}
+                rows.append(row)
+            cached = self.lists[key] = self._cached(_dump(rows))
+        return cached
+
+
+class QuizCatalogueCache:
+    def __init__(self, stamp_path=None):
+        self._stamp_path = stamp_path
+        self._lock = threading.Lock()
+        self._version = 0
+        self._stamp = None
+        self._catalogue = None
+        self._modified_at = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def stamp_path(self):
+        if self._stamp_path is None:
+            return getattr(settings, 'QUIZ_CACHE_STAMP_FILE', None)
+        return self._stamp_path
+
+    def _read_stamp(self):
+        path = self.stamp_path
+        if not path:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _write_stamp(self):
+        path = self.stamp_path
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as stamp:
+                stamp.write(str(time.time_ns()))
+        except OSError:
+            pass
+
+    def invalidate(self, broadcast=True):
+        """Drop the cached catalogue; broadcast=True also notifies other processes"""
+        with self._lock:
+            self._version += 1
+            self._catalogue = None
+            self._modified_at = time.time()
+            self.invalidations += 1
+        if broadcast:
+            self._write_stamp()
+
+    def _build(self, last_modified):
+        quizzes = []
+        details = {}
+        catalogue = (
+            Quiz.objects.annotate(question_count=Count('questions'))
+            .prefetch_related('questions')
+        )
+        for quiz in catalogue:
+            questions = [serialize_question(question) for question in quiz.questions.all()]
+            quizzes.append({
+                'id': quiz.id,
+                'level': quiz.level,
+                'title': quiz.title,
+                'badgeName': quiz.badge_name,
+                'questionCount': quiz.question_count,
+                'questions': questions,
+            })
+            details[quiz.id] = _dump({
+                'id': quiz.id,
+                'level': quiz.level,
+                'title': quiz.title,
+                'badgeName': quiz.badge_name,
+                'questions': questions,
+            })
+        return _Catalogue(quizzes, details, last_modified)
+
+    def _ensure_loaded(self):
+        stamp = self._read_stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                self._stamp = stamp
+                self._version += 1
+                self._catalogue = None
+                if stamp is not None:
+                    self._modified_at = stamp[0] / 1e9
+            if self._catalogue is not None:
+                self.hits += 1
+                return self._catalogue
+            self.misses += 1
+            version = self._version
+            modified_at = self._modified_at
+
+        catalogue = self._build(modified_at)
+
+        with self._lock:
+            # Only publish if nothing invalidated the catalogue mid-build
+            if version == self._version:
+                self._catalogue = catalogue
+        return catalogue
+
+    def get_list(self, include_questions=False, fields=None):
+        """Serialized quiz list; fields is an optional frozenset of keys to keep"""
+        catalogue = self._ensure_loaded()
+        with self._lock:
+            return catalogue.get_list(include_questions, fields)
+
+    def get_detail(self, quiz_id):
+        """Serialized quiz detail, or None if the quiz does not exist"""
+        return self._ensure_loaded().details.get(quiz_id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'version': self._version,
+                'warm': self._catalogue is not None,
+            }
+
+
+quiz_catalogue = QuizCatalogueCache()
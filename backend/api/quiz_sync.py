@@ -0,0 +1,119 @@
+"""Apply quiz definitions to the database as a diff rather than a rebuild.
+
+Deleting and recreating questions would change their ids and, through
+``on_delete=CASCADE``, wipe every child's answers to them. Instead each
+question is matched to an existing one in the same quiz: first by
+``content_hash`` (same text, options and answer, possibly moved), then by
+position (edited in place). Only questions left unmatched are inserted or
+deleted, so unchanged and edited questions keep their history.
+"""
+import hashlib
+import json
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import Question, Quiz
+
+QUESTION_FIELDS = ('question_text', 'options', 'correct_answer', 'order', 'content_hash')
+
+
+def question_hash(question_text, options, correct_answer):
+    raw = json.dumps([question_text, options, correct_answer], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _apply(question, order, text, options, correct_answer, content_hash):
+    """Copy the definition onto question; True if anything changed"""
+    values = {
+        'question_text': text,
+        'options': options,
+        'correct_answer': correct_answer,
+        'order': order,
+        'content_hash': content_hash,
+    }
+    changed = any(getattr(question, field) != value for field, value in values.items())
+    for field, value in values.items():
+        setattr(question, field, value)
+    return changed
+
+
+@transaction.atomic
+def sync_quiz(level_data):
+    """Bring one quiz and its questions in line with level_data.
+
+    level_data has level, title, badgeName and questions (q, options,
+    correct). Returns (quiz, Counter of added/updated/moved/removed/unchanged).
+    """
+    changes = Counter()
+    quiz, created = Quiz.objects.get_or_create(
+        level=level_data['level'],
+        defaults={'title': level_data['title'], 'badge_name': level_data['badgeName']},
+    )
+    if not created and (quiz.title, quiz.badge_name) != (level_data['title'], level_data['badgeName']):
+        quiz.title = level_data['title']
+        quiz.badge_name = level_data['badgeName']
+        quiz.save(update_fields=['title', 'badge_name'])
+
+    wanted = [
+        (order, item['q'], item['options'], item['correct'], question_hash(item['q'], item['options'], item['correct']))
+        for order, item in enumerate(level_data['questions'])
+    ]
+    existing = list(Question.objects.filter(quiz=quiz).order_by('order', 'id'))
+
+    by_hash = defaultdict(list)
+    for question in existing:
+        by_hash[question.content_hash or question_hash(
+            question.question_text, question.options, question.correct_answer
+        )].append(question)
+
+    matched = {}
+    for definition in wanted:
+        candidates = by_hash.get(definition[4])
+        if candidates:
+            matched[definition[0]] = candidates.pop(0)
+    matched_ids = {question.id for question in matched.values()}
+    unused = {question.id: question for question in existing if question.id not in matched_ids}
+    unused_by_order = {}
+    for question in unused.values():
+        unused_by_order.setdefault(question.order, question)
+
+    to_update, to_create = [], []
+    for order, text, options, correct_answer, content_hash in wanted:
+        question = matched.get(order)
+        if question is not None:
+            moved = question.order != order
+            # Also true when only the stored hash was missing
+            if _apply(question, order, text, options, correct_answer, content_hash):
+                to_update.append(question)
+            changes['moved' if moved else 'unchanged'] += 1
+            continue
+        question = unused_by_order.pop(order, None)
+        if question is not None:
+            del unused[question.id]
+            _apply(question, order, text, options, correct_answer, content_hash)
+            to_update.append(question)
+            changes['updated'] += 1
+        else:
+            to_create.append(Question(
+                quiz=quiz,
+                question_text=text,
+                options=options,
+                correct_answer=correct_answer,
+                order=order,
+                content_hash=content_hash,
+            ))
+            changes['added'] += 1
+
+    Question.objects.bulk_update(to_update, QUESTION_FIELDS)
+    Question.objects.bulk_create(to_create)
+    if unused:
+        Question.objects.filter(id__in=unused).delete()
+        changes['removed'] += len(unused)
+    return quiz, changes
+
+
+def describe_changes(changes):
+    return ', '.join(
+        f'{changes[kind]} {kind}' for kind in ('added', 'updated', 'moved', 'removed', 'unchanged') if changes[kind]
+    ) or 'no questions'
@@ -0,0 +1,165 @@
+"""Full-text search over articles and quiz questions.
+
+On SQLite the index lives in two external-content FTS5 tables kept in sync
+with ``api_article`` and ``api_question`` by triggers, so bulk inserts and
+queryset updates are indexed too. Migration 0006 creates them; a migration
+that makes SQLite rebuild either table drops its triggers and must recreate
+them (see 0011). Other database backends fall back to ``icontains`` filters.
+"""
+import html
+import re
+from itertools import chain, zip_longest
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Article, Question
+
+SEARCH_KINDS = ('article', 'question')
+
+# Private-use sentinels mark snippet highlights until the text is escaped
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+
+
+def fts_available():
+    # The FTS tables are created by migration 0006 on every SQLite database
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query: every term required, last one as a prefix"""
+    terms = re.findall(r'\w+', text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _render_snippet(raw):
+    return (
+        html.escape(raw)
+        .replace(_MARK_START, '<mark>')
+        .replace(_MARK_END, '</mark>')
+    )
+
+
+def _search_articles_fts(match, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT a.slug, a.title, a.category,
+                   snippet(api_article_fts, 1, %s, %s, '…', 16),
+                   bm25(api_article_fts, 10.0, 1.0, 2.0) AS rank
+            FROM api_article_fts
+            JOIN api_article a ON a.id = api_article_fts.rowid
+            WHERE api_article_fts MATCH %s
+            ORDER BY rank
+            LIMIT %s
+            """,
+            [_MARK_START, _MARK_END, match, limit],
+        )
+        return [
+            {
+                'type': 'article',
+                'id': slug,
+                'title': title,
+                'category': category,
+                'snippet': _render_snippet(snippet),
+                'rank': rank,
+            }
+            for slug, title, category, snippet, rank in cursor.fetchall()
+        ]
+
+
+def _search_questions_fts(match, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT q.id, q.quiz_id, z.level, z.title,
+                   snippet(api_question_fts, 0, %s, %s, '…', 16),
+                   bm25(api_question_fts) AS rank
+            FROM api_question_fts
+            JOIN api_question q ON q.id = api_question_fts.rowid
+            JOIN api_quiz z ON z.id = q.quiz_id
+            WHERE api_question_fts MATCH %s
+            ORDER BY rank
+            LIMIT %s
+            """,
+            [_MARK_START, _MARK_END, match, limit],
+        )
+        return [
+            {
+                'type': 'question',
+                'id': question_id,
+                'quizId': quiz_id,
+                'level': level,
+                'title': title,
+                'snippet': _render_snippet(snippet),
+                'rank': rank,
+            }
+            for question_id, quiz_id, level, title, snippet, rank in cursor.fetchall()
+        ]
+
+
+def _search_fallback(text, kinds, limit):
+    results = []
+    if 'article' in kinds:
+        articles = Article.objects.filter(Q(title__icontains=text) | Q(summary__icontains=text))
+        for article in articles[:limit]:
+            results.append({
+                'type': 'article',
+                'id': article.slug,
+                'title': article.title,
+                'category': article.category,
+                'snippet': html.escape(article.summary[:160]),
+                'rank': 0.0,
+            })
+    if 'question' in kinds:
+        for question in Question.objects.select_related('quiz').filter(question_text__icontains=text)[:limit]:
+            results.append({
+                'type': 'question',
+                'id': question.id,
+                'quizId': question.quiz_id,
+                'level': question.quiz.level,
+                'title': question.quiz.title,
+                'snippet': html.escape(question.question_text[:160]),
+                'rank': 0.0,
+            })
+    return results[:limit]
+
+
+def search(text, kinds=SEARCH_KINDS, limit=10):
+    """Matches for the requested kinds, each kind best first (lower rank is better).
+
+    bm25 scores depend on each FTS table's own column weights, document
+    lengths and term statistics, so an article's rank says nothing about a
+    question's. The per-kind lists are interleaved instead of sorted together.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+    if not fts_available():
+        return _search_fallback(text.strip(), kinds, limit)
+
+    ranked = []
+    if 'article' in kinds:
+        ranked.append(_search_articles_fts(match, limit))
+    if 'question' in kinds:
+        ranked.append(_search_questions_fts(match, limit))
+    results = [result for result in chain.from_iterable(zip_longest(*ranked)) if result is not None]
+    return results[:limit]
+
+
+def matching_article_ids(text):
+    """Article ids matching text via the FTS index, or None when it is unavailable"""
+    match = build_match_query(text)
+    if match is None or not fts_available():
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT rowid FROM api_article_fts WHERE api_article_fts MATCH %s',
+            [match],
+        )
+        return [row[0] for row in cursor.fetchall()]
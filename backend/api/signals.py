@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Question, Quiz
+from .quiz_cache import quiz_catalogue
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_quiz_catalogue(sender, **kwargs):
+    # Drop the local copy now, and again once the write is committed so a
+    # rebuild that raced the open transaction cannot outlive it.
+    quiz_catalogue.invalidate(broadcast=False)
+    transaction.on_commit(quiz_catalogue.invalidate)
@@ -0,0 +1 @@
+"""Live SOS alerts for parents and teachers over WebSockets."""
@@ -0,0 +1,99 @@
+"""A local TCP broker that relays SOS alerts between worker processes.
+
+Each process keeps one connection to the broker and writes every alert it
+publishes as a line ``<channels separated by spaces>\\t<JSON text>``; the
+broker copies the line to every other connected process, which hands it
+to its own listeners. Alerts are not stored: a process that is not
+connected when an alert is sent does not receive it.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 1.0
+# Bytes a peer may fall behind before the broker drops it
+MAX_PEER_BUFFER = 1 << 20
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def encode_frame(channels, text):
+    return f"{' '.join(channels)}\t{text}\n".encode('utf-8')
+
+
+def decode_frame(line):
+    channels, _, text = line.decode('utf-8').rstrip('\n').partition('\t')
+    return channels.split(), text
+
+
+class Broker:
+    def __init__(self):
+        self._peers = set()
+
+    @property
+    def peers(self):
+        return len(self._peers)
+
+    async def handle(self, reader, writer):
+        self._peers.add(writer)
+        try:
+            async for line in reader:
+                for peer in self._peers:
+                    if peer is writer or peer.is_closing():
+                        continue
+                    if peer.transport.get_write_buffer_size() > MAX_PEER_BUFFER:
+                        logger.warning('Dropping an SOS broker peer that stopped reading')
+                        peer.close()
+                        continue
+                    peer.write(line)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    async def start(self, address):
+        host, port = parse_address(address)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+class BrokerLink:
+    """A process's connection to the broker, reconnecting whenever it drops"""
+
+    def __init__(self, hub, address):
+        self.hub = hub
+        self.address = address
+        self.task = None
+        self._writer = None
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def send(self, channels, text):
+        if not self.connected:
+            logger.warning('SOS broker unreachable; alert delivered in this process only')
+            return
+        self._writer.write(encode_frame(channels, text))
+
+    async def _run(self):
+        host, port = parse_address(self.address)
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(host, port)
+                async for line in reader:
+                    self.hub.deliver(*decode_frame(line))
+            except (OSError, ValueError) as exc:
+                logger.warning('SOS broker connection to %s failed: %s', self.address, exc)
+            finally:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+            await asyncio.sleep(RECONNECT_DELAY)
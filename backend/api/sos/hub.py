@@ -0,0 +1,159 @@
+"""In-process fan-out of SOS alerts to connected WebSocket clients.
+
+Teachers listen on the ``teachers`` channel and parents on their child's
+``child:<identifier>`` channel. An alert is serialised once and put on
+each listener's queue without awaiting, so publishing costs a lookup and
+a put per listener. Idle connections hold no timers of their own: a
+single sweeper per process closes those that stopped sending pings, and a
+listener that falls ``SOS_SEND_QUEUE`` messages behind is closed rather
+than buffered.
+
+With ``SOS_BROKER_ADDRESS`` set, alerts are also relayed through the local
+broker (``manage.py sos_broker``) so that listeners connected to other
+worker processes receive them too.
+"""
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+TEACHERS = 'teachers'
+
+# WebSocket close codes sent by the server
+CLOSE_IDLE = 4408
+CLOSE_SLOW = 1013
+
+
+def child_channel(identifier):
+    return f'child:{identifier.strip().lower()}'
+
+
+def listen_channels(role, identifier):
+    """Channels a logged-in user receives alerts on; children receive none"""
+    if role == 'teacher':
+        return [TEACHERS]
+    if role == 'parent':
+        # Parents log in with their child's email, as for quiz progress
+        return [child_channel(identifier)]
+    return []
+
+
+def alert_channels(child_identifier):
+    return [TEACHERS, child_channel(child_identifier)]
+
+
+class Subscriber:
+    """One connection's subscription: its channels and outgoing messages.
+
+    The queue holds message texts, or a close code once the hub wants the
+    connection gone.
+    """
+
+    __slots__ = ('channels', 'queue', 'max_queue', 'last_seen', 'closed')
+
+    def __init__(self, channels, max_queue):
+        self.channels = tuple(channels)
+        # deliver() enforces the limit so a close code always fits
+        self.queue = asyncio.Queue()
+        self.max_queue = max_queue
+        self.last_seen = time.monotonic()
+        self.closed = False
+
+    def deliver(self, text):
+        if self.closed:
+            return
+        if self.queue.qsize() >= self.max_queue:
+            self.close(CLOSE_SLOW)
+            return
+        self.queue.put_nowait(text)
+
+    def close(self, code):
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(code)
+
+
+class Hub:
+    def __init__(self, broker_address=None):
+        self._broker_address = broker_address
+        self._channels = {}
+        self._subscribers = set()
+        self._sweeper = None
+        self._link = None
+
+    @property
+    def broker_address(self):
+        return self._broker_address if self._broker_address is not None else settings.SOS_BROKER_ADDRESS
+
+    @property
+    def connections(self):
+        return len(self._subscribers)
+
+    def subscribe(self, channels):
+        subscriber = Subscriber(channels, settings.SOS_SEND_QUEUE)
+        self._subscribers.add(subscriber)
+        for channel in subscriber.channels:
+            self._channels.setdefault(channel, set()).add(subscriber)
+        self._start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+        for channel in subscriber.channels:
+            members = self._channels.get(channel)
+            if members is not None:
+                members.discard(subscriber)
+                if not members:
+                    del self._channels[channel]
+
+    def publish(self, channels, message):
+        """Send message to the subscribers of channels in every process.
+
+        Must be called from the event loop. Returns how many connections in
+        this process it was handed to.
+        """
+        text = json.dumps(message, cls=DjangoJSONEncoder)
+        self._start()
+        if self._link is not None:
+            self._link.send(channels, text)
+        return self.deliver(channels, text)
+
+    def deliver(self, channels, text):
+        """Queue text for this process's subscribers of channels"""
+        if len(channels) == 1:
+            targets = self._channels.get(channels[0], ())
+        else:
+            # A teacher who is also a parent gets an alert once
+            targets = set().union(*(self._channels.get(channel, ()) for channel in channels))
+        for subscriber in targets:
+            subscriber.deliver(text)
+        return len(targets)
+
+    def _start(self):
+        """Run the idle sweeper and broker link on the current event loop"""
+        loop = asyncio.get_running_loop()
+        if self._subscribers and not _running_on(self._sweeper, loop):
+            self._sweeper = loop.create_task(self._sweep())
+        if self.broker_address and (self._link is None or not _running_on(self._link.task, loop)):
+            from .broker import BrokerLink
+
+            self._link = BrokerLink(self, self.broker_address)
+            self._link.start()
+
+    async def _sweep(self):
+        timeout = settings.SOS_IDLE_TIMEOUT
+        while self._subscribers:
+            await asyncio.sleep(timeout / 3)
+            cutoff = time.monotonic() - timeout
+            for subscriber in self._subscribers:
+                if subscriber.last_seen < cutoff:
+                    subscriber.close(CLOSE_IDLE)
+
+
+def _running_on(task, loop):
+    return task is not None and not task.done() and task.get_loop() is loop
+
+
+hub = Hub()
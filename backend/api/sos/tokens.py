@@ -0,0 +1,23 @@
+"""Signed tokens that identify an SOS sender or listener.
+
+The login view hands one out; it carries the role and identifier the user
+logged in with and is valid for ``SOS_TOKEN_MAX_AGE`` seconds.
+"""
+from django.conf import settings
+from django.core import signing
+
+SALT = 'api.sos'
+
+
+def issue_token(role, identifier):
+    return signing.dumps({'role': role, 'id': identifier.strip().lower()}, salt=SALT)
+
+
+def read_token(token):
+    """The {'role', 'id'} claims of a valid token, otherwise None"""
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=SALT, max_age=settings.SOS_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
@@ -0,0 +1,105 @@
+"""The ``/ws/sos`` ASGI WebSocket endpoint used by useSOSWebSocket.
+
+Clients send ``{"type": "auth", "token": ...}`` with the token from the
+login response as their first message, so it never appears in URLs or
+access logs. Parents and teachers are then subscribed to their alert
+channels and receive ``connected``, ``SOS_ALERT`` and ``pong`` messages;
+anything else is closed without being subscribed.
+"""
+import asyncio
+import json
+import time
+
+from django.conf import settings
+
+from .hub import hub, listen_channels
+from .tokens import read_token
+
+PING = '{"type":"ping"}'
+PONG = json.dumps({'type': 'pong'})
+CONNECTED = json.dumps({'type': 'connected', 'message': 'Listening for SOS alerts.'})
+
+# Close codes for a rejected handshake
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+
+# Client messages longer than this are ignored unread
+MAX_CLIENT_MESSAGE = 1024
+
+
+def _client_message(text):
+    """The client's JSON object, or None for anything else"""
+    if not text or len(text) > MAX_CLIENT_MESSAGE:
+        return None
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
+
+
+def _is_ping(text):
+    if text == PING:
+        return True
+    message = _client_message(text)
+    return message is not None and message.get('type') == 'ping'
+
+
+async def _read_token(receive):
+    """The token from the client's auth message, '' if it sent something else
+    or stayed silent past SOS_AUTH_TIMEOUT, or None if it disconnected"""
+    try:
+        message = await asyncio.wait_for(receive(), settings.SOS_AUTH_TIMEOUT)
+    except asyncio.TimeoutError:
+        return ''
+    if message['type'] != 'websocket.receive':
+        return None
+    auth = _client_message(message.get('text'))
+    if auth is None or auth.get('type') != 'auth' or not isinstance(auth.get('token'), str):
+        return ''
+    return auth['token']
+
+
+async def _forward(subscriber, send):
+    """Write the subscriber's queued messages to the socket until it is closed"""
+    while True:
+        item = await subscriber.queue.get()
+        if isinstance(item, int):
+            await send({'type': 'websocket.close', 'code': item})
+            return
+        await send({'type': 'websocket.send', 'text': item})
+
+
+async def sos_websocket(scope, receive, send):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    # Browsers cannot set headers on a WebSocket, so the token arrives in
+    # the first message rather than the query string
+    await send({'type': 'websocket.accept'})
+    token = await _read_token(receive)
+    if token is None:
+        return
+    claims = read_token(token)
+    channels = listen_channels(claims['role'], claims['id']) if claims else []
+    if not channels:
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN if claims else CLOSE_UNAUTHORIZED})
+        return
+
+    subscriber = hub.subscribe(channels)
+    subscriber.deliver(CONNECTED)
+    # One reader (this coroutine) and one writer per connection; both sleep
+    # until the client or the hub has something for them
+    writer = asyncio.ensure_future(_forward(subscriber, send))
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] != 'websocket.receive':
+                continue
+            subscriber.last_seen = time.monotonic()
+            if _is_ping(message.get('text')):
+                subscriber.deliver(PONG)
+    finally:
+        hub.unsubscribe(subscriber)
+        writer.cancel()
@@ -1,10 +1,67 @@
+import asyncio
+import io
 import json
-from datetime import date
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import addModuleCleanup, mock
 
-from django.test import Client, TestCase
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.db.models.query import QuerySet
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Article, RegistrationRequest
+from .accounts import hash_passwords
+from .csv_import import Checkpoint, read_csv_rows
+from .chat.backends import StubClient, get_client
+from .chat.concurrency import ChatOverloaded, LeasedStream, LLMLimiter
+from .chat.escalation import SOS_REPLY, generate_follow_up
+from .chat.gemini import FALLBACK_REPLY, GeminiClient
+from .chat.resilience import CircuitBreaker, breaker
+from .chat.response_cache import normalize_message, response_cache
+from .chat.safety import KeywordMatcher, detect_emotion
+from .chat.sessions import summarize_session
+from .management.commands import load_csv_data
+from .models import (
+    Article,
+    ChatMessage,
+    ChatResponseCache,
+    ChatSession,
+    ChatUsage,
+    Question,
+    QuestionResponse,
+    Quiz,
+    QuizAttempt,
+    RegistrationRequest,
+    SafetyEvent,
+)
+from .progress import older_than, progress_queryset
+from .quiz_cache import quiz_catalogue
+from .quiz_sync import sync_quiz
+from .sos.broker import Broker
+from .sos.hub import CLOSE_IDLE, CLOSE_SLOW, Hub
+from .sos.tokens import issue_token, read_token
+
+
+def setUpModule():
+    # Saving quizzes invalidates the catalogue cache, which touches its stamp
+    # file; keep that out of the project directory
+    stamp_dir = tempfile.TemporaryDirectory()
+    addModuleCleanup(stamp_dir.cleanup)
+    stamp_override = override_settings(QUIZ_CACHE_STAMP_FILE=os.path.join(stamp_dir.name, 'quiz-version'))
+    stamp_override.enable()
+    addModuleCleanup(stamp_override.disable)
 
 
 class ApiEndpointsTests(TestCase):
@@ -62,4 +119,1664 @@ class ApiEndpointsTests(TestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+
+class TeacherProgressTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.quiz_one = Quiz.objects.create(level=1, title='Level 1', badge_name='Star')
+        self.quiz_two = Quiz.objects.create(level=2, title='Level 2', badge_name='Champion')
+        for idx in range(5):
+            QuizAttempt.objects.create(
+                child_email=f'child{idx % 2}@example.com',
+                quiz=self.quiz_one if idx < 3 else self.quiz_two,
+                score=idx % 3,
+                total_questions=2,
+                is_completed=idx % 2 == 0,
+            )
+
+    def _get(self, **params):
+        params.setdefault('identifier', 'teacher@example.com')
+        return self.client.get(reverse('api:quiz-progress-teacher'), params)
+
+    def test_pages_cover_every_attempt_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            payload = self._get(**params).json()
+            seen.extend(row['attemptId'] for row in payload['results'])
+            cursor = payload['nextCursor']
+            if not cursor:
+                break
+        self.assertEqual(
+            seen,
+            list(QuizAttempt.objects.order_by('-started_at', '-id').values_list('id', flat=True)),
+        )
+
+    def test_aggregates_are_grouped_server_side(self):
+        with self.assertNumQueries(4):
+            payload = self._get(aggregates='1').json()
+
+        self.assertEqual(payload['summary']['totalStudents'], 2)
+        self.assertEqual(payload['summary']['attempts'], 5)
+        self.assertEqual(payload['summary']['completed'], 3)
+        by_level = {row['level']: row for row in payload['byLevel']}
+        self.assertEqual(by_level[1]['attempts'], 3)
+        self.assertEqual(by_level[1]['completionRate'], 67)
+        self.assertEqual(by_level[2]['averagePercentage'], 25)
+
+    def test_later_pages_can_ask_for_their_children_only(self):
+        first = self._get(limit=3).json()
+        with self.assertNumQueries(2):
+            payload = self._get(limit=3, cursor=first['nextCursor'], aggregates='children').json()
+
+        self.assertNotIn('summary', payload)
+        self.assertNotIn('byLevel', payload)
+        page_children = {row['childEmail'] for row in payload['results']}
+        self.assertEqual({row['childEmail'] for row in payload['byChild']}, page_children)
+        by_child = {row['childEmail']: row for row in payload['byChild']}
+        self.assertEqual(by_child['child0@example.com']['attempts'], 3)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self._get(cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+
+class QuizProgressQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.quizzes = [
+            Quiz.objects.create(level=level, title=f'Level {level}', badge_name='Badge')
+            for level in range(1, 4)
+        ]
+
+    def _create_attempts(self, count):
+        for idx in range(count):
+            QuizAttempt.objects.create(
+                child_email='child@example.com',
+                quiz=self.quizzes[idx % len(self.quizzes)],
+                score=1,
+                total_questions=2,
+                # Only one attempt per quiz may be left open
+                is_completed=True,
+            )
+
+    def _assert_constant_queries(self, role):
+        url = reverse('api:quiz-progress')
+        params = {'role': role, 'identifier': 'child@example.com'}
+
+        self._create_attempts(1)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get(url, params).json()), 1)
+
+        self._create_attempts(9)
+        with self.assertNumQueries(1):
+            payload = self.client.get(url, params).json()
+        self.assertEqual(len(payload), 10)
+        self.assertEqual(payload[0]['percentage'], 50)
+        self.assertIn(payload[0]['quizTitle'], {quiz.title for quiz in self.quizzes})
+
+    def test_child_progress_runs_constant_queries(self):
+        self._assert_constant_queries('child')
+
+    def test_parent_progress_runs_constant_queries(self):
+        self._assert_constant_queries('parent')
+
+    def test_teacher_progress_runs_constant_queries(self):
+        self._assert_constant_queries('teacher')
+
+
+class QuizAttemptFixtureMixin:
+    def setUp(self):
+        self.client = Client()
+        quiz = Quiz.objects.create(level=1, title='Level 1', badge_name='Star')
+        self.questions = [
+            Question.objects.create(
+                quiz=quiz,
+                question_text=f'Question {idx}',
+                options=['right', 'wrong'],
+                correct_answer='right',
+                order=idx,
+            )
+            for idx in range(2)
+        ]
+        self.attempt = QuizAttempt.objects.create(
+            child_email='child@example.com',
+            quiz=quiz,
+            total_questions=2,
+        )
+
+    def _submit(self, question, answer):
+        response = self.client.post(
+            reverse('api:quiz-submit'),
+            data=json.dumps(
+                {
+                    'attemptId': self.attempt.id,
+                    'questionId': question.id,
+                    'selectedAnswer': answer,
+                }
+            ),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['currentScore']
+
+
+class QuizSubmitAnswerTests(QuizAttemptFixtureMixin, TestCase):
+    def test_score_tracks_changed_answers_incrementally(self):
+        first, second = self.questions
+        self.assertEqual(self._submit(first, 'wrong'), 0)
+        self.assertEqual(self._submit(first, 'right'), 1)
+        self.assertEqual(self._submit(first, 'right'), 1)
+        self.assertEqual(self._submit(second, 'right'), 2)
+        self.assertEqual(self._submit(first, 'wrong'), 1)
+
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, 1)
+        self.assertEqual(QuestionResponse.objects.filter(attempt=self.attempt).count(), 2)
+
+    def test_submission_does_not_recount_responses(self):
+        self._submit(self.questions[0], 'right')
+        # Attempt, question and response lookups, the response write and the
+        # score update, plus the savepoint pair of the enclosing test case.
+        with self.assertNumQueries(7):
+            self._submit(self.questions[0], 'wrong')
+
+    def test_complete_keeps_a_score_changed_after_the_attempt_was_read(self):
+        now = timezone.now
+
+        def submit_meanwhile():
+            # An answer lands between completion reading the attempt and writing it
+            QuizAttempt.objects.filter(id=self.attempt.id).update(score=F('score') + 1)
+            return now()
+
+        with mock.patch('api.views.timezone.now', side_effect=submit_meanwhile):
+            response = self.client.post(
+                reverse('api:quiz-complete'),
+                data=json.dumps({'attemptId': self.attempt.id}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, 1)
+        self.assertTrue(self.attempt.is_completed)
+
+
+class QuizSubmitBatchTests(QuizAttemptFixtureMixin, TestCase):
+    def _submit_batch(self, answers, complete=False):
+        return self.client.post(
+            reverse('api:quiz-submit-batch'),
+            data=json.dumps(
+                {
+                    'attemptId': self.attempt.id,
+                    'answers': answers,
+                    'complete': complete,
+                }
+            ),
+            content_type='application/json',
+        )
+
+    def test_batch_grades_upserts_and_completes(self):
+        first, second = self.questions
+        self._submit(first, 'wrong')
+
+        response = self._submit_batch(
+            [
+                {'questionId': first.id, 'selectedAnswer': 'right'},
+                {'questionId': second.id, 'selectedAnswer': 'right'},
+            ],
+            complete=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload['currentScore'], 2)
+        self.assertEqual(payload['percentage'], 100)
+        self.assertTrue(payload['isCompleted'])
+
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, 2)
+        self.assertTrue(self.attempt.is_completed)
+        self.assertEqual(
+            list(
+                QuestionResponse.objects.filter(attempt=self.attempt)
+                .order_by('question__order')
+                .values_list('selected_answer', flat=True)
+            ),
+            ['right', 'right'],
+        )
+
+    def test_batch_rejects_questions_from_other_quizzes(self):
+        other_quiz = Quiz.objects.create(level=9, title='Other', badge_name='Other')
+        stray = Question.objects.create(
+            quiz=other_quiz, question_text='Stray', correct_answer='right', order=0
+        )
+        response = self._submit_batch([{'questionId': stray.id, 'selectedAnswer': 'right'}])
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(QuestionResponse.objects.exists())
+
+
+class QuizConcurrentSubmitTests(QuizAttemptFixtureMixin, TransactionTestCase):
+    """Submissions for one attempt from several threads, each on its own connection"""
+
+    THREADS = 5
+
+    def setUp(self):
+        super().setUp()
+        self.questions += [
+            Question.objects.create(
+                quiz=self.attempt.quiz,
+                question_text=f'Question {idx}',
+                options=['right', 'wrong'],
+                correct_answer='right',
+                order=idx,
+            )
+            for idx in range(len(self.questions), self.THREADS)
+        ]
+
+    def _run_concurrently(self, url, payloads):
+        barrier = threading.Barrier(len(payloads))
+        statuses = [None] * len(payloads)
+
+        def submit(index, payload):
+            try:
+                barrier.wait()
+                statuses[index] = Client().post(
+                    url, data=json.dumps(payload), content_type='application/json'
+                ).status_code
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=item) for item in enumerate(payloads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_concurrent_single_submits_all_count(self):
+        statuses = self._run_concurrently(
+            reverse('api:quiz-submit'),
+            [
+                {'attemptId': self.attempt.id, 'questionId': question.id, 'selectedAnswer': 'right'}
+                for question in self.questions
+            ],
+        )
+        self.assertEqual(statuses, [200] * self.THREADS)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, self.THREADS)
+        self.assertEqual(QuestionResponse.objects.filter(attempt=self.attempt).count(), self.THREADS)
+
+    def test_concurrent_batches_all_count(self):
+        statuses = self._run_concurrently(
+            reverse('api:quiz-submit-batch'),
+            [
+                {
+                    'attemptId': self.attempt.id,
+                    'answers': [{'questionId': question.id, 'selectedAnswer': 'right'}],
+                }
+                for question in self.questions
+            ],
+        )
+        self.assertEqual(statuses, [200] * self.THREADS)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, self.THREADS)
+        self.assertEqual(QuestionResponse.objects.filter(attempt=self.attempt).count(), self.THREADS)
+
+
+class QuizCatalogueCacheTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        stamp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(stamp_dir.cleanup)
+        self.stamp_file = os.path.join(stamp_dir.name, 'quiz-version')
+        settings_override = override_settings(QUIZ_CACHE_STAMP_FILE=self.stamp_file)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.quiz = Quiz.objects.create(level=1, title='Level 1', badge_name='Star')
+        Question.objects.create(
+            quiz=self.quiz, question_text='First?', options=['a'], correct_answer='a'
+        )
+        quiz_catalogue.invalidate(broadcast=False)
+
+    def test_warm_reads_do_not_touch_the_database(self):
+        self.client.get(reverse('api:quiz-list'))
+        hits = quiz_catalogue.hits
+        with self.assertNumQueries(0):
+            listing = self.client.get(reverse('api:quiz-list')).json()
+            detail = self.client.get(reverse('api:quiz-detail', args=[self.quiz.id])).json()
+            missing = self.client.get(reverse('api:quiz-detail', args=[self.quiz.id + 1]))
+        self.assertEqual(listing[0]['questionCount'], 1)
+        self.assertEqual(detail['questions'][0]['q'], 'First?')
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(quiz_catalogue.hits, hits + 3)
+
+    def test_list_counts_questions_in_one_grouped_query(self):
+        other = Quiz.objects.create(level=2, title='Level 2', badge_name='Champion')
+        quiz_catalogue.invalidate(broadcast=False)
+        # Annotated quiz query plus one prefetch of every question
+        with self.assertNumQueries(2):
+            listing = self.client.get(reverse('api:quiz-list')).json()
+        self.assertEqual([row['questionCount'] for row in listing], [1, 0])
+        self.assertNotIn('questions', listing[0])
+        self.assertEqual(listing[1]['id'], other.id)
+
+    def test_list_can_include_questions_and_project_fields(self):
+        listing = self.client.get(
+            reverse('api:quiz-list'), {'include': 'questions', 'fields': 'id,questions'}
+        ).json()
+        self.assertEqual(listing, [{
+            'id': self.quiz.id,
+            'questions': [{
+                'id': self.quiz.questions.get().id,
+                'q': 'First?',
+                'options': ['a'],
+                'correct': 'a',
+                'order': 0,
+            }],
+        }])
+
+        response = self.client.get(reverse('api:quiz-list'), {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_question_writes_invalidate_the_catalogue(self):
+        self.client.get(reverse('api:quiz-list'))
+        Question.objects.create(
+            quiz=self.quiz, question_text='Second?', options=['a'], correct_answer='a', order=1
+        )
+        listing = self.client.get(reverse('api:quiz-list')).json()
+        self.assertEqual(listing[0]['questionCount'], 2)
+
+    def test_stamp_file_invalidates_other_processes(self):
+        self.client.get(reverse('api:quiz-list'))
+        # Simulate a management command in another process: it writes the
+        # rows and touches the stamp, but this process gets no signal.
+        Quiz.objects.filter(id=self.quiz.id).update(title='Renamed')
+        with open(self.stamp_file, 'w', encoding='utf-8') as stamp:
+            stamp.write('external')
+        listing = self.client.get(reverse('api:quiz-list')).json()
+        self.assertEqual(listing[0]['title'], 'Renamed')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        quiz_catalogue.invalidate(broadcast=False)
+
+    def _assert_revalidates(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('max-age=', first.headers['Cache-Control'])
+        etag = first.headers['ETag']
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(cached.headers['ETag'], etag)
+        return etag
+
+    def test_news_returns_not_modified_until_articles_change(self):
+        etag = self._assert_revalidates(reverse('api:news-list'))
+        Article.objects.create(
+            slug='fresh', title='Fresh', summary='New', category='General',
+            published_at=date(2025, 3, 1),
+        )
+        response = self.client.get(reverse('api:news-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_quiz_list_and_detail_support_conditional_get(self):
+        quiz = Quiz.objects.create(level=1, title='Level 1', badge_name='Star')
+        self._assert_revalidates(reverse('api:quiz-list'))
+        self._assert_revalidates(reverse('api:quiz-detail', args=[quiz.id]))
+        self.assertIn(
+            'Last-Modified', self.client.get(reverse('api:quiz-list')).headers
+        )
+
+
+class NewsPaginationTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        for idx in range(5):
+            Article.objects.create(
+                slug=f'article-{idx}',
+                title=f'Article {idx}',
+                summary='Summary',
+                category='Legal' if idx % 2 else 'Community',
+                published_at=date(2025, 1, 1 + idx // 2),
+            )
+
+    def _collect(self, **params):
+        slugs = []
+        while True:
+            response = self.client.get(reverse('api:news-list'), params)
+            self.assertEqual(response.status_code, 200)
+            slugs.extend(item['id'] for item in response.json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                return slugs
+            params['cursor'] = cursor
+
+    def test_cursor_walks_the_feed_in_order(self):
+        self.assertEqual(
+            self._collect(limit=2),
+            ['article-4', 'article-2', 'article-3', 'article-0', 'article-1'],
+        )
+
+    def test_category_and_since_filters(self):
+        self.assertEqual(
+            self._collect(limit=1, category='Legal', since='2025-01-02'),
+            ['article-3'],
+        )
+
+    def _feed_plans(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api:news-list'), params)
+        self.assertEqual(response.status_code, 200)
+        feed = [query['sql'] for query in queries if 'FROM "api_article"' in query['sql']]
+        self.assertEqual(len(feed), 1)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + feed[0])
+            return '\n'.join(row[-1] for row in cursor.fetchall()), response.headers.get('X-Next-Cursor')
+
+    def test_pages_read_the_index_in_feed_order(self):
+        plan, cursor = self._feed_plans(limit=2)
+        self.assertIn('USING INDEX article_published_title_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan, _ = self._feed_plans(limit=2, cursor=cursor)
+        self.assertRegex(plan, r'SEARCH api_article USING INDEX article_published_title_idx \(published_at<\?\)')
+        self.assertNotIn('SCAN', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan, _ = self._feed_plans(limit=1, category='Legal', cursor=cursor)
+        self.assertIn('SEARCH api_article USING INDEX article_category_published_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_filtered_empty_page_skips_placeholders(self):
+        response = self.client.get(reverse('api:news-list'), {'category': 'Missing'})
+        self.assertEqual(response.json(), [])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.article = Article.objects.create(
+            slug='pocso-guide',
+            title='Understanding POCSO',
+            summary='How the POCSO Act protects children and who must report abuse.',
+            category='Legal Brief',
+            published_at=date(2025, 1, 1),
+        )
+        quiz = Quiz.objects.create(level=3, title='Power to Protect', badge_name='Champion')
+        self.question = Question.objects.create(
+            quiz=quiz,
+            question_text='What is the National Child Helpline Number?',
+            correct_answer='1098',
+        )
+
+    def _search(self, **params):
+        response = self.client.get(reverse('api:search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_ranked_results_with_highlighted_snippets(self):
+        results = self._search(q='pocso')
+        self.assertEqual([result['id'] for result in results], ['pocso-guide'])
+        self.assertIn('<mark>POCSO</mark>', results[0]['snippet'])
+
+        results = self._search(q='helpline numb', type='question')
+        self.assertEqual(results[0]['id'], self.question.id)
+        self.assertEqual(results[0]['level'], 3)
+
+    def test_kinds_are_interleaved_rather_than_ranked_together(self):
+        # bm25 from the two tables is not comparable; alternate kinds instead
+        Article.objects.create(
+            slug='reporting', title='Reporting', summary='Report it, report it, report it.',
+            category='Guide', published_at=date(2025, 1, 2),
+        )
+        for n in range(3):
+            Question.objects.create(quiz=self.question.quiz, question_text=f'Who do you report to? ({n})', correct_answer='x')
+        results = self._search(q='report')
+        self.assertEqual(
+            [result['type'] for result in results],
+            ['article', 'question', 'article', 'question', 'question'],
+        )
+        self.assertEqual(results[0]['id'], 'reporting')
+
+    def test_index_follows_updates_and_deletes(self):
+        Article.objects.filter(id=self.article.id).update(summary='Nothing relevant here.')
+        self.assertEqual(self._search(q='report'), [])
+        self.question.delete()
+        self.assertEqual(self._search(q='helpline'), [])
+
+    def test_query_syntax_is_not_passed_through(self):
+        self.assertEqual(self._search(q='"pocso" (*'), self._search(q='pocso'))
+        self.assertEqual(self._search(q='pocso NOT'), [])
+        self.assertEqual(self.client.get(reverse('api:search')).status_code, 400)
+
+
+class GeminiClientTests(TestCase):
+    def test_setup_runs_once_across_messages(self):
+        client = GeminiClient('test-key', 'gemini-test')
+        with mock.patch('google.generativeai.configure') as configure, \
+                mock.patch('google.generativeai.GenerativeModel') as model_class:
+            model_class.return_value.generate_content.return_value.text = ' Hello! '
+            self.assertEqual(client.generate('one'), 'Hello!')
+            self.assertEqual(client.generate('two'), 'Hello!')
+
+        configure.assert_called_once_with(api_key='test-key')
+        model_class.assert_called_once_with('models/gemini-test')
+        self.assertEqual(model_class.return_value.generate_content.call_count, 2)
+        status = client.status()
+        self.assertTrue(status['ready'])
+        self.assertGreaterEqual(status['setup']['totalMs'], 0)
+
+    @override_settings(GEMINI_API_KEY='')
+    def test_missing_api_key_is_reported(self):
+        response = Client().post(
+            reverse('api:chat-send'),
+            data=json.dumps({'message': 'Hi'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('GEMINI_API_KEY', response.json()['error'])
+
+
+@override_settings(CHAT_BACKEND='stub', CHAT_STUB_LATENCY=0, CHAT_STUB_TOKEN_DELAY=0, CHAT_STUB_TOKENS=4)
+class ChatBackendTests(TestCase):
+    def test_backend_follows_settings(self):
+        self.assertIsInstance(get_client(), StubClient)
+        self.assertIs(get_client(), get_client())
+        with override_settings(CHAT_BACKEND='gemini'):
+            self.assertIsInstance(get_client(), GeminiClient)
+        with override_settings(CHAT_BACKEND='nope'), self.assertRaises(ImproperlyConfigured):
+            get_client()
+
+    def test_stub_is_deterministic(self):
+        client = get_client()
+        chunks = list(client.stream('System\n\nUser: Hi there\n\nSparkle:'))
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(chunks[0], 'You said "Hi there".')
+        self.assertEqual(client.generate('System\n\nUser: Hi there\n\nSparkle:'), ''.join(chunks))
+
+    def test_chat_runs_end_to_end_on_the_stub(self):
+        response = async_to_sync(AsyncClient().post)(
+            reverse('api:chat-send'),
+            data=json.dumps({'message': 'What is POCSO?'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['response'], 'You said "What is POCSO?". Remember that you')
+
+
+class ChatStreamTests(TestCase):
+    def setUp(self):
+        self.addCleanup(breaker.record_success)
+
+    def _stream(self, message, chunks):
+        async def collect():
+            response = await AsyncClient().post(
+                reverse('api:chat-stream'),
+                data=json.dumps({'message': message}),
+                content_type='application/json',
+            )
+            body = b''.join([chunk async for chunk in response.streaming_content])
+            return response, body.decode('utf-8')
+
+        client = mock.Mock()
+        client.stream.return_value = iter(chunks)
+        with mock.patch('api.views.get_client', return_value=client):
+            response, body = async_to_sync(collect)()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = []
+        for block in body.strip().split('\n\n'):
+            event_line, data_line = block.split('\n')
+            events.append((event_line[len('event: '):], json.loads(data_line[len('data: '):])))
+        return events
+
+    def test_emotion_precedes_tokens(self):
+        events = self._stream('I feel sad', ['Please ', 'tell a trusted adult.'])
+        self.assertEqual([name for name, _ in events], ['emotion', 'token', 'token', 'done'])
+        self.assertEqual(events[0][1]['detectedEmotion']['emotion'], 'slightly_negative')
+        self.assertEqual(events[-1][1]['response'], 'Please tell a trusted adult.')
+
+    def test_safety_concern_streams_sos_reply_without_model(self):
+        events = self._stream('My uncle hurts me', ['never used'])
+        self.assertEqual([name for name, _ in events], ['emotion', 'token', 'done'])
+        self.assertTrue(events[0][1]['hasSafetyConcern'])
+        self.assertEqual(events[-1][1]['response'], SOS_REPLY)
+        self.assertEqual(events[-1][1]['safetyEventId'], SafetyEvent.objects.get().id)
+
+    def test_generation_failure_becomes_error_event(self):
+        def failing():
+            yield 'Hi'
+            raise RuntimeError('quota exceeded')
+
+        events = self._stream('Hello', failing())
+        self.assertEqual(events[-1][0], 'error')
+        self.assertIn('quota', events[-1][1]['error'])
+
+
+class LLMLimiterTests(TestCase):
+    async def test_waiters_are_bounded_and_time_out(self):
+        limiter = LLMLimiter(max_in_flight=1, max_waiting=1, wait_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold_slot():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.stats(), {'inFlight': 1, 'waiting': 1})
+
+        # The queue is full, so a third request is rejected straight away
+        with self.assertRaises(ChatOverloaded):
+            async with limiter.slot():
+                pass
+
+        # The queued request gives up once its wait times out
+        with self.assertRaises(ChatOverloaded):
+            await waiter
+
+        release.set()
+        await holder
+        self.assertEqual(limiter.stats(), {'inFlight': 0, 'waiting': 0})
+
+    def test_slots_are_shared_by_every_event_loop_in_the_process(self):
+        # Under runserver and WSGI each async view gets its own loop and thread
+        limiter = LLMLimiter(max_in_flight=1, max_waiting=1, wait_timeout=5)
+        lease = async_to_sync(limiter.acquire)()
+        leases = []
+        waiter = threading.Thread(target=lambda: leases.append(asyncio.run(limiter.acquire())))
+        waiter.start()
+        while limiter.stats()['waiting'] == 0:
+            time.sleep(0.01)
+
+        with self.assertRaises(ChatOverloaded):
+            async_to_sync(limiter.acquire)()
+        lease.release()
+        waiter.join(5)
+        self.assertEqual(limiter.stats(), {'inFlight': 1, 'waiting': 0})
+        leases[0].release()
+        self.assertEqual(limiter.stats(), {'inFlight': 0, 'waiting': 0})
+
+    @override_settings(CHAT_MAX_IN_FLIGHT=1, CHAT_MAX_QUEUE=0, CHAT_QUEUE_TIMEOUT=0.01)
+    async def test_chat_send_answers_429_when_saturated(self):
+        started = threading.Event()
+        finish = threading.Event()
+
+        def slow_generate(prompt, **kwargs):
+            started.set()
+            finish.wait(5)
+            return 'Hello!'
+
+        client = mock.Mock()
+        client.generate.side_effect = slow_generate
+        limiter = LLMLimiter()
+        with mock.patch('api.views.get_client', return_value=client), \
+                mock.patch('api.views.llm_limiter', limiter):
+            first = asyncio.create_task(self._post('Hi'))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            rejected = await self._post('Hi again')
+            finish.set()
+            accepted = await first
+
+        self.assertEqual(rejected.status_code, 429)
+        self.assertIn('Retry-After', rejected.headers)
+        self.assertNotIn('waiting', rejected.json()['error'])
+        self.assertEqual(accepted.status_code, 200)
+        self.assertEqual(accepted.json()['response'], 'Hello!')
+
+    @override_settings(CHAT_MAX_IN_FLIGHT=1, CHAT_MAX_QUEUE=0, CHAT_QUEUE_TIMEOUT=0.01)
+    async def test_chat_stream_answers_429_before_streaming(self):
+        started = threading.Event()
+        finish = threading.Event()
+
+        def slow_stream(prompt, **kwargs):
+            started.set()
+            finish.wait(5)
+            yield 'Hello!'
+
+        async def read_stream(message):
+            response = await self._post(message, 'api:chat-stream')
+            body = b''.join([chunk async for chunk in response.streaming_content])
+            return response, body.decode('utf-8')
+
+        client = mock.Mock()
+        client.stream.side_effect = slow_stream
+        limiter = LLMLimiter()
+        with mock.patch('api.views.get_client', return_value=client), \
+                mock.patch('api.views.llm_limiter', limiter):
+            first = asyncio.create_task(read_stream('Hi'))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            rejected = await self._post('Hi again', 'api:chat-stream')
+            finish.set()
+            accepted, body = await first
+
+        self.assertEqual(rejected.status_code, 429)
+        self.assertIn('Retry-After', rejected.headers)
+        self.assertEqual(accepted.status_code, 200)
+        self.assertIn('"response":"Hello!"', body)
+        self.assertEqual(limiter.stats(), {'inFlight': 0, 'waiting': 0})
+
+    async def test_lease_is_released_when_the_response_closes(self):
+        limiter = LLMLimiter(max_in_flight=1)
+
+        async def never_read():
+            yield b''
+
+        stream = LeasedStream(never_read(), await limiter.acquire())
+        self.assertEqual(limiter.stats()['inFlight'], 1)
+        # Django closes the response from a worker thread
+        await asyncio.to_thread(stream.close)
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.stats()['inFlight'], 0)
+
+    def _post(self, message, url_name='api:chat-send'):
+        return AsyncClient().post(
+            reverse(url_name),
+            data=json.dumps({'message': message}),
+            content_type='application/json',
+        )
+
+class ChatResponseCacheTests(TestCase):
+    def _send(self, message, reply='POCSO is a law that protects children.'):
+        client = mock.Mock()
+        client.generate.return_value = reply
+        with mock.patch('api.views.get_client', return_value=client):
+            response = async_to_sync(AsyncClient().post)(
+                reverse('api:chat-send'),
+                data=json.dumps({'message': message}),
+                content_type='application/json',
+            )
+        return response, client
+
+    def test_normalized_repeat_is_served_from_cache(self):
+        first, client = self._send('What is POCSO?')
+        self.assertEqual(first['X-Chat-Cache'], 'MISS')
+        client.generate.assert_called_once()
+
+        second, client = self._send('  what is pocso ')
+        self.assertEqual(second['X-Chat-Cache'], 'HIT')
+        self.assertEqual(second.json()['response'], 'POCSO is a law that protects children.')
+        client.generate.assert_not_called()
+        self.assertEqual(ChatResponseCache.objects.get().hits, 1)
+
+    def test_safety_concerns_bypass_cache(self):
+        first, _ = self._send('I feel unsafe')
+        second, _ = self._send('I feel unsafe')
+        self.assertEqual(first['X-Chat-Cache'], 'BYPASS')
+        self.assertEqual(second['X-Chat-Cache'], 'BYPASS')
+        self.assertFalse(ChatResponseCache.objects.exists())
+
+    def test_expired_entries_are_ignored(self):
+        response_cache.store('What is POCSO?', 'Old answer')
+        ChatResponseCache.objects.update(created_at=timezone.now() - timedelta(days=30))
+        self.assertIsNone(response_cache.lookup('What is POCSO?'))
+
+    @override_settings(CHAT_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        response_cache.store('first question', 'one')
+        response_cache.store('second question', 'two')
+        ChatResponseCache.objects.filter(normalized_message='first question').update(
+            last_used_at=timezone.now() + timedelta(minutes=1),
+        )
+        response_cache.store('third question', 'three')
+        self.assertEqual(
+            set(ChatResponseCache.objects.values_list('normalized_message', flat=True)),
+            {'first question', 'third question'},
+        )
+
+    def test_normalize_message(self):
+        self.assertEqual(normalize_message('Is it OK,  to say NO!?'), 'is it ok to say no')
+
+
+class SafetyDetectionTests(TestCase):
+    def test_keywords_match_whole_words_only(self):
+        self.assertEqual(detect_emotion('I like painting'), {'emotion': 'neutral', 'level': 0, 'hasSafetyConcern': False})
+        self.assertEqual(detect_emotion('I made a cake')['emotion'], 'neutral')
+
+    def test_stems_cover_inflections(self):
+        verdict = detect_emotion('He touched me and I was abused')
+        self.assertTrue(verdict['hasSafetyConcern'])
+        self.assertEqual(verdict['level'], 4)
+
+    def test_negative_words_are_counted_once_each(self):
+        self.assertEqual(detect_emotion('sad sad sad')['emotion'], 'slightly_negative')
+        self.assertEqual(detect_emotion('I feel sad, lonely and angry'), {'emotion': 'negative', 'level': 3, 'hasSafetyConcern': False})
+
+    def test_indic_keywords_respect_word_boundaries(self):
+        self.assertEqual(detect_emotion('मुझे डर लगता है')['emotion'], 'concerned')
+        self.assertEqual(detect_emotion('ನನಗೆ ಭಯವಾಗುತ್ತಿದೆ')['emotion'], 'concerned')
+        self.assertTrue(detect_emotion('उसने मुझे छुआ')['hasSafetyConcern'])
+        # डर inside a longer word is not a match
+        self.assertEqual(detect_emotion('सडर')['emotion'], 'neutral')
+
+    def test_ordinary_questions_are_not_escalated(self):
+        for message in ('What is POCSO?', 'Can my teacher be a trusted adult?', 'I hit a home run today'):
+            self.assertEqual(detect_emotion(message)['emotion'], 'neutral', message)
+        for message in ('What is a good touch?', 'Why are some body parts private?', 'Is it safe to talk to strangers online?',
+                        'What should I do if someone makes me feel unsafe?'):
+            verdict = detect_emotion(message)
+            self.assertFalse(verdict['hasSafetyConcern'], message)
+
+    def test_phrases_match_consecutive_words(self):
+        matcher = KeywordMatcher({'concern': {'en': ['bad touch']}, 'negative': {'en': ['bad']}})
+        self.assertEqual(matcher.count('a BAD   touch'), {'concern': 1, 'negative': 1})
+        self.assertEqual(matcher.count('bad day, touch base'), {'concern': 0, 'negative': 1})
+
+
+class SafetyEscalationTests(TestCase):
+    def _send(self, message):
+        return async_to_sync(AsyncClient().post)(
+            reverse('api:chat-send'),
+            data=json.dumps({'message': message}),
+            content_type='application/json',
+        )
+
+    def test_flagged_message_is_answered_without_the_model(self):
+        with mock.patch('api.views.get_client', side_effect=AssertionError('model called')), \
+                self.captureOnCommitCallbacks() as callbacks:
+            response = self._send('Someone touched me and I am scared')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['response'], SOS_REPLY)
+        self.assertTrue(data['hasSafetyConcern'])
+        self.assertEqual(data['followUpStatus'], SafetyEvent.FOLLOW_UP_PENDING)
+        event = SafetyEvent.objects.get(id=data['safetyEventId'])
+        self.assertEqual(event.message, 'Someone touched me and I am scared')
+        self.assertEqual(event.level, 4)
+        # The follow-up is only queued once the event is committed
+        self.assertEqual(len(callbacks), 1)
+
+    def test_questions_about_safety_are_answered_by_the_model(self):
+        client = mock.Mock()
+        client.generate.return_value = 'Good question!'
+        with mock.patch('api.views.get_client', return_value=client):
+            for message in ('what is safe touch', 'what are private parts', 'I am scared of the dark'):
+                data = self._send(message).json()
+                self.assertEqual(data['response'], 'Good question!')
+                self.assertFalse(data['hasSafetyConcern'])
+                self.assertEqual(data['detectedEmotion']['emotion'], 'concerned')
+        self.assertFalse(SafetyEvent.objects.exists())
+
+    @override_settings(CHAT_SAFETY_FOLLOW_UP=False)
+    def test_follow_up_can_be_disabled(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            data = self._send('My uncle hurts me').json()
+        self.assertEqual(data['followUpStatus'], SafetyEvent.FOLLOW_UP_SKIPPED)
+        self.assertEqual(callbacks, [])
+
+    def test_follow_up_is_stored_on_the_event(self):
+        event = SafetyEvent.objects.create(message='I feel unsafe', emotion='concerned', level=2, reply=SOS_REPLY)
+        client = mock.Mock()
+        client.generate.return_value = 'You are brave for saying so.'
+        with mock.patch('api.chat.escalation.get_client', return_value=client), \
+                mock.patch('api.chat.escalation.close_old_connections'):
+            generate_follow_up(event.id)
+
+        response = self.client.get(reverse('api:chat-safety-event', args=[event.id]))
+        self.assertEqual(response.json(), {
+            'safetyEventId': event.id,
+            'followUpStatus': SafetyEvent.FOLLOW_UP_COMPLETED,
+            'followUp': 'You are brave for saying so.',
+        })
+
+    def test_failed_follow_up_keeps_the_event(self):
+        event = SafetyEvent.objects.create(message='I feel unsafe', emotion='concerned', level=2, reply=SOS_REPLY)
+        with mock.patch('api.chat.escalation.get_client', side_effect=RuntimeError('quota exceeded')), \
+                mock.patch('api.chat.escalation.close_old_connections'):
+            generate_follow_up(event.id)
+        event.refresh_from_db()
+        self.assertEqual(event.follow_up_status, SafetyEvent.FOLLOW_UP_FAILED)
+
+
+class ChatSessionTests(TestCase):
+    def setUp(self):
+        self.model = mock.Mock()
+        self.model.generate.side_effect = lambda prompt, **kwargs: f'reply {self.model.generate.call_count}'
+        patcher = mock.patch('api.views.get_client', return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _send(self, message, session_id=None):
+        payload = {'message': message}
+        if session_id:
+            payload['sessionId'] = session_id
+        return async_to_sync(AsyncClient().post)(
+            reverse('api:chat-send'),
+            data=json.dumps(payload),
+            content_type='application/json',
+        ).json()
+
+    def _last_prompt(self):
+        return self.model.generate.call_args[0][0]
+
+    def test_follow_up_messages_carry_the_conversation(self):
+        first = self._send('What is a trusted adult?')
+        second = self._send('Can my teacher be one?', first['sessionId'])
+
+        self.assertEqual(second['sessionId'], first['sessionId'])
+        self.assertIn('User: What is a trusted adult?\nSparkle: reply 1', self._last_prompt())
+        self.assertTrue(self._last_prompt().endswith('User: Can my teacher be one?\n\nSparkle:'))
+        self.assertEqual(ChatMessage.objects.filter(session_id=first['sessionId']).count(), 4)
+
+    def test_unknown_session_starts_a_new_one(self):
+        data = self._send('Hello', 'not-a-session')
+        self.assertTrue(ChatSession.objects.filter(id=data['sessionId']).exists())
+
+    @override_settings(CHAT_CONTEXT_TURNS=1)
+    def test_prompt_keeps_only_the_recent_window(self):
+        session_id = self._send('first question')['sessionId']
+        self._send('second question', session_id)
+        self._send('third question', session_id)
+
+        prompt = self._last_prompt()
+        self.assertNotIn('first question', prompt)
+        self.assertIn('User: second question\nSparkle: reply 2', prompt)
+
+    @override_settings(CHAT_CONTEXT_TURNS=2)
+    def test_summary_is_queued_once_per_window(self):
+        session_id = None
+        queued = []
+        for n in range(6):
+            with self.captureOnCommitCallbacks() as callbacks:
+                session_id = self._send(f'question {n}', session_id)['sessionId']
+            queued.append(len(callbacks))
+        # Due after four exchanges; retried one window later if still pending
+        self.assertEqual(queued, [0, 0, 0, 1, 0, 1])
+
+    @override_settings(CHAT_CONTEXT_TURNS=1)
+    def test_older_turns_are_summarised_once(self):
+        session_id = self._send('first question')['sessionId']
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._send('second question', session_id)
+        self.assertEqual(len(callbacks), 1)
+
+        summariser = mock.Mock()
+        summariser.generate.return_value = 'The child asked two questions.'
+        with mock.patch('api.chat.sessions.get_client', return_value=summariser), \
+                mock.patch('api.chat.sessions.close_old_connections'):
+            summarize_session(session_id, ChatMessage.objects.latest('id').id)
+        self.assertIn('User: first question\nSparkle: reply 1', summariser.generate.call_args[0][0])
+        self.assertNotIn('second question', summariser.generate.call_args[0][0])
+
+        session = ChatSession.objects.get(id=session_id)
+        self.assertEqual(session.summary, 'The child asked two questions.')
+
+        self._send('third question', session_id)
+        prompt = self._last_prompt()
+        self.assertIn('Earlier in this conversation: The child asked two questions.', prompt)
+        self.assertNotIn('first question', prompt)
+        self.assertIn('User: second question', prompt)
+
+
+@override_settings(CHAT_RETRIES=1, CHAT_RETRY_BACKOFF=0, CHAT_BREAKER_THRESHOLD=2)
+class ChatResilienceTests(TestCase):
+    def setUp(self):
+        breaker.record_success()
+        self.addCleanup(breaker.record_success)
+        self.model = mock.Mock()
+        patcher = mock.patch('api.views.get_client', return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _send(self, message='What is POCSO?', session_id=None):
+        return async_to_sync(AsyncClient().post)(
+            reverse('api:chat-send'),
+            data=json.dumps({'message': message, 'sessionId': session_id}),
+            content_type='application/json',
+        )
+
+    def test_transient_errors_are_retried_with_a_deadline(self):
+        self.model.generate.side_effect = [TimeoutError('slow'), 'POCSO protects children.']
+        response = self._send()
+        self.assertEqual(response.json()['response'], 'POCSO protects children.')
+        self.assertEqual(self.model.generate.call_count, 2)
+        self.assertEqual(self.model.generate.call_args.kwargs['timeout'], 20.0)
+
+    def test_open_breaker_fails_fast_with_fallback_reply(self):
+        self.model.generate.side_effect = TimeoutError('slow')
+        for _ in range(2):
+            response = self._send()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['response'], FALLBACK_REPLY)
+            self.assertEqual(response['X-Chat-Degraded'], '1')
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        calls = self.model.generate.call_count
+
+        response = self._send()
+        self.assertEqual(response.json()['response'], FALLBACK_REPLY)
+        self.assertEqual(self.model.generate.call_count, calls)
+
+    def test_fallback_prefers_a_cached_reply(self):
+        response_cache.store('What is POCSO?', 'A law that protects children.')
+        self.model.generate.side_effect = ConnectionError('down')
+        session_id = self._send('Tell me a joke').json()['sessionId']
+        self._send('Another joke', session_id)
+        # Mid-conversation the cache is normally skipped; the fallback still uses it
+        response = self._send('What is POCSO?', session_id)
+        self.assertEqual(response.json()['response'], 'A law that protects children.')
+        self.assertTrue(response.json()['degraded'])
+
+    def test_other_errors_are_not_retried(self):
+        self.model.generate.side_effect = ValueError('bad request')
+        response = self._send()
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.model.generate.call_count, 1)
+
+    def test_non_transient_errors_do_not_open_the_breaker(self):
+        # e.g. a reply the model blocked, whose text cannot be read
+        self.model.generate.side_effect = ValueError('response blocked')
+        for _ in range(breaker.threshold + 1):
+            self.assertEqual(self._send().status_code, 500)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        def blocked_midway(prompt, **kwargs):
+            yield 'Hi'
+            raise ValueError('response blocked')
+
+        self.model.stream.side_effect = blocked_midway
+        for _ in range(breaker.threshold + 1):
+            async_to_sync(self._read_stream)()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.failures, 0)
+
+    async def _read_stream(self):
+        response = await AsyncClient().post(
+            reverse('api:chat-stream'),
+            data=json.dumps({'message': 'What is POCSO?'}),
+            content_type='application/json',
+        )
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    def test_half_open_breaker_allows_one_trial(self):
+        clock = mock.Mock(return_value=100.0)
+        with mock.patch('api.chat.resilience.time.monotonic', clock):
+            trial_breaker = CircuitBreaker(threshold=1, cooldown=30)
+            trial_breaker.record_failure()
+            self.assertFalse(trial_breaker.allow())
+            clock.return_value = 131.0
+            self.assertTrue(trial_breaker.allow())
+            self.assertFalse(trial_breaker.allow())
+            trial_breaker.record_success()
+            self.assertEqual(trial_breaker.state, CircuitBreaker.CLOSED)
+
+    def test_stub_backend_honours_the_deadline(self):
+        with self.assertRaises(TimeoutError):
+            StubClient(latency=1, token_delay=0, tokens=1).generate('User: hi', timeout=0.01)
+
+
+@override_settings(CHAT_BACKEND='stub', CHAT_STUB_LATENCY=0, CHAT_STUB_TOKEN_DELAY=0, CHAT_STUB_TOKENS=5)
+class ChatUsageTests(TestCase):
+    def _post(self, name, message):
+        async def send():
+            response = await AsyncClient().post(
+                reverse(name),
+                data=json.dumps({'message': message}),
+                content_type='application/json',
+            )
+            if name == 'api:chat-stream':
+                [chunk async for chunk in response.streaming_content]
+            return response
+
+        return async_to_sync(send)()
+
+    def test_every_chat_request_is_recorded(self):
+        self._post('api:chat-send', 'What is POCSO?')
+        self._post('api:chat-send', 'what is pocso')
+        self._post('api:chat-stream', 'Tell me a story about stars')
+        self._post('api:chat-send', 'My uncle hurts me')
+
+        model, cached, streamed, escalated = ChatUsage.objects.order_by('id')
+        self.assertEqual((model.outcome, model.model, model.output_tokens), ('model', 'stub', 5))
+        self.assertGreater(model.prompt_tokens, 0)
+        self.assertTrue(cached.cache_hit)
+        self.assertIsNone(cached.prompt_tokens)
+        self.assertEqual((streamed.endpoint, streamed.outcome), ('stream', 'model'))
+        self.assertLessEqual(streamed.first_token_ms, streamed.latency_ms)
+        self.assertEqual(escalated.outcome, 'escalated')
+
+    def test_errors_are_recorded_by_class(self):
+        model = mock.Mock()
+        model.generate.side_effect = ValueError('bad request')
+        with mock.patch('api.views.get_client', return_value=model):
+            self._post('api:chat-send', 'Hello')
+        self.assertEqual(ChatUsage.objects.get().error_class, 'ValueError')
+
+    @override_settings(CHAT_CONTEXT_TURNS=1)
+    def test_background_model_calls_are_recorded(self):
+        event = SafetyEvent.objects.create(message='I feel unsafe', emotion='concerned', level=2, reply=SOS_REPLY)
+        session = ChatSession.objects.create()
+        messages = ChatMessage.objects.bulk_create(
+            ChatMessage(session=session, role=role, content=f'{role} {n}')
+            for n in range(2)
+            for role in (ChatMessage.ROLE_USER, ChatMessage.ROLE_MODEL)
+        )
+        with mock.patch('api.chat.escalation.close_old_connections'), \
+                mock.patch('api.chat.sessions.close_old_connections'):
+            generate_follow_up(event.id)
+            summarize_session(session.id, messages[-1].id)
+
+        follow_up, summary = ChatUsage.objects.order_by('id')
+        self.assertEqual((follow_up.endpoint, follow_up.outcome, follow_up.model), ('follow_up', 'model', 'stub'))
+        self.assertEqual(follow_up.output_tokens, 5)
+        self.assertEqual((summary.endpoint, summary.outcome), ('summary', 'model'))
+        self.assertGreater(summary.prompt_tokens, 0)
+
+    def test_usage_rollup(self):
+        for latency in range(1, 101):
+            ChatUsage.objects.create(
+                endpoint='send', model='stub', outcome='model',
+                prompt_tokens=10, output_tokens=5, first_token_ms=latency, latency_ms=latency,
+            )
+        ChatUsage.objects.create(endpoint='send', outcome='cache', latency_ms=1, cache_hit=True)
+
+        with self.assertNumQueries(14):
+            data = self.client.get(reverse('api:chat-usage')).json()
+        self.assertEqual(data['calls'], 101)
+        self.assertEqual(data['byOutcome'], {'model': 100, 'cache': 1})
+        self.assertEqual(data['latencyMs'], {'p50': 50.0, 'p95': 95.0, 'p99': 99.0})
+        self.assertEqual(data['daily'][0]['promptTokens'], 1000)
+        self.assertEqual(data['byModel'], [{'model': 'stub', 'calls': 100, 'promptTokens': 1000, 'outputTokens': 500}])
+        self.assertEqual(self.client.get(reverse('api:chat-usage'), {'days': 0}).status_code, 400)
+
+
+class LoadTestChatTests(TransactionTestCase):
+    def test_run_leaves_no_rows_behind(self):
+        kept = ChatUsage.objects.create(endpoint='send', model='gemini', outcome='model', latency_ms=1)
+        call_command(
+            'load_test_chat', requests=6, concurrency=2, distinct=2, latency=0, tokens=2,
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(list(ChatUsage.objects.all()), [kept])
+        self.assertFalse(ChatSession.objects.exists())
+        self.assertFalse(ChatResponseCache.objects.exists())
+
+
+class FakeSocket:
+    """Drives the project ASGI application as a WebSocket client would"""
+
+    def __init__(self, token, path='/ws/sos'):
+        from shield360_backend.asgi import application
+
+        self.application = application
+        self.scope = {'type': 'websocket', 'path': path, 'query_string': b''}
+        self.token = token
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        self.task = None
+
+    async def connect(self):
+        self.incoming.put_nowait({'type': 'websocket.connect'})
+        if self.token is not None:
+            self.send(json.dumps({'type': 'auth', 'token': self.token}))
+        self.task = asyncio.ensure_future(self.application(self.scope, self.incoming.get, self.outgoing.put))
+        return await self.next()
+
+    async def next(self):
+        return await asyncio.wait_for(self.outgoing.get(), 1)
+
+    async def next_json(self):
+        return json.loads((await self.next())['text'])
+
+    def send(self, text):
+        self.incoming.put_nowait({'type': 'websocket.receive', 'text': text})
+
+    async def disconnect(self):
+        self.incoming.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, 1)
+
+
+class SOSAlertTests(TestCase):
+    def setUp(self):
+        self.hub = Hub(broker_address='')
+        for target in ('api.sos.websocket.hub', 'api.views.hub'):
+            patcher = mock.patch(target, self.hub)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _trigger(self, token, **payload):
+        return async_to_sync(AsyncClient().post)(
+            reverse('api:sos-trigger'),
+            data=json.dumps(payload),
+            content_type='application/json',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    def _login(self, role, identifier, password):
+        return self.client.post(
+            reverse('api:login'),
+            data=json.dumps({'role': role, 'identifier': identifier, 'password': password}),
+            content_type='application/json',
+        ).json()
+
+    def test_login_returns_sos_token_for_registered_password(self):
+        RegistrationRequest.objects.create(
+            role='parent',
+            full_name='Parent',
+            email='parent@example.com',
+            password_hash=make_password('secret'),
+            metadata={'childEmail': 'Kid@Example.com'},
+            is_approved=True,
+        )
+        token = self._login('parent', 'Parent@Example.com', 'secret')['sosToken']
+        # A parent listens on their child's channel
+        self.assertEqual(read_token(token), {'role': 'parent', 'id': 'kid@example.com'})
+        self.assertIsNone(read_token(token + 'x'))
+
+    def test_login_without_matching_credentials_gets_no_sos_token(self):
+        RegistrationRequest.objects.create(
+            role='child', full_name='Kid', email='kid@example.com', password_hash=make_password('secret'),
+            is_approved=True,
+        )
+        for role, identifier, password in (
+            ('child', 'kid@example.com', 'wrong'),
+            ('teacher', 'kid@example.com', 'secret'),
+            ('teacher', 'anyone@example.com', 'anything'),
+        ):
+            payload = self._login(role, identifier, password)
+            self.assertNotIn('sosToken', payload)
+        self.assertIn('sosToken', self._login('child', 'kid@example.com', 'secret'))
+
+    def test_self_registered_accounts_get_no_sos_token_until_approved(self):
+        for role, email, metadata in (
+            ('teacher', 'teacher@example.com', {}),
+            ('parent', 'stranger@example.com', {'childEmail': 'kid@example.com'}),
+        ):
+            response = self.client.post(
+                reverse('api:register'),
+                data=json.dumps({'role': role, 'fullName': 'Someone', 'email': email, 'password': 'secret', 'metadata': metadata}),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertNotIn('sosToken', self._login(role, email, 'secret'))
+
+        RegistrationRequest.objects.filter(email='teacher@example.com').update(is_approved=True)
+        token = self._login('teacher', 'teacher@example.com', 'secret')['sosToken']
+        self.assertEqual(read_token(token), {'role': 'teacher', 'id': 'teacher@example.com'})
+
+    def test_alert_reaches_the_childs_parents_and_all_teachers(self):
+        async def scenario():
+            parent = FakeSocket(issue_token('parent', 'kid@example.com'))
+            teacher = FakeSocket(issue_token('teacher', 'teacher@example.com'))
+            other_parent = FakeSocket(issue_token('parent', 'other@example.com'))
+            for socket in (parent, teacher, other_parent):
+                self.assertEqual(await socket.connect(), {'type': 'websocket.accept'})
+                self.assertEqual((await socket.next_json())['type'], 'connected')
+
+            response = await AsyncClient().post(
+                reverse('api:sos-trigger'),
+                data=json.dumps({'message': 'Help me'}),
+                content_type='application/json',
+                headers={'Authorization': f"Bearer {issue_token('child', 'kid@example.com')}"},
+            )
+            self.assertEqual(response.json(), {'status': 'sent', 'delivered': 2})
+            for socket in (parent, teacher):
+                alert = await socket.next_json()
+                self.assertEqual((alert['type'], alert['message']), ('SOS_ALERT', 'Help me'))
+                self.assertEqual(alert['child']['username'], 'kid@example.com')
+            self.assertTrue(other_parent.outgoing.empty())
+
+            parent.send('{"type":"ping"}')
+            self.assertEqual(await parent.next_json(), {'type': 'pong'})
+            for socket in (parent, teacher, other_parent):
+                await socket.disconnect()
+            self.assertEqual(self.hub.connections, 0)
+
+        async_to_sync(scenario)()
+
+    def test_unauthorised_connections_and_triggers_are_refused(self):
+        async def scenario():
+            for token, code in (('not-a-token', 4401), (issue_token('child', 'kid@example.com'), 4403)):
+                socket = FakeSocket(token)
+                self.assertEqual(await socket.connect(), {'type': 'websocket.accept'})
+                self.assertEqual(await socket.next(), {'type': 'websocket.close', 'code': code})
+            socket = FakeSocket(issue_token('teacher', 't@example.com'), '/ws/other')
+            self.assertEqual(await socket.connect(), {'type': 'websocket.close', 'code': 4404})
+
+            # The token is only read from the first message, never the URL
+            socket = FakeSocket(None)
+            socket.scope['query_string'] = f"token={issue_token('teacher', 't@example.com')}".encode()
+            await socket.connect()
+            socket.send('{"type":"ping"}')
+            self.assertEqual(await socket.next(), {'type': 'websocket.close', 'code': 4401})
+            self.assertEqual(self.hub.connections, 0)
+
+        async_to_sync(scenario)()
+        self.assertEqual(self._trigger('not-a-token').status_code, 401)
+        self.assertEqual(self._trigger(issue_token('parent', 'kid@example.com')).status_code, 403)
+
+    @override_settings(SOS_IDLE_TIMEOUT=0.03, SOS_SEND_QUEUE=2)
+    def test_idle_and_slow_listeners_are_closed(self):
+        async def scenario():
+            socket = FakeSocket(issue_token('teacher', 't@example.com'))
+            await socket.connect()
+            await socket.next_json()
+            self.assertEqual(await socket.next(), {'type': 'websocket.close', 'code': CLOSE_IDLE})
+            await socket.disconnect()
+
+            subscriber = self.hub.subscribe(['teachers'])
+            for _ in range(3):
+                self.hub.deliver(['teachers'], 'alert')
+            self.assertEqual(subscriber.queue.qsize(), 3)
+            self.assertEqual(subscriber.queue._queue[-1], CLOSE_SLOW)
+            self.hub.unsubscribe(subscriber)
+
+        async_to_sync(scenario)()
+
+    def test_broker_relays_alerts_between_processes(self):
+        async def scenario():
+            broker = Broker()
+            server = await broker.start('127.0.0.1:0')
+            address = '127.0.0.1:%s' % server.sockets[0].getsockname()[1]
+            publisher, listener = Hub(broker_address=address), Hub(broker_address=address)
+            subscriber = listener.subscribe(['teachers'])
+            publisher._start()
+            for _ in range(100):
+                if publisher._link.connected and listener._link.connected:
+                    break
+                await asyncio.sleep(0.01)
+
+            self.assertEqual(publisher.publish(['teachers', 'child:kid'], {'type': 'SOS_ALERT'}), 0)
+            self.assertEqual(json.loads(await asyncio.wait_for(subscriber.queue.get(), 1)), {'type': 'SOS_ALERT'})
+
+            for hub in (publisher, listener):
+                hub._link.task.cancel()
+            while broker.peers:
+                await asyncio.sleep(0.01)
+            server.close()
+            await server.wait_closed()
+
+        async_to_sync(scenario)()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoadCsvDataTests(TestCase):
+    QUIZ_DATA = [
+        {
+            'level': 1,
+            'title': 'Level 1',
+            'badgeName': 'Star',
+            'questions': [
+                {'q': f'Question {n}?', 'options': ['right', 'wrong'], 'correct': 'right'} for n in range(3)
+            ],
+        },
+    ]
+
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        self.data_dir = data_dir.name
+        for target, value in (
+            ('api.management.commands.load_csv_data.DATA_DIR', Path(self.data_dir)),
+            ('api.management.commands.load_csv_data.quiz_catalogue', mock.Mock()),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self._write('quiz_data.json', json.dumps(self.QUIZ_DATA))
+
+    def _write(self, name, content):
+        with open(os.path.join(self.data_dir, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _write_attempts(self, count):
+        rows = [f'kid{n}@example.com,{1 + n % 2},2,1,{"true" if n % 3 else "false"}' for n in range(count)]
+        self._write(
+            'quiz_attempts.csv',
+            'child_email,quiz_level,answered_questions,correct_answers,mark_completed\n' + '\n'.join(rows),
+        )
+
+    def _load(self):
+        out = io.StringIO()
+        call_command('load_csv_data', workers=1, stdout=out)
+        return out.getvalue()
+
+    def test_users_and_articles_are_upserted(self):
+        existing = RegistrationRequest.objects.create(
+            role='parent', full_name='Old Name', email='asha@example.com', password_hash='x'
+        )
+        Article.objects.create(
+            slug='pocso-brief', title='Old', summary='Old', category='Old', published_at=date(2024, 1, 1)
+        )
+        self._write(
+            'users.csv',
+            'role,full_name,email,password,childEmail,city\n'
+            'parent,Asha,asha@example.com,pw,kid@example.com,Mysuru\n'
+            'teacher,Ravi,ravi@example.com,pw,,\n'
+            'teacher,Ravi Kumar,ravi@example.com,pw2,,Bengaluru\n',
+        )
+        self._write(
+            'articles.csv',
+            'slug,title,summary,category,published_at,source_url\n'
+            'pocso-brief,New title,New summary,Legal,2025-02-01,\n'
+            'fresh,Fresh,Fresh,Product,2025-03-01,https://example.com\n',
+        )
+
+        output = self._load()
+
+        self.assertIn('Loaded 2 users (1 new, 1 updated)', output)
+        self.assertEqual(RegistrationRequest.objects.count(), 2)
+        existing.refresh_from_db()
+        self.assertEqual(existing.full_name, 'Asha')
+        self.assertEqual(existing.metadata, {'childEmail': 'kid@example.com', 'city': 'Mysuru'})
+        ravi = RegistrationRequest.objects.get(email='ravi@example.com')
+        self.assertEqual((ravi.full_name, ravi.metadata), ('Ravi Kumar', {'city': 'Bengaluru'}))
+        self.assertTrue(ravi.password_hash.startswith('md5$'))
+        self.assertEqual(
+            dict(Article.objects.values_list('slug', 'title')),
+            {'pocso-brief': 'New title', 'fresh': 'Fresh'},
+        )
+
+    def test_passwords_are_hashed_in_worker_processes(self):
+        passwords = [f'secret-{n}' for n in range(5)]
+        with mock.patch('api.accounts.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            hashes = hash_passwords(passwords, workers=2)
+        pool.assert_called_once()
+        self.assertEqual(len(set(hashes)), 5)
+        self.assertTrue(all(check_password(password, hashed) for password, hashed in zip(passwords, hashes)))
+        with mock.patch('api.accounts.ProcessPoolExecutor') as pool:
+            self.assertTrue(check_password('solo', hash_passwords(['solo'], workers=4)[0]))
+        pool.assert_not_called()
+
+    def test_quiz_attempts_are_built_in_memory_and_written_in_bulk(self):
+        self._write_attempts(6)
+        output = self._load()
+
+        self.assertIn('Loaded 3 attempts for level 1', output)
+        self.assertIn('Skipped 3 attempts for level 2; quiz missing.', output)
+        attempt = QuizAttempt.objects.get(child_email='kid0@example.com')
+        self.assertEqual((attempt.score, attempt.total_questions, attempt.is_completed), (1, 3, False))
+        self.assertEqual(
+            list(attempt.responses.values_list('question__order', 'selected_answer', 'is_correct')),
+            [(0, 'right', True), (1, 'wrong', False)],
+        )
+        self.assertTrue(QuizAttempt.objects.get(child_email='kid2@example.com').completed_at)
+
+    def test_only_one_open_attempt_per_child_and_quiz_is_loaded(self):
+        self._write(
+            'quiz_attempts.csv',
+            'child_email,quiz_level,answered_questions,correct_answers,mark_completed\n'
+            'kid@example.com,1,1,1,false\n'
+            'kid@example.com,1,3,3,true\n'
+            'kid@example.com,1,2,1,false\n',
+        )
+        output = self._load()
+
+        self.assertIn('Skipped 1 unfinished attempts for level 1; the child already has one open.', output)
+        self.assertEqual(
+            sorted(QuizAttempt.objects.values_list('score', 'is_completed')),
+            [(1, False), (3, True)],
+        )
+
+    def test_rows_are_read_with_their_end_offsets(self):
+        self._write('notes.csv', 'name,note\nasha,"two\nlines"\n\nravi,short\n')
+        path = os.path.join(self.data_dir, 'notes.csv')
+        rows = list(read_csv_rows(path))
+        self.assertEqual([row for row, _ in rows], [{'name': 'asha', 'note': 'two\nlines'}, {'name': 'ravi', 'note': 'short'}])
+        self.assertEqual(list(read_csv_rows(path, rows[0][1])), rows[1:])
+
+    def test_streamed_import_resumes_after_an_interrupted_batch(self):
+        self._write_attempts(7)
+        advance = Checkpoint.advance
+        calls = []
+
+        def crash_in_second_batch(checkpoint, *args):
+            advance(checkpoint, *args)
+            calls.append(args)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+
+        with mock.patch.object(Checkpoint, 'advance', crash_in_second_batch), self.assertRaises(KeyboardInterrupt):
+            call_command('load_csv_data', '--stream', '--batch-size', '2', workers=1, stdout=io.StringIO())
+        # The first batch committed; the second rolled back although its
+        # checkpoint had already been written
+        self.assertEqual(QuizAttempt.objects.count(), 1)
+        checkpoint_file = os.path.join(self.data_dir, load_csv_data.CHECKPOINT_NAME)
+        self.assertTrue(os.path.exists(checkpoint_file))
+
+        out = io.StringIO()
+        call_command('load_csv_data', '--resume', '--batch-size', '2', workers=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn('were loaded before the interruption', output)
+        self.assertIn('Resuming quiz_attempts.csv', output)
+        self.assertEqual(
+            sorted(QuizAttempt.objects.values_list('child_email', flat=True)),
+            sorted(f'kid{n}@example.com' for n in range(0, 7, 2)),
+        )
+        self.assertEqual(QuestionResponse.objects.count(), 8)
+        self.assertFalse(os.path.exists(checkpoint_file))
+
+    def test_query_count_does_not_grow_with_the_file(self):
+        command = load_csv_data.Command(stdout=io.StringIO())
+        command._load_quiz_data()
+        counts = []
+        for rows in (4, 40):
+            self._write_attempts(rows)
+            QuizAttempt.objects.all().delete()
+            with CaptureQueriesContext(connection) as queries:
+                command._load_quiz_attempts()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(QuestionResponse.objects.count(), 40)
+
+
+class QuizSyncTests(TestCase):
+    @staticmethod
+    def _level(*texts):
+        return {
+            'level': 1,
+            'title': 'Level 1',
+            'badgeName': 'Star',
+            'questions': [{'q': text, 'options': ['yes', 'no'], 'correct': 'yes'} for text in texts],
+        }
+
+    def test_reload_keeps_matching_questions_and_their_answers(self):
+        quiz, changes = sync_quiz(self._level('A', 'B', 'C', 'D'))
+        self.assertEqual(changes, {'added': 4})
+        ids = dict(Question.objects.values_list('question_text', 'id'))
+        attempt = QuizAttempt.objects.create(child_email='kid@example.com', quiz=quiz)
+        for text in ('C', 'D'):
+            QuestionResponse.objects.create(attempt=attempt, question_id=ids[text], selected_answer='yes')
+
+        quiz, changes = sync_quiz(self._level('A edited', 'B', 'E', 'C'))
+
+        self.assertEqual(changes, {'updated': 1, 'unchanged': 1, 'moved': 1, 'added': 1, 'removed': 1})
+        questions = {question.question_text: question for question in Question.objects.filter(quiz=quiz)}
+        self.assertEqual([text for text, _ in sorted(questions.items(), key=lambda item: item[1].order)],
+                         ['A edited', 'B', 'E', 'C'])
+        self.assertEqual(questions['A edited'].id, ids['A'])
+        self.assertEqual((questions['C'].id, questions['C'].order), (ids['C'], 3))
+        self.assertEqual(list(attempt.responses.values_list('question_id', flat=True)), [ids['C']])
+
+    def test_unchanged_reload_only_reads(self):
+        sync_quiz(self._level('A', 'B'))
+        with CaptureQueriesContext(connection) as queries:
+            _, changes = sync_quiz(self._level('A', 'B'))
+        self.assertEqual(changes, {'unchanged': 2})
+        self.assertFalse([query for query in queries if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))])
+
+
+class QuizAttemptIndexTests(TestCase):
+    def setUp(self):
+        self.quiz = Quiz.objects.create(level=1, title='Level 1', badge_name='Star')
+        self.question = Question.objects.create(
+            quiz=self.quiz, question_text='Q?', options=['a', 'b'], correct_answer='a', order=0
+        )
+        self.attempt = QuizAttempt.objects.create(child_email='kid@example.com', quiz=self.quiz, total_questions=1)
+
+    def assertReadsInIndexOrder(self, queryset, index_name):
+        """Walks index_name in order, so no sort step; it may still scan"""
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'USING (COVERING )?INDEX {index_name}\b')
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def assertSeeksIndex(self, queryset, index_name):
+        """Jumps into index_name instead of reading the table or index from the start"""
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'SEARCH \w+ USING (COVERING )?INDEX {index_name}\b')
+        self.assertNotIn('SCAN', plan)
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def test_child_progress_uses_child_index(self):
+        self.assertSeeksIndex(progress_queryset(child_email='kid@example.com'), 'quizattempt_child_started_idx')
+
+    def test_teacher_pages_use_started_index(self):
+        # The first page reads the newest attempts off the index; later pages seek to the cursor
+        self.assertReadsInIndexOrder(progress_queryset()[:51], 'quizattempt_started_idx')
+        page = progress_queryset().filter(older_than(self.attempt.started_at, self.attempt.id))[:51]
+        self.assertSeeksIndex(page, 'quizattempt_started_idx')
+
+    def test_by_child_summary_uses_child_index(self):
+        summary = (
+            QuizAttempt.objects.filter(child_email__in=['kid@example.com', 'other@example.com'])
+            .values('child_email')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        self.assertSeeksIndex(summary, 'quizattempt_child_started_idx')
+
+    def test_open_attempt_lookup_uses_partial_unique_index(self):
+        # At most one row matches, so the default ordering is left out
+        lookup = QuizAttempt.objects.filter(
+            child_email='kid@example.com', quiz=self.quiz, is_completed=False
+        ).order_by()
+        self.assertSeeksIndex(lookup, 'unique_open_attempt_per_child_quiz')
+
+    def test_response_lookup_uses_unique_index(self):
+        lookup = QuestionResponse.objects.filter(attempt=self.attempt, question=self.question).order_by()
+        plan = lookup.explain()
+        self.assertRegex(plan, r'SEARCH \w+ USING (COVERING )?INDEX')
+        self.assertNotIn('SCAN', plan)
+
+    def test_only_one_open_attempt_per_child_and_quiz(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            QuizAttempt.objects.create(child_email='kid@example.com', quiz=self.quiz)
+        self.attempt.is_completed = True
+        self.attempt.save()
+        QuizAttempt.objects.create(child_email='kid@example.com', quiz=self.quiz)
+
+    def test_quiz_start_race_returns_the_open_attempt(self):
+        # Simulate a concurrent start that opened the attempt after our check
+        with mock.patch.object(QuerySet, 'first', return_value=None):
+            response = Client().post(
+                reverse('api:quiz-start'),
+                data=json.dumps({'childEmail': 'kid@example.com', 'quizId': self.quiz.id}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['attemptId'], self.attempt.id)
+        self.assertEqual(QuizAttempt.objects.count(), 1)
+
+
 # Create your tests here.
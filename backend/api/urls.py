@@ -11,10 +11,19 @@ urlpatterns = [
     path('register', views.register, name='register'),
     path('quiz', views.quiz_list, name='quiz-list'),
     path('quiz/<int:quiz_id>', views.quiz_detail, name='quiz-detail'),
+    path('quiz/cache-stats', views.quiz_cache_stats, name='quiz-cache-stats'),
     path('quiz/start', views.quiz_start, name='quiz-start'),
     path('quiz/submit', views.quiz_submit_answer, name='quiz-submit'),
+    path('quiz/submit-batch', views.quiz_submit_batch, name='quiz-submit-batch'),
     path('quiz/complete', views.quiz_complete, name='quiz-complete'),
     path('quiz/progress', views.quiz_progress, name='quiz-progress'),
+    path('quiz/progress/teacher', views.quiz_progress_teacher, name='quiz-progress-teacher'),
+    path('search', views.search_view, name='search'),
     path('chat/send', views.chat_send, name='chat-send'),
+    path('chat/stream', views.chat_stream, name='chat-stream'),
+    path('chat/status', views.chat_status, name='chat-status'),
+    path('chat/usage', views.chat_usage, name='chat-usage'),
+    path('chat/safety-events/<int:event_id>', views.chat_safety_event, name='chat-safety-event'),
+    path('sos/trigger', views.sos_trigger, name='sos-trigger'),
 ]
 
@@ -1,20 +1,66 @@
+import base64
 import json
+import logging
+import traceback
+from datetime import date, datetime
 from http import HTTPStatus
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
-from django.http import JsonResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_http_methods, require_POST
 
+from .accounts import authenticate, sos_identity
+from .chat.backends import get_client
+from .chat.concurrency import ChatOverloaded, LeasedStream, llm_limiter
+from .chat.escalation import SOS_REPLY, escalate, serialize_event
+from .chat.gemini import FALLBACK_REPLY, ChatClientError, build_prompt, describe_error
+from .chat.resilience import CircuitOpen, acall, aopen_stream, breaker, is_transient
+from .chat.response_cache import response_cache
+from .chat.safety import detect_emotion
+from .chat.sessions import finish_turn, start_turn
+from .chat.sse import sse_event
+from .chat.usage import UsageRecorder, usage_summary
+from .conditional import conditional_json
 from .models import (
     Article,
+    ChatUsage,
     LoginAttempt,
     Question,
     QuestionResponse,
     Quiz,
     QuizAttempt,
     RegistrationRequest,
+    SafetyEvent,
 )
+from .progress import (
+    attempt_percentage,
+    format_aggregate,
+    older_than,
+    progress_aggregates,
+    progress_queryset,
+    serialize_attempt,
+)
+from .quiz_cache import QUIZ_LIST_FIELDS, quiz_catalogue
+from .search import SEARCH_KINDS, search
+from .sos.hub import alert_channels, hub
+from .sos.tokens import issue_token, read_token
+
+logger = logging.getLogger(__name__)
+
+# Cache-Control max-age (seconds); clients and proxies revalidate with
+# If-None-Match afterwards and get a bodiless 304 while nothing changed.
+NEWS_MAX_AGE = 60
+QUIZ_CATALOGUE_MAX_AGE = 300
+
+NEWS_PAGE_SIZE = 20
+NEWS_MAX_PAGE_SIZE = 100
 
 PLACEHOLDER_ARTICLES = [
     {
@@ -51,7 +97,60 @@ def healthcheck(request):
 
 @require_GET
 def news_list(request):
-    articles = [
+    """Newest articles first, one page at a time; the next cursor is sent in X-Next-Cursor"""
+    limit = _parse_limit(request.GET.get('limit'), NEWS_PAGE_SIZE, NEWS_MAX_PAGE_SIZE)
+    if limit is None:
+        return JsonResponse(
+            {'error': f'limit must be between 1 and {NEWS_MAX_PAGE_SIZE}.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+
+    category = request.GET.get('category', '').strip()
+    since = request.GET.get('since', '').strip()
+    cursor = request.GET.get('cursor')
+
+    articles = Article.objects.order_by('-published_at', 'title', 'id')
+    if category:
+        articles = articles.filter(category=category)
+    if since:
+        try:
+            articles = articles.filter(published_at__gte=date.fromisoformat(since))
+        except ValueError:
+            return JsonResponse(
+                {'error': 'since must be an ISO date (YYYY-MM-DD).'},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+    if cursor:
+        values = _decode_cursor(cursor)
+        try:
+            published_at = date.fromisoformat(values[0])
+            title = str(values[1])
+            last_id = int(values[2])
+        except (TypeError, ValueError, IndexError):
+            return JsonResponse(
+                {'error': 'Invalid cursor.'},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+        # The redundant published_at <= bound lets SQLite seek the index to
+        # the cursor; the OR alone makes it read and sort every older article
+        articles = articles.filter(
+            Q(published_at__lte=published_at)
+            & (
+                Q(published_at__lt=published_at)
+                | (Q(title__gte=title) & (Q(title__gt=title) | Q(id__gt=last_id)))
+            )
+        )
+
+    page = list(
+        articles.only('id', 'slug', 'title', 'summary', 'category', 'published_at', 'source_url')[:limit + 1]
+    )
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        last = page[-1]
+        next_cursor = _encode_cursor(last.published_at.isoformat(), last.title, last.id)
+
+    results = [
         {
             'id': article.slug,
             'title': article.title,
@@ -60,11 +159,12 @@ def news_list(request):
             'publishedAt': article.published_at.isoformat(),
             'sourceUrl': article.source_url,
         }
-        for article in Article.objects.all()
+        for article in page
     ]
 
-    if not articles:
-        articles = [
+    # An empty first page without filters means the table itself is empty
+    if not results and not (cursor or category or since):
+        results = [
             {
                 'id': item['slug'],
                 'title': item['title'],
@@ -76,7 +176,11 @@ def news_list(request):
             for item in PLACEHOLDER_ARTICLES
         ]
 
-    return JsonResponse(articles, safe=False)
+    body = json.dumps(results, cls=DjangoJSONEncoder).encode('utf-8')
+    response = conditional_json(request, body, max_age=NEWS_MAX_AGE)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @csrf_exempt
@@ -114,14 +218,18 @@ def login(request):
         payload=sanitized_payload,
     )
 
-    return JsonResponse(
-        {
-            'message': 'Login request received.',
-            'attemptId': attempt.id,
-            'role': role,
-        },
-        status=HTTPStatus.OK,
-    )
+    data = {
+        'message': 'Login request received.',
+        'attemptId': attempt.id,
+        'role': role,
+    }
+    # Login itself is still a placeholder, so SOS alerts may only be sent
+    # or received by someone whose registered password checks out
+    registration = authenticate(role, identifier, password)
+    if registration is not None:
+        data['sosToken'] = issue_token(role, sos_identity(registration))
+
+    return JsonResponse(data, status=HTTPStatus.OK)
 
 
 @csrf_exempt
@@ -174,48 +282,63 @@ def register(request):
 
 @require_GET
 def quiz_list(request):
-    """Get all quiz levels"""
-    quizzes = Quiz.objects.all()
-    quiz_data = []
-    for quiz in quizzes:
-        quiz_data.append({
-            'id': quiz.id,
-            'level': quiz.level,
-            'title': quiz.title,
-            'badgeName': quiz.badge_name,
-            'questionCount': quiz.questions.count(),
-        })
-    return JsonResponse(quiz_data, safe=False)
+    """Get all quiz levels, optionally with their questions (?include=questions)"""
+    include = {
+        item.strip() for item in request.GET.get('include', '').split(',') if item.strip()
+    }
+    if include - {'questions'}:
+        return JsonResponse(
+            {'error': 'include only supports "questions".'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+
+    fields = None
+    if request.GET.get('fields'):
+        fields = frozenset(
+            item.strip() for item in request.GET['fields'].split(',') if item.strip()
+        )
+        unknown = fields - set(QUIZ_LIST_FIELDS)
+        if unknown:
+            return JsonResponse(
+                {'error': f'Unknown fields: {", ".join(sorted(unknown))}.'},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+
+    cached = quiz_catalogue.get_list(
+        include_questions='questions' in include or (fields is not None and 'questions' in fields),
+        fields=fields,
+    )
+    return conditional_json(
+        request,
+        cached.body,
+        etag=cached.etag,
+        last_modified=cached.last_modified,
+        max_age=QUIZ_CATALOGUE_MAX_AGE,
+    )
 
 
 @require_GET
 def quiz_detail(request, quiz_id):
     """Get a specific quiz with all questions"""
-    try:
-        quiz = Quiz.objects.prefetch_related('questions').get(id=quiz_id)
-    except Quiz.DoesNotExist:
+    cached = quiz_catalogue.get_detail(quiz_id)
+    if cached is None:
         return JsonResponse(
             {'error': 'Quiz not found.'},
             status=HTTPStatus.NOT_FOUND,
         )
+    return conditional_json(
+        request,
+        cached.body,
+        etag=cached.etag,
+        last_modified=cached.last_modified,
+        max_age=QUIZ_CATALOGUE_MAX_AGE,
+    )
 
-    questions = []
-    for question in quiz.questions.all():
-        questions.append({
-            'id': question.id,
-            'q': question.question_text,
-            'options': question.options,
-            'correct': question.correct_answer,
-            'order': question.order,
-        })
 
-    return JsonResponse({
-        'id': quiz.id,
-        'level': quiz.level,
-        'title': quiz.title,
-        'badgeName': quiz.badge_name,
-        'questions': questions,
-    })
+@require_GET
+def quiz_cache_stats(request):
+    """Hit/miss counters of the in-process quiz catalogue cache"""
+    return JsonResponse(quiz_catalogue.stats())
 
 
 @csrf_exempt
@@ -257,11 +380,16 @@ def quiz_start(request):
     if existing_attempt:
         attempt = existing_attempt
     else:
-        attempt = QuizAttempt.objects.create(
-            child_email=child_email,
-            quiz=quiz,
-            total_questions=quiz.questions.count(),
-        )
+        try:
+            with transaction.atomic():
+                attempt = QuizAttempt.objects.create(
+                    child_email=child_email,
+                    quiz=quiz,
+                    total_questions=quiz.questions.count(),
+                )
+        except IntegrityError:
+            # A concurrent request opened it first; the constraint allows only one
+            attempt = QuizAttempt.objects.get(child_email=child_email, quiz=quiz, is_completed=False)
 
     return JsonResponse({
         'attemptId': attempt.id,
@@ -292,42 +420,170 @@ def quiz_submit_answer(request):
             status=HTTPStatus.BAD_REQUEST,
         )
 
+    with transaction.atomic():
+        # Concurrent submissions for the same attempt serialize here: on
+        # SQLite the IMMEDIATE transaction holds the write lock from BEGIN
+        # (see DATABASES), elsewhere select_for_update locks the row.
+        try:
+            attempt = QuizAttempt.objects.select_for_update().only('id', 'score').get(id=attempt_id)
+            question = Question.objects.only('id', 'correct_answer').get(id=question_id)
+        except (QuizAttempt.DoesNotExist, Question.DoesNotExist):
+            return JsonResponse(
+                {'error': 'Attempt or question not found.'},
+                status=HTTPStatus.NOT_FOUND,
+            )
+
+        is_correct = (selected_answer == question.correct_answer)
+
+        response = (
+            QuestionResponse.objects.select_for_update()
+            .only('id', 'selected_answer', 'is_correct')
+            .filter(attempt=attempt, question=question)
+            .first()
+        )
+
+        if response is None:
+            QuestionResponse.objects.create(
+                attempt=attempt,
+                question=question,
+                selected_answer=selected_answer,
+                is_correct=is_correct,
+            )
+            delta = int(is_correct)
+        else:
+            # A changed answer moves the score by the difference in correctness
+            delta = int(is_correct) - int(response.is_correct)
+            if response.selected_answer != selected_answer:
+                response.selected_answer = selected_answer
+                response.is_correct = is_correct
+                response.save(update_fields=['selected_answer', 'is_correct'])
+
+        if delta:
+            current_score = attempt.score + delta
+            attempt.score = F('score') + delta
+            attempt.save(update_fields=['score'])
+            attempt.score = current_score
+
+    return JsonResponse({
+        'isCorrect': is_correct,
+        'correctAnswer': question.correct_answer,
+        'currentScore': attempt.score,
+    })
+
+
+@csrf_exempt
+@require_POST
+def quiz_submit_batch(request):
+    """Submit several answers for one attempt, optionally completing it"""
     try:
-        attempt = QuizAttempt.objects.get(id=attempt_id)
-        question = Question.objects.get(id=question_id)
-    except (QuizAttempt.DoesNotExist, Question.DoesNotExist):
+        payload = json.loads(request.body or '{}')
+    except json.JSONDecodeError:
         return JsonResponse(
-            {'error': 'Attempt or question not found.'},
-            status=HTTPStatus.NOT_FOUND,
+            {'error': 'Invalid JSON payload.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+
+    attempt_id = payload.get('attemptId')
+    answers = payload.get('answers')
+    complete = bool(payload.get('complete', False))
+
+    if not attempt_id or not isinstance(answers, list) or (not answers and not complete):
+        return JsonResponse(
+            {'error': 'attemptId and a list of answers are required.'},
+            status=HTTPStatus.BAD_REQUEST,
         )
 
-    is_correct = (selected_answer == question.correct_answer)
+    # Later answers for the same question win, as with repeated single submits
+    selected = {}
+    for answer in answers:
+        if not isinstance(answer, dict):
+            answer = {}
+        try:
+            question_id = int(answer.get('questionId'))
+        except (TypeError, ValueError):
+            question_id = None
+        selected_answer = (answer.get('selectedAnswer') or '').strip()
+        if not question_id or not selected_answer:
+            return JsonResponse(
+                {'error': 'Each answer needs questionId and selectedAnswer.'},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+        selected[question_id] = selected_answer
 
-    # Check if response already exists
-    response, created = QuestionResponse.objects.get_or_create(
-        attempt=attempt,
-        question=question,
-        defaults={
-            'selected_answer': selected_answer,
-            'is_correct': is_correct,
+    with transaction.atomic():
+        try:
+            attempt = QuizAttempt.objects.select_for_update().get(id=attempt_id)
+        except QuizAttempt.DoesNotExist:
+            return JsonResponse(
+                {'error': 'Attempt not found.'},
+                status=HTTPStatus.NOT_FOUND,
+            )
+
+        questions = {
+            question.id: question
+            for question in Question.objects.filter(quiz_id=attempt.quiz_id).only('id', 'correct_answer')
         }
-    )
+        unknown = [question_id for question_id in selected if question_id not in questions]
+        if unknown:
+            return JsonResponse(
+                {'error': 'Questions not found in this quiz.', 'questionIds': unknown},
+                status=HTTPStatus.NOT_FOUND,
+            )
 
-    if not created:
-        # Update existing response
-        response.selected_answer = selected_answer
-        response.is_correct = is_correct
-        response.save()
+        previous = dict(
+            QuestionResponse.objects.filter(attempt=attempt, question_id__in=selected)
+            .values_list('question_id', 'is_correct')
+        )
 
-    # Update attempt score
-    correct_count = attempt.responses.filter(is_correct=True).count()
-    attempt.score = correct_count
-    attempt.save()
+        responses = []
+        results = []
+        delta = 0
+        for question_id, selected_answer in selected.items():
+            question = questions[question_id]
+            is_correct = (selected_answer == question.correct_answer)
+            delta += int(is_correct) - int(previous.get(question_id, False))
+            responses.append(
+                QuestionResponse(
+                    attempt=attempt,
+                    question=question,
+                    selected_answer=selected_answer,
+                    is_correct=is_correct,
+                )
+            )
+            results.append({
+                'questionId': question_id,
+                'isCorrect': is_correct,
+                'correctAnswer': question.correct_answer,
+            })
+
+        if responses:
+            QuestionResponse.objects.bulk_create(
+                responses,
+                update_conflicts=True,
+                unique_fields=['attempt', 'question'],
+                update_fields=['selected_answer', 'is_correct'],
+            )
+
+        update_fields = []
+        current_score = attempt.score + delta
+        if delta:
+            attempt.score = F('score') + delta
+            update_fields.append('score')
+        if complete and not attempt.is_completed:
+            attempt.is_completed = True
+            attempt.completed_at = timezone.now()
+            update_fields.extend(['is_completed', 'completed_at'])
+        if update_fields:
+            attempt.save(update_fields=update_fields)
+        attempt.score = current_score
 
     return JsonResponse({
-        'isCorrect': is_correct,
-        'correctAnswer': question.correct_answer,
+        'attemptId': attempt.id,
+        'results': results,
         'currentScore': attempt.score,
+        'totalQuestions': attempt.total_questions,
+        'isCompleted': attempt.is_completed,
+        'percentage': attempt_percentage(attempt.score, attempt.total_questions),
     })
 
 
@@ -350,24 +606,26 @@ def quiz_complete(request):
             status=HTTPStatus.BAD_REQUEST,
         )
 
-    try:
-        attempt = QuizAttempt.objects.get(id=attempt_id)
-    except QuizAttempt.DoesNotExist:
-        return JsonResponse(
-            {'error': 'Attempt not found.'},
-            status=HTTPStatus.NOT_FOUND,
-        )
+    with transaction.atomic():
+        # Serialized with answer submissions, and only the completion fields
+        # are written so a score moved by a concurrent submit is kept
+        try:
+            attempt = QuizAttempt.objects.select_for_update().only('id', 'score', 'total_questions').get(id=attempt_id)
+        except QuizAttempt.DoesNotExist:
+            return JsonResponse(
+                {'error': 'Attempt not found.'},
+                status=HTTPStatus.NOT_FOUND,
+            )
 
-    from django.utils import timezone
-    attempt.is_completed = True
-    attempt.completed_at = timezone.now()
-    attempt.save()
+        attempt.is_completed = True
+        attempt.completed_at = timezone.now()
+        attempt.save(update_fields=['is_completed', 'completed_at'])
 
     return JsonResponse({
         'attemptId': attempt.id,
         'score': attempt.score,
         'totalQuestions': attempt.total_questions,
-        'percentage': round((attempt.score / attempt.total_questions) * 100) if attempt.total_questions > 0 else 0,
+        'percentage': attempt_percentage(attempt.score, attempt.total_questions),
     })
 
 
@@ -383,214 +641,550 @@ def quiz_progress(request):
             status=HTTPStatus.BAD_REQUEST,
         )
 
-    if role == 'child':
-        # Get child's own progress
-        attempts = QuizAttempt.objects.filter(child_email=identifier).order_by('-started_at')
-        progress_data = []
-        for attempt in attempts:
-            progress_data.append({
-                'attemptId': attempt.id,
-                'quizId': attempt.quiz.id,
-                'quizTitle': attempt.quiz.title,
-                'level': attempt.quiz.level,
-                'badgeName': attempt.quiz.badge_name,
-                'score': attempt.score,
-                'totalQuestions': attempt.total_questions,
-                'percentage': round((attempt.score / attempt.total_questions) * 100) if attempt.total_questions > 0 else 0,
-                'isCompleted': attempt.is_completed,
-                'startedAt': attempt.started_at.isoformat(),
-                'completedAt': attempt.completed_at.isoformat() if attempt.completed_at else None,
-            })
-        return JsonResponse(progress_data, safe=False)
-
-    elif role == 'parent':
-        # Get child's progress (parent needs to provide child email in metadata)
-        # For now, we'll use identifier as child email
+    if role in ('child', 'parent'):
+        # Parents pass the child's email as identifier for now.
         # In production, you'd link parent to child via RegistrationRequest metadata
-        attempts = QuizAttempt.objects.filter(child_email=identifier).order_by('-started_at')
-        progress_data = []
-        for attempt in attempts:
-            progress_data.append({
-                'childEmail': attempt.child_email,
-                'quizTitle': attempt.quiz.title,
-                'level': attempt.quiz.level,
-                'badgeName': attempt.quiz.badge_name,
-                'score': attempt.score,
-                'totalQuestions': attempt.total_questions,
-                'percentage': round((attempt.score / attempt.total_questions) * 100) if attempt.total_questions > 0 else 0,
-                'isCompleted': attempt.is_completed,
-                'startedAt': attempt.started_at.isoformat(),
-                'completedAt': attempt.completed_at.isoformat() if attempt.completed_at else None,
-            })
-        return JsonResponse(progress_data, safe=False)
-
+        attempts = progress_queryset(child_email=identifier)
     elif role == 'teacher':
         # Get all children's progress
-        attempts = QuizAttempt.objects.all().order_by('-started_at')
-        progress_data = []
-        for attempt in attempts:
-            progress_data.append({
-                'childEmail': attempt.child_email,
-                'quizTitle': attempt.quiz.title,
-                'level': attempt.quiz.level,
-                'badgeName': attempt.quiz.badge_name,
-                'score': attempt.score,
-                'totalQuestions': attempt.total_questions,
-                'percentage': round((attempt.score / attempt.total_questions) * 100) if attempt.total_questions > 0 else 0,
-                'isCompleted': attempt.is_completed,
-                'startedAt': attempt.started_at.isoformat(),
-                'completedAt': attempt.completed_at.isoformat() if attempt.completed_at else None,
-            })
-        return JsonResponse(progress_data, safe=False)
+        attempts = progress_queryset()
+    else:
+        return JsonResponse(
+            {'error': 'Invalid role.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
 
-    return JsonResponse(
-        {'error': 'Invalid role.'},
-        status=HTTPStatus.BAD_REQUEST,
+    return JsonResponse([serialize_attempt(attempt) for attempt in attempts], safe=False)
+
+
+TEACHER_PROGRESS_PAGE_SIZE = 50
+TEACHER_PROGRESS_MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(*values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """Decode an opaque cursor into its list of values, or None if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _parse_limit(value, default, maximum):
+    try:
+        limit = int(value) if value else default
+    except ValueError:
+        return None
+    return limit if 0 < limit <= maximum else None
+
+
+@require_GET
+def quiz_progress_teacher(request):
+    """Keyset-paginated progress of all children, with optional aggregates"""
+    identifier = request.GET.get('identifier', '').strip().lower()
+    if not identifier:
+        return JsonResponse(
+            {'error': 'identifier is required.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+
+    limit = _parse_limit(
+        request.GET.get('limit'),
+        TEACHER_PROGRESS_PAGE_SIZE,
+        TEACHER_PROGRESS_MAX_PAGE_SIZE,
     )
+    if limit is None:
+        return JsonResponse(
+            {'error': f'limit must be between 1 and {TEACHER_PROGRESS_MAX_PAGE_SIZE}.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
 
+    attempts = progress_queryset()
 
-@csrf_exempt
-@require_POST
-def chat_send(request):
-    """Handle chat messages with Gemini AI for POSCO awareness"""
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = _decode_cursor(cursor)
+        try:
+            started_at = datetime.fromisoformat(values[0])
+            last_id = int(values[1])
+        except (TypeError, ValueError, IndexError):
+            return JsonResponse(
+                {'error': 'Invalid cursor.'},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+        attempts = attempts.filter(older_than(started_at, last_id))
+
+    page = list(attempts[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    results = [serialize_attempt(attempt) for attempt in page]
+
+    next_cursor = None
+    if has_more:
+        last = page[-1]
+        next_cursor = _encode_cursor(last.started_at.isoformat(), last.id)
+
+    data = {
+        'results': results,
+        'nextCursor': next_cursor,
+    }
+
+    # aggregates=1 adds class-wide totals, per level and for the children on
+    # this page; aggregates=children only the latter, for later pages
+    requested = request.GET.get('aggregates', '').strip().lower()
+    if requested in ('1', 'true', 'yes', 'children'):
+        aggregates = progress_aggregates()
+
+        # Per-child aggregates are scoped to the children on this page so the
+        # grouped query stays bounded by the page size, not the class size.
+        page_children = {attempt.child_email for attempt in page}
+        by_child = (
+            QuizAttempt.objects.filter(child_email__in=page_children)
+            .values('child_email')
+            .annotate(**aggregates)
+            .order_by('child_email')
+        )
+        data['byChild'] = [
+            {'childEmail': row['child_email'], **format_aggregate(row)}
+            for row in by_child
+        ]
+
+    if requested in ('1', 'true', 'yes'):
+        summary = QuizAttempt.objects.aggregate(
+            students=Count('child_email', distinct=True),
+            **aggregates,
+        )
+        data['summary'] = {
+            'totalStudents': summary['students'],
+            **format_aggregate(summary),
+        }
+
+        by_level = (
+            QuizAttempt.objects.values('quiz__level', 'quiz__title')
+            .annotate(**aggregates)
+            .order_by('quiz__level')
+        )
+        data['byLevel'] = [
+            {
+                'level': row['quiz__level'],
+                'quizTitle': row['quiz__title'],
+                **format_aggregate(row),
+            }
+            for row in by_level
+        ]
+
+    return JsonResponse(data)
+
+
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGE_SIZE = 50
+
+
+@require_GET
+def search_view(request):
+    """Ranked full-text search over articles and quiz questions"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse(
+            {'error': 'q is required.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+
+    kinds = SEARCH_KINDS
+    requested = request.GET.get('type', '').strip().lower()
+    if requested:
+        if requested not in SEARCH_KINDS:
+            return JsonResponse(
+                {'error': f'type must be one of: {", ".join(SEARCH_KINDS)}.'},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+        kinds = (requested,)
+
+    limit = _parse_limit(request.GET.get('limit'), SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE)
+    if limit is None:
+        return JsonResponse(
+            {'error': f'limit must be between 1 and {SEARCH_MAX_PAGE_SIZE}.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+
+    return JsonResponse({
+        'query': query,
+        'results': search(query, kinds=kinds, limit=limit),
+    })
+
+
+@require_GET
+def chat_status(request):
+    """Whether the shared chat client is warm, and how long its setup took"""
+    return JsonResponse({
+        **get_client().status(),
+        'limiter': llm_limiter.stats(),
+        'responseCache': response_cache.stats(),
+        'breaker': breaker.stats(),
+    })
+
+
+CHAT_USAGE_MAX_DAYS = 90
+
+
+@require_GET
+def chat_usage(request):
+    """Roll-up of chat usage: latency percentiles, outcomes and daily token totals"""
+    days = _parse_limit(request.GET.get('days'), default=7, maximum=CHAT_USAGE_MAX_DAYS)
+    if days is None:
+        return JsonResponse(
+            {'error': f'days must be an integer between 1 and {CHAT_USAGE_MAX_DAYS}.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+    return JsonResponse(usage_summary(days))
+
+
+def _parse_chat_message(request):
+    """The stripped message and session id from a chat request, or an error response"""
     try:
         payload = json.loads(request.body or '{}')
     except json.JSONDecodeError:
-        return JsonResponse(
+        return None, None, JsonResponse(
             {'error': 'Invalid JSON payload.'},
             status=HTTPStatus.BAD_REQUEST,
         )
 
     message = (payload.get('message') or '').strip()
     if not message:
-        return JsonResponse(
+        return None, None, JsonResponse(
             {'error': 'message is required.'},
             status=HTTPStatus.BAD_REQUEST,
         )
+    return message, payload.get('sessionId'), None
+
+
+def _chat_overloaded_response(exc):
+    logger.warning('Chat request turned away: %s', exc)
+    response = JsonResponse(
+        {'error': 'Sparkle is helping a lot of friends right now. Please try again in a moment.'},
+        status=HTTPStatus.TOO_MANY_REQUESTS,
+    )
+    response.headers['Retry-After'] = '5'
+    return response
+
+
+def _chat_cache_allowed(detected_emotion, summary, history):
+    # Messages that touch on safety always get a fresh, personal reply, even
+    # when they are not escalated, and cached replies carry no context so
+    # only opening messages use them
+    return (
+        response_cache.enabled
+        and detected_emotion.get('emotion') != 'concerned'
+        and not summary
+        and not history
+    )
+
+
+def _model_unavailable(exc):
+    # Outages and overload get a safe fallback reply; anything else is a bug
+    # or misconfiguration worth surfacing as an error
+    return isinstance(exc, CircuitOpen) or is_transient(exc)
+
+
+async def _fallback_reply(message):
+    """A cached reply for message if there is one, otherwise the templated one"""
+    logger.warning('Chat model unavailable, sending a fallback reply')
+    cached = await sync_to_async(response_cache.lookup)(message) if response_cache.enabled else None
+    return cached or FALLBACK_REPLY
+
+
+def _degraded(response):
+    response.headers['X-Chat-Degraded'] = '1'
+    return response
+
+
+def _with_cache_headers(response, status):
+    response.headers['X-Chat-Cache'] = status
+    response.headers['X-Chat-Cache-Hit-Rate'] = f'{response_cache.hit_rate:.4f}'
+    return response
+
+
+async def _ready_client():
+    client = get_client()
+    # The first call imports and configures the SDK, which blocks
+    await sync_to_async(client.ensure_ready, thread_sensitive=False)()
+    return client
+
+
+@csrf_exempt
+@require_POST
+async def chat_send(request):
+    """Handle chat messages with Gemini AI for POSCO awareness.
+
+    Messages that disclose harm are answered from the SOS template and
+    recorded before, and independently of, any model call; other messages
+    about safety are answered by the model.
+
+    Runs as an async view so waiting for the model holds no worker thread;
+    the blocking SDK call itself runs in a thread while holding an LLM slot.
+    """
+    message, session_id, error_response = _parse_chat_message(request)
+    if error_response:
+        return error_response
+
+    usage = UsageRecorder('send')
+    record_usage = sync_to_async(usage.save)
+    detected_emotion = detect_emotion(message)
+    session, summary, history = await sync_to_async(start_turn)(session_id, message)
+    if detected_emotion['hasSafetyConcern']:
+        # Answer from the template right away; the model is never waited on
+        event = await sync_to_async(escalate)(message, detected_emotion)
+        usage.first_token()
+        await sync_to_async(finish_turn)(session, SOS_REPLY)
+        await record_usage(ChatUsage.OUTCOME_ESCALATED)
+        return _with_cache_headers(JsonResponse({
+            'response': SOS_REPLY,
+            'sessionId': str(session.id),
+            'detectedEmotion': detected_emotion,
+            'hasSafetyConcern': True,
+            **serialize_event(event),
+        }), 'BYPASS')
+
+    use_cache = _chat_cache_allowed(detected_emotion, summary, history)
+
+    cached = await sync_to_async(response_cache.lookup)(message) if use_cache else None
+    if cached is not None:
+        usage.first_token()
+        await sync_to_async(finish_turn)(session, cached)
+        await record_usage(ChatUsage.OUTCOME_CACHE)
+        return _with_cache_headers(JsonResponse({
+            'response': cached,
+            'sessionId': str(session.id),
+            'detectedEmotion': detected_emotion,
+            'hasSafetyConcern': detected_emotion.get('hasSafetyConcern', False),
+        }), 'HIT')
 
-    # Import Gemini
     try:
-        import google.generativeai as genai
-        from django.conf import settings
-    except ImportError:
+        client = await _ready_client()
+    except ChatClientError as exc:
+        await record_usage(ChatUsage.OUTCOME_ERROR, exc)
         return JsonResponse(
-            {'error': 'Gemini SDK not installed. Please install google-generativeai.'},
+            {'error': str(exc)},
             status=HTTPStatus.INTERNAL_SERVER_ERROR,
         )
 
-    # Check if API key is configured
-    api_key = settings.GEMINI_API_KEY
-    if not api_key or api_key == 'your-gemini-api-key-here':
+    try:
+        async with llm_limiter.slot():
+            usage.model = client.model_label
+            ai_response = await acall(
+                client.generate, build_prompt(message, history, summary), usage=usage.tokens
+            )
+    except ChatOverloaded as exc:
+        await record_usage(ChatUsage.OUTCOME_ERROR, exc)
+        return _chat_overloaded_response(exc)
+    except Exception as exc:
+        if _model_unavailable(exc):
+            reply = await _fallback_reply(message)
+            usage.first_token()
+            await record_usage(ChatUsage.OUTCOME_DEGRADED, exc)
+            return _degraded(JsonResponse({
+                'response': reply,
+                'sessionId': str(session.id),
+                'detectedEmotion': detected_emotion,
+                'hasSafetyConcern': False,
+                'degraded': True,
+            }))
+        logger.exception('Chat model call failed')
+        await record_usage(ChatUsage.OUTCOME_ERROR, exc)
         return JsonResponse(
-            {'error': 'Gemini API key not configured. Please set GEMINI_API_KEY in .env file.'},
+            {
+                'error': describe_error(exc),
+                'details': traceback.format_exc() if settings.DEBUG else None
+            },
             status=HTTPStatus.INTERNAL_SERVER_ERROR,
         )
 
-    # Configure Gemini
-    genai.configure(api_key=api_key)
-    model_name = settings.GEMINI_MODEL
-    
-    # Use correct model name format
-    if not model_name.startswith('models/'):
-        model_name = f'models/{model_name}'
+    usage.first_token()
+    await sync_to_async(finish_turn)(session, ai_response)
+    if use_cache:
+        await sync_to_async(response_cache.store)(message, ai_response)
+    await record_usage(ChatUsage.OUTCOME_MODEL)
 
-    # POSCO awareness system prompt
-    system_prompt = """You are Sparkle, a friendly AI assistant for POSCO awareness. Keep responses short and clear. Help children understand child safety, safe/unsafe touch, and POSCO Act basics. If someone feels unsafe, encourage them to use SOS or talk to a trusted adult."""
+    return _with_cache_headers(JsonResponse({
+        'response': ai_response,
+        'sessionId': str(session.id),
+        'detectedEmotion': detected_emotion,
+        'hasSafetyConcern': detected_emotion.get('hasSafetyConcern', False),
+    }), 'MISS' if use_cache else 'BYPASS')
 
-    try:
-        # Initialize the model - try different model names if needed
-        try:
-            model = genai.GenerativeModel(model_name)
-        except Exception:
-            # Fallback to gemini-pro if flash doesn't work
-            model = genai.GenerativeModel('models/gemini-pro')
-        
-        # Create the conversation with system prompt
-        full_prompt = f"{system_prompt}\n\nUser: {message}\n\nSparkle:"
-        
-        # Generate response
-        response = model.generate_content(
-            full_prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                top_p=0.8,
-                top_k=40,
-                max_output_tokens=1024,
-            )
+
+@require_GET
+def chat_safety_event(request, event_id):
+    """Poll for the background follow-up to a flagged chat message"""
+    event = SafetyEvent.objects.filter(id=event_id).only('id', 'follow_up_status', 'follow_up').first()
+    if event is None:
+        return JsonResponse(
+            {'error': 'Safety event not found.'},
+            status=HTTPStatus.NOT_FOUND,
         )
+    return JsonResponse(serialize_event(event))
 
-        ai_response = response.text.strip()
-
-        # Simple emotion detection based on keywords (matching frontend logic)
-        def detect_emotion(text):
-            """Detect emotion from text"""
-            lower_text = text.lower()
-            safety_keywords = [
-                'abuse', 'hurt', 'unsafe', 'danger', 'dangerous', 'threat',
-                'scared', 'afraid', 'touch', 'private', 'sex', 'sexual',
-                'harm', 'pain', 'kill', 'suicide'
-            ]
-            negative_keywords = [
-                'sad', 'scared', 'afraid', 'hurt', 'pain', 'cry', 'crying',
-                'hate', 'angry', 'mad', 'frustrated', 'worried', 'anxious',
-                'lonely', 'alone', 'bad', 'terrible', 'awful', 'horrible'
-            ]
-            
-            safety_count = sum(1 for keyword in safety_keywords if keyword in lower_text)
-            negative_count = sum(1 for keyword in negative_keywords if keyword in lower_text)
-            
-            if safety_count > 0:
-                return {
-                    'emotion': 'concerned',
-                    'level': min(safety_count * 2, 10),
-                    'hasSafetyConcern': True
-                }
-            elif negative_count > 2:
-                return {
-                    'emotion': 'negative',
-                    'level': min(negative_count, 10),
-                    'hasSafetyConcern': False
-                }
-            elif negative_count > 0:
-                return {
-                    'emotion': 'slightly_negative',
-                    'level': negative_count,
-                    'hasSafetyConcern': False
-                }
-            
-            return {
-                'emotion': 'neutral',
-                'level': 0,
-                'hasSafetyConcern': False
-            }
 
-        detected_emotion = detect_emotion(message)
+_STREAM_END = object()
+
 
-        return JsonResponse({
-            'response': ai_response,
+@csrf_exempt
+@require_POST
+async def chat_stream(request):
+    """Stream a chat reply as server-sent events.
+
+    Events: ``emotion`` (the safety verdict, sent first), ``token`` for each
+    text chunk, then ``done`` with the full reply or ``error``. Disclosures
+    get the SOS template as a single token without calling the model.
+    """
+    message, session_id, error_response = _parse_chat_message(request)
+    if error_response:
+        return error_response
+
+    usage = UsageRecorder('stream')
+    record_usage = sync_to_async(usage.save)
+    detected_emotion = detect_emotion(message)
+    session, summary, history = await sync_to_async(start_turn)(session_id, message)
+    use_cache = _chat_cache_allowed(detected_emotion, summary, history)
+    event = None
+    cached = None
+    if detected_emotion['hasSafetyConcern']:
+        event = await sync_to_async(escalate)(message, detected_emotion)
+    elif use_cache:
+        cached = await sync_to_async(response_cache.lookup)(message)
+
+    client = None
+    lease = None
+    if event is None and cached is None:
+        try:
+            client = await _ready_client()
+        except ChatClientError as exc:
+            await record_usage(ChatUsage.OUTCOME_ERROR, exc)
+            return JsonResponse(
+                {'error': str(exc)},
+                status=HTTPStatus.INTERNAL_SERVER_ERROR,
+            )
+        # Taken before the 200 goes out so an overloaded server can still
+        # answer 429; given back once the model is done or the response closed
+        try:
+            lease = await llm_limiter.acquire()
+        except ChatOverloaded as exc:
+            await record_usage(ChatUsage.OUTCOME_ERROR, exc)
+            return _chat_overloaded_response(exc)
+
+    async def events():
+        yield sse_event('emotion', {
+            'sessionId': str(session.id),
             'detectedEmotion': detected_emotion,
             'hasSafetyConcern': detected_emotion.get('hasSafetyConcern', False),
         })
+        if event is not None:
+            usage.first_token()
+            await sync_to_async(finish_turn)(session, SOS_REPLY)
+            yield sse_event('token', {'text': SOS_REPLY})
+            yield sse_event('done', {'response': SOS_REPLY, **serialize_event(event)})
+            await record_usage(ChatUsage.OUTCOME_ESCALATED)
+            return
+        if cached is not None:
+            usage.first_token()
+            await sync_to_async(finish_turn)(session, cached)
+            yield sse_event('token', {'text': cached})
+            yield sse_event('done', {'response': cached})
+            await record_usage(ChatUsage.OUTCOME_CACHE)
+            return
+
+        chunks = []
+        try:
+            usage.model = client.model_label
+            stream, text = await aopen_stream(
+                client.stream, build_prompt(message, history, summary), end=_STREAM_END,
+                usage=usage.tokens,
+            )
+            next_chunk = sync_to_async(next, thread_sensitive=False)
+            while text is not _STREAM_END:
+                usage.first_token()
+                chunks.append(text)
+                yield sse_event('token', {'text': text})
+                text = await next_chunk(stream, _STREAM_END)
+        except Exception as exc:
+            lease.release()
+            if chunks and is_transient(exc):
+                breaker.record_failure()
+            if _model_unavailable(exc) and not chunks:
+                reply = await _fallback_reply(message)
+                usage.first_token()
+                yield sse_event('token', {'text': reply})
+                yield sse_event('done', {'response': reply, 'degraded': True})
+                await record_usage(ChatUsage.OUTCOME_DEGRADED, exc)
+                return
+            logger.exception('Chat model stream failed')
+            yield sse_event('error', {'error': describe_error(exc)})
+            await record_usage(ChatUsage.OUTCOME_ERROR, exc)
+            return
+        lease.release()
+        breaker.record_success()
+        ai_response = ''.join(chunks).strip()
+        await sync_to_async(finish_turn)(session, ai_response)
+        if use_cache:
+            await sync_to_async(response_cache.store)(message, ai_response)
+        yield sse_event('done', {'response': ai_response})
+        await record_usage(ChatUsage.OUTCOME_MODEL)
+
+    stream = events() if lease is None else LeasedStream(events(), lease)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Ask nginx-style proxies not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    cache_status = 'BYPASS' if not use_cache else ('HIT' if cached is not None else 'MISS')
+    return _with_cache_headers(response, cache_status)
+
+
+SOS_DEFAULT_MESSAGE = 'Child has triggered SOS alert'
+SOS_MAX_MESSAGE_LENGTH = 500
+
 
-    except Exception as e:
-        import traceback
-        error_msg = str(e)
-        print(f"Gemini API Error: {error_msg}")
-        print(traceback.format_exc())
-        
-        # Provide more helpful error messages
-        if 'API key' in error_msg or 'authentication' in error_msg.lower():
-            error_msg = 'Gemini API key is invalid or missing. Please check your .env file.'
-        elif '404' in error_msg or 'not found' in error_msg.lower():
-            error_msg = 'Gemini model not found. Please check GEMINI_MODEL in settings.'
-        elif 'quota' in error_msg.lower() or 'limit' in error_msg.lower():
-            error_msg = 'Gemini API quota exceeded. Please check your API usage.'
-        
+@csrf_exempt
+@require_POST
+async def sos_trigger(request):
+    """Alert a child's parents and all teachers who are listening on /ws/sos"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    claims = read_token(token) if scheme.lower() == 'bearer' else None
+    if claims is None:
         return JsonResponse(
-            {
-                'error': error_msg,
-                'details': traceback.format_exc() if settings.DEBUG else None
-            },
-            status=HTTPStatus.INTERNAL_SERVER_ERROR,
+            {'error': 'A valid SOS token is required.'},
+            status=HTTPStatus.UNAUTHORIZED,
+        )
+    if claims['role'] != 'child':
+        return JsonResponse(
+            {'error': 'Only children can send SOS alerts.'},
+            status=HTTPStatus.FORBIDDEN,
         )
 
+    try:
+        payload = json.loads(request.body or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {'error': 'Invalid JSON payload.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+
+    message = (payload.get('message') or '').strip()[:SOS_MAX_MESSAGE_LENGTH] or SOS_DEFAULT_MESSAGE
+    alert = {
+        'type': 'SOS_ALERT',
+        'child': {
+            'username': claims['id'],
+            'fullName': (payload.get('fullName') or '').strip() or None,
+        },
+        'message': message,
+        'timestamp': timezone.now(),
+    }
+    delivered = hub.publish(alert_channels(claims['id']), alert)
+    logger.info('SOS alert from %s delivered to %s listeners', claims['id'], delivered)
+    return JsonResponse({'status': 'sent', 'delivered': delivered})
@@ -2,6 +2,8 @@
 ASGI config for shield360_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections to ``/ws/sos`` go to the
+SOS alert endpoint in ``api.sos.websocket``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,22 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shield360_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from api.sos.websocket import sos_websocket  # noqa: E402
+
+WEBSOCKET_ROUTES = {
+    '/ws/sos': sos_websocket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = WEBSOCKET_ROUTES.get(scope['path'].rstrip('/'))
+        if handler is None:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
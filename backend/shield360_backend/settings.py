@@ -30,8 +30,59 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 GEMINI_MODEL = config('GEMINI_MODEL', default='gemini-pro')
 
+# Chat model backend: 'gemini', or 'stub' for a local deterministic model used
+# in CI and load tests. The stub's first token arrives after CHAT_STUB_LATENCY
+# seconds, then one of CHAT_STUB_TOKENS chunks every CHAT_STUB_TOKEN_DELAY.
+CHAT_BACKEND = config('CHAT_BACKEND', default='gemini')
+CHAT_STUB_LATENCY = config('CHAT_STUB_LATENCY', default=0.2, cast=float)
+CHAT_STUB_TOKEN_DELAY = config('CHAT_STUB_TOKEN_DELAY', default=0.02, cast=float)
+CHAT_STUB_TOKENS = config('CHAT_STUB_TOKENS', default=20, cast=int)
+
+# Chat back-pressure: concurrent LLM calls per process, how many requests may
+# queue for a slot, and how long (seconds) they wait before a 429
+CHAT_MAX_IN_FLIGHT = config('CHAT_MAX_IN_FLIGHT', default=8, cast=int)
+CHAT_MAX_QUEUE = config('CHAT_MAX_QUEUE', default=200, cast=int)
+CHAT_QUEUE_TIMEOUT = config('CHAT_QUEUE_TIMEOUT', default=15.0, cast=float)
+
+# Resilience around model calls: per-call deadline (seconds), retries for
+# transient errors with jittered backoff from CHAT_RETRY_BACKOFF seconds, and a
+# breaker that fails fast for CHAT_BREAKER_COOLDOWN seconds after
+# CHAT_BREAKER_THRESHOLD consecutive failed calls
+CHAT_TIMEOUT = config('CHAT_TIMEOUT', default=20.0, cast=float)
+CHAT_RETRIES = config('CHAT_RETRIES', default=2, cast=int)
+CHAT_RETRY_BACKOFF = config('CHAT_RETRY_BACKOFF', default=0.5, cast=float)
+CHAT_BREAKER_THRESHOLD = config('CHAT_BREAKER_THRESHOLD', default=5, cast=int)
+CHAT_BREAKER_COOLDOWN = config('CHAT_BREAKER_COOLDOWN', default=30.0, cast=float)
+
+# Persistent cache of replies to repeated questions (see api.chat.response_cache)
+CHAT_CACHE_ENABLED = config('CHAT_CACHE_ENABLED', default=True, cast=bool)
+CHAT_CACHE_TTL = config('CHAT_CACHE_TTL', default=7 * 24 * 3600, cast=int)
+CHAT_CACHE_MAX_ENTRIES = config('CHAT_CACHE_MAX_ENTRIES', default=1000, cast=int)
+
+# Exchanges sent verbatim with each chat message; older ones are summarised
+CHAT_CONTEXT_TURNS = config('CHAT_CONTEXT_TURNS', default=6, cast=int)
+
+# Generate a model reply in the background for messages answered with the SOS template
+CHAT_SAFETY_FOLLOW_UP = config('CHAT_SAFETY_FOLLOW_UP', default=True, cast=bool)
+
+# Live SOS alerts (see api.sos): login tokens are valid for SOS_TOKEN_MAX_AGE
+# seconds, sockets that have not sent their token within SOS_AUTH_TIMEOUT
+# seconds or are silent for SOS_IDLE_TIMEOUT seconds are closed, and a
+# listener more than SOS_SEND_QUEUE alerts behind is dropped. Set
+# SOS_BROKER_ADDRESS (host:port of `manage.py sos_broker`) when running more
+# than one worker process.
+SOS_TOKEN_MAX_AGE = config('SOS_TOKEN_MAX_AGE', default=12 * 3600, cast=int)
+SOS_AUTH_TIMEOUT = config('SOS_AUTH_TIMEOUT', default=10.0, cast=float)
+SOS_IDLE_TIMEOUT = config('SOS_IDLE_TIMEOUT', default=90.0, cast=float)
+SOS_SEND_QUEUE = config('SOS_SEND_QUEUE', default=32, cast=int)
+SOS_BROKER_ADDRESS = config('SOS_BROKER_ADDRESS', default='')
+
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
+# Touched whenever the quiz catalogue changes so every process drops its
+# in-memory copy (see api.quiz_cache)
+QUIZ_CACHE_STAMP_FILE = config('QUIZ_CACHE_STAMP_FILE', default=str(BASE_DIR / '.quiz_catalogue_version'))
+
 
 # Application definition
 
@@ -84,6 +135,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL lets readers run alongside the writer, and NORMAL syncs at
+            # checkpoints instead of on every commit; the chat path commits
+            # several small writes per message.
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            # Take the write lock at BEGIN. A deferred transaction that reads
+            # and then writes fails at once with "database is locked" when
+            # another writer committed in between; an immediate one waits.
+            # Every atomic block in this project writes and plain reads run
+            # in autocommit, so this serializes nothing that did not already
+            # contend for the write lock, and WAL readers never wait on it.
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # On disk rather than the shared in-memory database, whose table
+        # locks fail instead of waiting, so concurrency tests see real locking
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -134,6 +203,9 @@ CORS_ALLOWED_ORIGINS = [
     'http://127.0.0.1:5173',
 ]
 
+# Pagination cursors and chat cache status travel in response headers
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor', 'X-Chat-Cache', 'X-Chat-Cache-Hit-Rate']
+
 CSRF_TRUSTED_ORIGINS = [
     'http://localhost:5173',
     'http://127.0.0.1:5173',
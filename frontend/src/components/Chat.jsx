@@ -1,5 +1,5 @@
-import axios from 'axios';
 import { useEffect, useRef, useState } from 'react';
+import readEventStream from '../lib/readEventStream';
 import { detectEmotion, getEmotionColor, getEmotionIcon } from '../utils/emotionDetection';
 
 const API_BASE = 'http://localhost:8000/api';
@@ -10,6 +10,8 @@ function Chat({ token }) {
   const [loading, setLoading] = useState(false);
   const [currentEmotion, setCurrentEmotion] = useState({ emotion: 'neutral', level: 0 });
   const messagesEndRef = useRef(null);
+  // The server keeps the conversation; only its id travels with each message
+  const sessionIdRef = useRef(null);
 
   useEffect(() => {
     scrollToBottom();
@@ -34,6 +36,29 @@ function Chat({ token }) {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
+  // Flagged messages get SOS guidance at once; Sparkle's own reply follows when ready
+  const pollSafetyFollowUp = async (eventId, attempts = 10) => {
+    for (let i = 0; i < attempts; i += 1) {
+      await new Promise(resolve => setTimeout(resolve, 2000));
+      try {
+        const response = await fetch(`${API_BASE}/chat/safety-events/${eventId}`);
+        const data = await response.json();
+        if (data.followUpStatus === 'completed' && data.followUp) {
+          setMessages(prev => [...prev, {
+            role: 'model',
+            content: data.followUp,
+            timestamp: new Date()
+          }]);
+          return;
+        }
+        if (data.followUpStatus !== 'pending') return;
+      } catch (error) {
+        console.error('Follow-up error:', error);
+        return;
+      }
+    }
+  };
+
   const handleSend = async (e) => {
     e.preventDefault();
     if (!input.trim() || loading) return;
@@ -60,45 +85,68 @@ function Chat({ token }) {
         headers['Authorization'] = `Bearer ${token}`;
       }
       
-      const response = await axios.post(
-        `${API_BASE}/chat/send`,
-        { message: userMessage },
-        { headers }
-      );
-
-      // Add AI response to UI
-      const aiMessage = {
-        role: 'model',
-        content: response.data.response,
-        timestamp: new Date(),
-        emotion: response.data.detectedEmotion
-      };
-      setMessages(prev => [...prev, aiMessage]);
+      const response = await fetch(`${API_BASE}/chat/stream`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ message: userMessage, sessionId: sessionIdRef.current })
+      });
 
-      // If safety concern detected, suggest SOS
-      if (response.data.hasSafetyConcern) {
-        // Could trigger a gentle SOS suggestion here
-        console.log('Safety concern detected in response');
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        const error = new Error(data.error || `Server error: ${response.status} ${response.statusText}`);
+        error.serverError = data.error;
+        throw error;
       }
+
+      // Tokens are appended to the AI message as they arrive
+      const updateAiMessage = (update) => {
+        setMessages(prev => {
+          const next = [...prev];
+          next[next.length - 1] = { ...next[next.length - 1], ...update(next[next.length - 1]) };
+          return next;
+        });
+      };
+
+      await readEventStream(response.body, (event, data) => {
+        if (event === 'emotion') {
+          sessionIdRef.current = data.sessionId;
+          setMessages(prev => [...prev, {
+            role: 'model',
+            content: '',
+            timestamp: new Date(),
+            emotion: data.detectedEmotion
+          }]);
+
+          // If safety concern detected, suggest SOS
+          if (data.hasSafetyConcern) {
+            // Could trigger a gentle SOS suggestion here
+            console.log('Safety concern detected in response');
+          }
+        } else if (event === 'token') {
+          updateAiMessage(msg => ({ content: msg.content + data.text }));
+        } else if (event === 'done') {
+          updateAiMessage(() => ({ content: data.response }));
+          if (data.followUpStatus === 'pending') {
+            pollSafetyFollowUp(data.safetyEventId);
+          }
+        } else if (event === 'error') {
+          updateAiMessage(() => ({ content: `Error: ${data.error}`, isError: true }));
+        }
+      });
     } catch (error) {
       console.error('Chat error:', error);
       let errorMsg = 'Sorry, I had trouble understanding that. Please try again.';
-      
-      if (error.response) {
+
+      if (error.serverError) {
         // Server responded with error
-        const serverError = error.response.data?.error || error.response.data?.details;
-        if (serverError) {
-          errorMsg = `Error: ${serverError}`;
-        } else {
-          errorMsg = `Server error: ${error.response.status} ${error.response.statusText}`;
-        }
-      } else if (error.request) {
+        errorMsg = `Error: ${error.serverError}`;
+      } else if (error instanceof TypeError) {
         // Request made but no response
         errorMsg = 'Unable to connect to server. Please check if Django backend is running on port 8000.';
       } else {
         errorMsg = `Error: ${error.message}`;
       }
-      
+
       const errorMessage = {
         role: 'model',
         content: errorMsg,
@@ -159,7 +207,7 @@ function Chat({ token }) {
           </div>
         ))}
         
-        {loading && (
+        {loading && messages[messages.length - 1]?.role === 'user' && (
           <div className="flex justify-start">
             <div className="bg-slate-800 rounded-2xl px-4 py-2">
               <div className="flex gap-1">
@@ -1,7 +1,7 @@
 import { useState } from 'react';
 import axios from 'axios';
 
-const API_BASE = 'http://localhost:5001/api';
+const API_BASE = '/api';
 
 function SOSButton({ token, onTrigger }) {
   const [showConfirm, setShowConfirm] = useState(false);
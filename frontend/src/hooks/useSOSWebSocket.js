@@ -4,17 +4,21 @@ export function useSOSWebSocket(token, onSOSAlert) {
   const [connected, setConnected] = useState(false);
   const wsRef = useRef(null);
   const reconnectTimeoutRef = useRef(null);
+  const pingIntervalRef = useRef(null);
 
   useEffect(() => {
     if (!token) return;
 
     const connect = () => {
       try {
-        // Use WebSocket (not socket.io) since we're using 'ws' library on server
-        const wsUrl = `ws://localhost:5001/ws/sos?token=${token}`;
+        // Served by the Django ASGI app; the Vite dev server proxies /ws
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const wsUrl = `${scheme}://${window.location.host}/ws/sos`;
         const ws = new WebSocket(wsUrl);
 
         ws.onopen = () => {
+          // The token goes in the first message so it stays out of URLs and logs
+          ws.send(JSON.stringify({ type: 'auth', token }));
           console.log('SOS WebSocket connected');
           setConnected(true);
           if (reconnectTimeoutRef.current) {
@@ -50,6 +54,7 @@ export function useSOSWebSocket(token, onSOSAlert) {
         ws.onclose = () => {
           console.log('SOS WebSocket disconnected');
           setConnected(false);
+          clearInterval(pingInterval);
           
           // Attempt to reconnect after 3 seconds
           if (!reconnectTimeoutRef.current) {
@@ -63,15 +68,13 @@ export function useSOSWebSocket(token, onSOSAlert) {
         wsRef.current = ws;
 
         // Send ping every 30 seconds to keep connection alive
+        // The server closes sockets that stay silent for 90 seconds
         const pingInterval = setInterval(() => {
           if (ws.readyState === WebSocket.OPEN) {
             ws.send(JSON.stringify({ type: 'ping' }));
           }
         }, 30000);
-
-        return () => {
-          clearInterval(pingInterval);
-        };
+        pingIntervalRef.current = pingInterval;
       } catch (error) {
         console.error('WebSocket connection error:', error);
         setConnected(false);
@@ -82,8 +85,11 @@ export function useSOSWebSocket(token, onSOSAlert) {
 
     return () => {
       if (wsRef.current) {
+        // Closing on purpose: do not reconnect
+        wsRef.current.onclose = null;
         wsRef.current.close();
       }
+      clearInterval(pingIntervalRef.current);
       if (reconnectTimeoutRef.current) {
         clearTimeout(reconnectTimeoutRef.current);
       }
@@ -2,7 +2,7 @@
  * Lightweight JSON fetch wrapper for future integrations.
  * Keeps the logic minimal per project guidelines.
  */
-export async function fetchJson(url, options = {}) {
+async function request(url, options = {}) {
   const { headers, ...rest } = options
   const response = await fetch(url, {
     headers: {
@@ -18,8 +18,24 @@ export async function fetchJson(url, options = {}) {
     throw error
   }
 
+  return response
+}
+
+export async function fetchJson(url, options = {}) {
+  const response = await request(url, options)
   return response.json()
 }
 
-export default fetchJson
+/**
+ * Fetches one page of a cursor-paginated list endpoint.
+ * The cursor for the following page arrives in the X-Next-Cursor header.
+ */
+export async function fetchJsonPage(url, options = {}) {
+  const response = await request(url, options)
+  return {
+    data: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor'),
+  }
+}
 
+export default fetchJson
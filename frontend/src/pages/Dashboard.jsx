@@ -19,7 +19,7 @@ function Dashboard() {
   useEffect(() => {
     const storedRole = localStorage.getItem('userRole')
     const storedIdentifier = localStorage.getItem('userIdentifier')
-    const storedToken = localStorage.getItem('chatToken') // Token from Node.js auth
+    const storedToken = localStorage.getItem('sosToken') // Issued by /api/login
 
     if (!storedRole || !storedIdentifier) {
       navigate('/login')
@@ -28,13 +28,14 @@ function Dashboard() {
 
     setRole(storedRole)
     setIdentifier(storedIdentifier)
-    setToken(storedToken) // May be null if not logged into chat system
+    setToken(storedToken) // May be null for sessions from before SOS tokens
     setLoading(false)
   }, [navigate])
 
   const handleLogout = () => {
     localStorage.removeItem('userRole')
     localStorage.removeItem('userIdentifier')
+    localStorage.removeItem('sosToken')
     navigate('/login')
   }
 
@@ -88,16 +89,17 @@ function Dashboard() {
 
 function ChildDashboard({ identifier, token }) {
   const [view, setView] = useState('chat') // 'chat', 'quiz', or 'progress'
-  const [selectedQuizId, setSelectedQuizId] = useState(null)
+  const [selectedQuiz, setSelectedQuiz] = useState(null)
   // Chat no longer requires authentication - token is optional
   const chatToken = token || null
 
-  if (selectedQuizId) {
+  if (selectedQuiz) {
     return (
       <Quiz
-        quizId={selectedQuizId}
+        quizId={selectedQuiz.id}
+        initialQuiz={selectedQuiz}
         childEmail={identifier}
-        onBack={() => setSelectedQuizId(null)}
+        onBack={() => setSelectedQuiz(null)}
       />
     )
   }
@@ -144,7 +146,7 @@ function ChildDashboard({ identifier, token }) {
       )}
 
       {view === 'quiz' && (
-        <QuizList onSelectQuiz={setSelectedQuizId} />
+        <QuizList onSelectQuiz={setSelectedQuiz} />
       )}
       {view === 'progress' && (
         <ChildProgress identifier={identifier} />
@@ -272,7 +274,8 @@ function QuizList({ onSelectQuiz }) {
   useEffect(() => {
     async function fetchQuizzes() {
       try {
-        const data = await fetchJson('/api/quiz')
+        // Levels and their questions in one request, so starting a level needs no extra fetch
+        const data = await fetchJson('/api/quiz?include=questions')
         setQuizzes(data)
       } catch (err) {
         setError('Failed to load quizzes. Please try again.')
@@ -314,7 +317,7 @@ function QuizList({ onSelectQuiz }) {
         <div
           key={quiz.id}
           className="group cursor-pointer rounded-2xl border border-slate-800 bg-gradient-to-br from-slate-900 to-slate-950 p-6 transition-all hover:border-primary/60 hover:-translate-y-1"
-          onClick={() => onSelectQuiz(quiz.id)}
+          onClick={() => onSelectQuiz(quiz)}
         >
           <div className="mb-4 flex items-center justify-between">
             <span className="rounded-full bg-primary/20 px-3 py-1 text-xs font-semibold text-primary">
@@ -1,5 +1,7 @@
-import { useEffect, useState } from 'react'
-import fetchJson from '../lib/fetchJson'
+import { useCallback, useEffect, useRef, useState } from 'react'
+import { fetchJsonPage } from '../lib/fetchJson'
+
+const PAGE_SIZE = 20
 
 const placeholderArticles = [
   {
@@ -30,15 +32,20 @@ const placeholderArticles = [
 
 function News() {
   const [articles, setArticles] = useState(placeholderArticles)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const sentinelRef = useRef(null)
 
   useEffect(() => {
     let cancelled = false
     async function loadNews() {
       try {
-        // TODO: Replace with production endpoint once backend contract is ready.
-        const data = await fetchJson('/api/news')
+        const { data, nextCursor: cursor } = await fetchJsonPage(
+          `/api/news?limit=${PAGE_SIZE}`
+        )
         if (!cancelled && Array.isArray(data)) {
           setArticles(data)
+          setNextCursor(cursor)
         }
       } catch (error) {
         if (import.meta.env.DEV) {
@@ -54,6 +61,38 @@ function News() {
     }
   }, [])
 
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const { data, nextCursor: cursor } = await fetchJsonPage(
+        `/api/news?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`
+      )
+      setArticles((current) => [...current, ...(Array.isArray(data) ? data : [])])
+      setNextCursor(cursor)
+    } catch (error) {
+      if (import.meta.env.DEV) {
+        console.info('Failed to load more articles', error)
+      }
+    } finally {
+      setLoadingMore(false)
+    }
+  }, [nextCursor, loadingMore])
+
+  // Fetch the next page when the end of the list scrolls into view
+  useEffect(() => {
+    const sentinel = sentinelRef.current
+    if (!sentinel || !nextCursor) return undefined
+
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) {
+        loadMore()
+      }
+    })
+    observer.observe(sentinel)
+    return () => observer.disconnect()
+  }, [nextCursor, loadMore])
+
   return (
     <div className="bg-slate-950">
       <section className="border-b border-slate-900 bg-deep-blue">
@@ -100,6 +139,11 @@ function News() {
             </article>
           ))}
         </div>
+        {nextCursor && (
+          <div ref={sentinelRef} className="py-8 text-center text-sm text-slate-500">
+            {loadingMore ? 'Loading more stories...' : ''}
+          </div>
+        )}
       </section>
     </div>
   )
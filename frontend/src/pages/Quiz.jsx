@@ -1,7 +1,19 @@
 import { useEffect, useState, useRef } from 'react'
 import fetchJson from '../lib/fetchJson'
 
-function Quiz({ quizId, childEmail, onBack }) {
+// Waits before retrying a failed answer save; the answers stay queued until one succeeds
+const SAVE_RETRY_DELAYS = [1000, 3000]
+
+function isRetryable(err) {
+  // Network errors carry no status; 429 and 5xx are worth another try
+  return err.status === undefined || err.status === 429 || err.status >= 500
+}
+
+function wait(ms) {
+  return new Promise((resolve) => setTimeout(resolve, ms))
+}
+
+function Quiz({ quizId, initialQuiz, childEmail, onBack }) {
   const [quizData, setQuizData] = useState(null)
   const [currentLevel, setCurrentLevel] = useState(0)
   const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0)
@@ -14,7 +26,10 @@ function Quiz({ quizId, childEmail, onBack }) {
   const [error, setError] = useState(null)
   const [isCameraOn, setIsCameraOn] = useState(false)
   const [isCompleted, setIsCompleted] = useState(false)
+  const [saveFailed, setSaveFailed] = useState(false) // Queued answers could not be sent
+  const [isSaving, setIsSaving] = useState(false)
   const hasStartedRef = useRef(null) // Track which quiz/child combination has been started
+  const pendingAnswersRef = useRef([]) // Answers not yet sent to the backend
 
   useEffect(() => {
     // Create a unique key for this quiz/child combination
@@ -32,12 +47,15 @@ function Quiz({ quizId, childEmail, onBack }) {
     setHasAnswered(false)
     setSelectedAnswer(null)
     setIsCompleted(false)
+    setSaveFailed(false)
     setLoading(true)
     setError(null)
+    pendingAnswersRef.current = []
 
     async function loadQuiz() {
       try {
-        const data = await fetchJson(`/api/quiz/${quizId}`)
+        const data =
+          initialQuiz?.questions ? initialQuiz : await fetchJson(`/api/quiz/${quizId}`)
         
         // Transform data to match the expected format
         const transformedData = {
@@ -78,7 +96,7 @@ function Quiz({ quizId, childEmail, onBack }) {
       }
     }
     loadQuiz()
-  }, [quizId, childEmail])
+  }, [quizId, initialQuiz, childEmail])
 
   function shuffleArray(array) {
     const shuffled = [...array]
@@ -93,37 +111,64 @@ function Quiz({ quizId, childEmail, onBack }) {
     setShuffledOptions(shuffleArray(options))
   }
 
-  async function checkAnswer(selectedOption) {
+  async function submitPendingAnswers(complete) {
+    const answers = [...pendingAnswersRef.current]
+    if (!attemptId || (answers.length === 0 && !complete)) return
+
+    // One request grades every answer of the level and completes the attempt.
+    // Resending is safe: the backend upserts one response per question.
+    for (let tries = 0; ; tries++) {
+      try {
+        await fetchJson('/api/quiz/submit-batch', {
+          method: 'POST',
+          body: JSON.stringify({
+            attemptId: attemptId,
+            answers: answers,
+            complete: complete,
+          }),
+        })
+        break
+      } catch (err) {
+        if (tries >= SAVE_RETRY_DELAYS.length || !isRetryable(err)) throw err
+        await wait(SAVE_RETRY_DELAYS[tries])
+      }
+    }
+    pendingAnswersRef.current = pendingAnswersRef.current.slice(answers.length)
+  }
+
+  // Sends the queue; on failure keeps it and tells the child instead of dropping it
+  async function saveAnswers(complete) {
+    setIsSaving(true)
+    try {
+      await submitPendingAnswers(complete)
+      setSaveFailed(false)
+      return true
+    } catch (err) {
+      console.error('Failed to save answers:', err)
+      setSaveFailed(true)
+      return false
+    } finally {
+      setIsSaving(false)
+    }
+  }
+
+  function checkAnswer(selectedOption) {
     if (hasAnswered) return
 
     const question = quizData.questions[currentQuestionIndex]
     const isCorrect = selectedOption === question.correct
 
-    try {
-      await fetchJson('/api/quiz/submit', {
-        method: 'POST',
-        body: JSON.stringify({
-          attemptId: attemptId,
-          questionId: question.id,
-          selectedAnswer: selectedOption,
-        }),
-      })
+    pendingAnswersRef.current.push({
+      questionId: question.id,
+      selectedAnswer: selectedOption,
+    })
 
-      if (isCorrect) {
-        setScore(score + 1)
-      }
-
-      setSelectedAnswer(selectedOption)
-      setHasAnswered(true)
-    } catch (err) {
-      console.error('Failed to submit answer:', err)
-      // Still allow UI to update
-      if (isCorrect) {
-        setScore(score + 1)
-      }
-      setSelectedAnswer(selectedOption)
-      setHasAnswered(true)
+    if (isCorrect) {
+      setScore(score + 1)
     }
+
+    setSelectedAnswer(selectedOption)
+    setHasAnswered(true)
   }
 
   async function nextQuestion() {
@@ -134,26 +179,53 @@ function Quiz({ quizId, childEmail, onBack }) {
       shuffleOptions(quizData.questions[currentQuestionIndex + 1].options)
     } else {
       // Quiz complete
-      try {
-        await fetchJson('/api/quiz/complete', {
-          method: 'POST',
-          body: JSON.stringify({
-            attemptId: attemptId,
-          }),
-        })
-      } catch (err) {
-        console.error('Failed to complete quiz:', err)
-      }
+      await saveAnswers(true)
       setIsCompleted(true)
     }
   }
 
+  async function handleBack() {
+    // Keep partial progress when leaving a level midway; a completed level
+    // was already saved unless that failed
+    if ((isCompleted && !saveFailed) || (await saveAnswers(isCompleted))) {
+      onBack()
+    }
+  }
+
+  function renderSaveFailed() {
+    if (!saveFailed) return null
+
+    return (
+      <div className="mb-6 rounded-xl border border-red-800 bg-red-900/20 p-4 text-red-400">
+        <p className="font-semibold">
+          We couldn't save your answers. Check your internet connection and try again.
+        </p>
+        <div className="mt-3 flex gap-3">
+          <button
+            onClick={() => saveAnswers(isCompleted)}
+            disabled={isSaving}
+            className="rounded-lg bg-violet-600 px-4 py-2 text-sm font-semibold text-white hover:bg-violet-700 disabled:opacity-60"
+          >
+            {isSaving ? 'Saving...' : 'Try Again'}
+          </button>
+          <button
+            onClick={onBack}
+            className="rounded-lg bg-slate-800 px-4 py-2 text-sm text-slate-100"
+          >
+            Leave Without Saving
+          </button>
+        </div>
+      </div>
+    )
+  }
+
   function renderLevelComplete() {
     const totalQuestions = quizData.questions.length
     const completionPercent = Math.round((score / totalQuestions) * 100)
 
     return (
       <div className="flex flex-col items-center p-8 bg-violet-600 rounded-3xl shadow-2xl">
+        {renderSaveFailed()}
         <h1 className="text-4xl sm:text-5xl font-extrabold text-yellow-300 mb-4 tracking-wider">
           LEVEL UP!
         </h1>
@@ -174,7 +246,8 @@ function Quiz({ quizId, childEmail, onBack }) {
         </p>
 
         <button
-          onClick={onBack}
+          onClick={handleBack}
+          disabled={isSaving}
           className="px-12 py-4 bg-yellow-400 text-violet-800 text-xl font-bold rounded-full shadow-2xl transition-all duration-300 transform hover:scale-105"
         >
           Back to Dashboard <i className="fas fa-chevron-circle-right ml-2"></i>
@@ -242,8 +315,11 @@ function Quiz({ quizId, childEmail, onBack }) {
 
   return (
     <div className="max-w-4xl mx-auto">
+      {renderSaveFailed()}
+
       <button
-        onClick={onBack}
+        onClick={handleBack}
+        disabled={isSaving}
         className="mb-6 text-sm font-medium text-primary hover:text-sky-300 transition-colors"
       >
         ← Back to Dashboard
@@ -322,7 +398,7 @@ function Quiz({ quizId, childEmail, onBack }) {
       <button
         id="next-btn"
         onClick={nextQuestion}
-        disabled={!hasAnswered}
+        disabled={!hasAnswered || isSaving}
         className={`mt-8 w-full rounded-2xl px-6 py-4 text-lg font-semibold shadow-lg transition-transform ${
           hasAnswered
             ? 'bg-primary text-slate-950 hover:scale-105 cursor-pointer'
@@ -1,9 +1,27 @@
 import { useEffect, useState } from 'react'
 import fetchJson from '../lib/fetchJson'
 
+const PAGE_SIZE = 50
+
+function buildProgressUrl(identifier, cursor) {
+  const params = new URLSearchParams({ identifier, limit: String(PAGE_SIZE) })
+  if (cursor) {
+    // Later pages only need stats for the children they introduce
+    params.set('cursor', cursor)
+    params.set('aggregates', 'children')
+  } else {
+    params.set('aggregates', '1')
+  }
+  return `/api/quiz/progress/teacher?${params.toString()}`
+}
+
 function TeacherProgress({ identifier }) {
   const [progress, setProgress] = useState([])
+  const [summary, setSummary] = useState(null)
+  const [childStats, setChildStats] = useState({})
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState(null)
 
   useEffect(() => {
@@ -11,14 +29,17 @@ function TeacherProgress({ identifier }) {
       setLoading(true)
       setError(null)
       try {
-        const data = await fetchJson(
-          `/api/quiz/progress?role=teacher&identifier=${encodeURIComponent(identifier)}`
-        )
-        setProgress(Array.isArray(data) ? data : [])
+        const data = await fetchJson(buildProgressUrl(identifier))
+        setProgress(Array.isArray(data.results) ? data.results : [])
+        setSummary(data.summary ?? null)
+        setChildStats(indexByChild(data.byChild))
+        setNextCursor(data.nextCursor ?? null)
       } catch (err) {
         setError('Failed to load progress. Please try again.')
         console.error(err)
         setProgress([])
+        setSummary(null)
+        setNextCursor(null)
       } finally {
         setLoading(false)
       }
@@ -26,6 +47,21 @@ function TeacherProgress({ identifier }) {
     fetchProgress()
   }, [identifier])
 
+  async function loadMore() {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const data = await fetchJson(buildProgressUrl(identifier, nextCursor))
+      setProgress((current) => [...current, ...(data.results ?? [])])
+      setChildStats((current) => ({ ...current, ...indexByChild(data.byChild) }))
+      setNextCursor(data.nextCursor ?? null)
+    } catch (err) {
+      console.error('Failed to load more progress:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   if (loading) {
     return (
       <div className="flex items-center justify-center py-12">
@@ -62,16 +98,11 @@ function TeacherProgress({ identifier }) {
     return acc
   }, {})
 
-  // Calculate statistics
-  const totalStudents = Object.keys(groupedByChild).length
-  const totalAttempts = progress.length
-  const completedAttempts = progress.filter((p) => p.isCompleted).length
-  const averageScore =
-    progress.length > 0
-      ? Math.round(
-          progress.reduce((sum, p) => sum + (p.percentage ?? 0), 0) / progress.length
-        )
-      : 0
+  // Statistics are aggregated server-side across every attempt, not just the loaded pages
+  const totalStudents = summary?.totalStudents ?? Object.keys(groupedByChild).length
+  const totalAttempts = summary?.attempts ?? progress.length
+  const completedAttempts = summary?.completed ?? progress.filter((p) => p.isCompleted).length
+  const averageScore = summary?.averagePercentage ?? 0
 
   return (
     <div className="space-y-8">
@@ -106,9 +137,16 @@ function TeacherProgress({ identifier }) {
               key={email}
               className="rounded-2xl border border-slate-800 bg-gradient-to-br from-slate-900 to-slate-950 p-6"
             >
-              <h4 className="text-lg font-bold text-slate-100 mb-4 pb-4 border-b border-slate-800">
-                {email}
-              </h4>
+              <div className="flex items-center justify-between mb-4 pb-4 border-b border-slate-800">
+                <h4 className="text-lg font-bold text-slate-100">{email}</h4>
+                {childStats[email] && (
+                  <p className="text-xs text-slate-400">
+                    {childStats[email].attempts} attempts •{' '}
+                    {childStats[email].completionRate}% completed • Avg{' '}
+                    {childStats[email].averagePercentage}%
+                  </p>
+                )}
+              </div>
               <div className="space-y-4">
                 {items.map((item, idx) => (
                   <div
@@ -162,10 +200,26 @@ function TeacherProgress({ identifier }) {
             </div>
           ))}
         </div>
+        {nextCursor && (
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="mt-6 w-full rounded-xl border border-slate-800 bg-slate-900/50 px-4 py-3 text-sm font-semibold text-slate-300 hover:border-primary disabled:opacity-60"
+          >
+            {loadingMore ? 'Loading...' : 'Load more attempts'}
+          </button>
+        )}
       </div>
     </div>
   )
 }
 
+function indexByChild(rows) {
+  return (rows ?? []).reduce((acc, row) => {
+    acc[row.childEmail] = row
+    return acc
+  }, {})
+}
+
 export default TeacherProgress
 
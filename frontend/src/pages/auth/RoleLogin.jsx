@@ -43,7 +43,7 @@ function RoleLogin() {
         },
       }
 
-      await fetchJson('/api/login', {
+      const response = await fetchJson('/api/login', {
         method: 'POST',
         body: JSON.stringify(payload),
       })
@@ -51,6 +51,13 @@ function RoleLogin() {
       // Store user info in localStorage
       localStorage.setItem('userRole', role)
       localStorage.setItem('userIdentifier', formState.identifier.trim())
+      // Authenticates SOS alerts: sending them as a child, receiving them otherwise.
+      // Only issued when the password matches a registered account.
+      if (response.sosToken) {
+        localStorage.setItem('sosToken', response.sosToken)
+      } else {
+        localStorage.removeItem('sosToken')
+      }
 
       setStatus({
         type: 'success',
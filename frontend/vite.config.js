@@ -18,14 +18,14 @@ export default defineConfig({
         target: 'http://localhost:5001',
         changeOrigin: true,
       },
-      '/api/sos': {
-        target: 'http://localhost:5001',
-        changeOrigin: true,
-      },
       '/api': {
         target: 'http://localhost:8000',
         changeOrigin: true,
       },
+      '/ws': {
+        target: 'ws://localhost:8000',
+        ws: true,
+      },
     },
   },
 })